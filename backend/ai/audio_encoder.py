@@ -0,0 +1,188 @@
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from logger import setup_logger
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+
+logger = setup_logger(__name__)
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    extension: str
+    media_type: str
+    # Типы Accept, которые обслуживает формат (первый - media_type)
+    accept: Tuple[str, ...]
+    # Кодек и контейнер ffmpeg, пусто для исходного WAV
+    ffmpeg_args: Tuple[str, ...] = ()
+
+
+# Форматы в порядке предпочтения сервера
+AUDIO_FORMATS: Dict[str, AudioFormat] = {
+    'opus': AudioFormat(
+        extension='.ogg',
+        media_type='audio/ogg',
+        accept=('audio/ogg', 'audio/opus', 'application/ogg'),
+        ffmpeg_args=(
+            '-c:a',
+            'libopus',
+            '-b:a',
+            settings.AUDIO_OPUS_BITRATE,
+            '-application',
+            'voip',
+            '-f',
+            'ogg',
+        ),
+    ),
+    'mp3': AudioFormat(
+        extension='.mp3',
+        media_type='audio/mpeg',
+        accept=('audio/mpeg', 'audio/mp3'),
+        ffmpeg_args=(
+            '-c:a',
+            'libmp3lame',
+            '-b:a',
+            settings.AUDIO_MP3_BITRATE,
+            '-f',
+            'mp3',
+        ),
+    ),
+    'wav': AudioFormat(
+        extension='.wav',
+        media_type='audio/wav',
+        accept=('audio/wav', 'audio/wave', 'audio/x-wav'),
+    ),
+}
+
+FORMAT_BY_EXTENSION = {fmt.extension: fmt for fmt in AUDIO_FORMATS.values()}
+
+# ffmpeg после синтеза нагружает процессор так же, как Piper
+_encode_slots = asyncio.Semaphore(settings.PIPER_WORKERS)
+
+
+class AudioEncodeError(Exception):
+    """Ошибка перекодирования аудио"""
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """
+    Формат ответа по заголовку Accept.
+
+    Выбирается формат с наибольшим q среди явно названных типов, при
+    равных q - по порядку AUDIO_FORMATS. Без явных типов (нет заголовка,
+    */*, audio/*) - WAV, как отдавалось раньше.
+    """
+    best, best_q = 'wav', 0.0
+    if not accept:
+        return best
+
+    quality: Dict[str, float] = {}
+    for part in accept.split(','):
+        media_type, *params = part.split(';')
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media_type = media_type.strip().lower()
+        quality[media_type] = max(q, quality.get(media_type, 0.0))
+
+    for name, fmt in AUDIO_FORMATS.items():
+        q = max(quality.get(media_type, 0.0) for media_type in fmt.accept)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def variant_path(wav_path: Path, name: str) -> Path:
+    """Путь варианта name рядом с исходным WAV."""
+    return wav_path.with_suffix(AUDIO_FORMATS[name].extension)
+
+
+def remove_variants(wav_path: Path) -> None:
+    """Удаляет сжатые варианты WAV, например перед его заменой."""
+    for name in AUDIO_FORMATS:
+        if name != 'wav':
+            variant_path(wav_path, name).unlink(missing_ok=True)
+
+
+async def encode(wav_path: Path, name: str) -> Path:
+    """
+    Перекодирует WAV в формат name рядом с исходным файлом.
+
+    ffmpeg пишет во временный файл, os.replace подменяет готовый.
+
+    Raises:
+        AudioEncodeError: ffmpeg не запустился или завершился с ошибкой
+    """
+    output_path = variant_path(wav_path, name)
+    temp_path = output_path.with_name(f'{output_path.name}.{uuid.uuid4().hex}.tmp')
+    args = [
+        settings.FFMPEG_PATH,
+        '-hide_banner',
+        '-loglevel',
+        'error',
+        '-y',
+        '-i',
+        str(wav_path),
+        *AUDIO_FORMATS[name].ffmpeg_args,
+        str(temp_path),
+    ]
+
+    started = time.monotonic()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            _, stderr = await process.communicate()
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        if process.returncode != 0:
+            raise AudioEncodeError(
+                f'ffmpeg failed: {stderr.decode("utf-8", "replace").strip()}'
+            )
+        os.replace(temp_path, output_path)
+    except OSError as e:
+        raise AudioEncodeError(f'Failed to run ffmpeg: {e}')
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+    metrics.observe(
+        'audio_encode_seconds', time.monotonic() - started, format=name
+    )
+    return output_path
+
+
+async def encode_variants(wav_path: Path) -> None:
+    """
+    Варианты AUDIO_ENCODE_FORMATS для нового WAV.
+
+    Ошибка кодирования не мешает отдать WAV, поэтому только логируется.
+    """
+    for name in settings.AUDIO_ENCODE_FORMATS:
+        try:
+            async with _encode_slots:
+                await encode(wav_path, name)
+        except AudioEncodeError as e:
+            metrics.inc('audio_encode_total', format=name, result='error')
+            logger.warning(f'Failed to encode {wav_path.name} to {name}: {e}')
+            # Старый вариант не должен отдаваться вместо нового WAV
+            variant_path(wav_path, name).unlink(missing_ok=True)
+        else:
+            metrics.inc('audio_encode_total', format=name, result='ok')
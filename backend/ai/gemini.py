@@ -1,91 +1,33 @@
 import asyncio
-import json
-import re
-from collections import deque
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 
 import google.generativeai as genai
 from logger import setup_logger
 
 from backend.core.config import settings
+from backend.core.metrics import metrics
 
+from .json_extract import JsonExtractError, extract_json
+from .json_stream import JsonArrayStream
+from .prompt_batcher import PromptBatcher
+from .prompt_cache import prompt_cache, prompt_key
 from .prompt_loader import PromptLoader
+from .rate_limiter import PRIORITY_HIGH, PRIORITY_NORMAL, RateLimiter
 
 logger = setup_logger(__name__)
 
+# Приоритет шаблонов в очереди лимита запросов
+TEMPLATE_PRIORITIES: Dict[str, int] = {
+    'chat_dialog': PRIORITY_HIGH,
+    'email_structure': PRIORITY_HIGH,
+}
 
-class RateLimiter:
-    def __init__(self, requests_per_minute: int = 15, min_interval: float = 1.0):
-        logger.info(
-            f'RateLimiter initialized: {requests_per_minute} rpm, {min_interval}s interval'
-        )
-        self.requests_per_minute = requests_per_minute
-        self.min_interval = min_interval
-        self.requests = deque()
-        self.lock = asyncio.Lock()
-        self.last_request_time: Optional[datetime] = None
-
-    async def acquire(self, request_type: str):
-        logger.debug(
-            f'Acquiring rate limiter: {self.requests_per_minute} rpm, {self.min_interval}s min interval for {request_type}'
-        )
-        try:
-            async with self.lock:
-                logger.debug(f'Acquired lock for {request_type}')
-                now = datetime.now()
-                logger.debug(f'Current time: {now}')
-
-                # Очистка старых запросов (старше минуты)
-                logger.debug('Clearing old requests')
-                while self.requests and (now - self.requests[0]) > timedelta(
-                    minutes=1
-                ):
-                    removed = self.requests.popleft()
-                    logger.debug(f'Removed old request timestamp: {removed}')
-
-                # Проверка количества запросов в минуту
-                logger.debug(f'Current request count: {len(self.requests)}')
-                if len(self.requests) >= self.requests_per_minute:
-                    oldest_request = self.requests[0]
-                    wait_time = (
-                        oldest_request + timedelta(minutes=1) - now
-                    ).total_seconds()
-                    logger.info(
-                        f'Rate limit reached for {request_type}, waiting {wait_time:.2f}s'
-                    )
-                    await asyncio.sleep(wait_time)
-                    now = datetime.now()
-                    logger.debug(f'Woke up from sleep, current time: {now}')
-
-                # Проверка минимального интервала между запросами
-                if self.last_request_time:
-                    time_since_last = (
-                        now - self.last_request_time
-                    ).total_seconds()
-                    logger.debug(
-                        f'Time since last request: {time_since_last:.2f}s'
-                    )
-                    if time_since_last < self.min_interval:
-                        wait_time = self.min_interval - time_since_last
-                        logger.info(
-                            f'Enforcing min interval for {request_type}, waiting {wait_time:.2f}s'
-                        )
-                        await asyncio.sleep(wait_time)
-                        now = datetime.now()
-                        logger.debug(
-                            f'Woke up from min interval sleep, current time: {now}'
-                        )
-
-                self.requests.append(now)
-                self.last_request_time = now
-                logger.debug(
-                    f'Request permitted for {request_type}: {len(self.requests)}/{self.requests_per_minute} rpm'
-                )
-        except Exception as e:
-            logger.error(f'Exception in RateLimiter.acquire: {e}', exc_info=True)
-        finally:
-            logger.debug(f'Release lock for {request_type}')
+# Обязательные ключи ответа: часть пачки без них генерируется отдельно
+TEMPLATE_REQUIRED_KEYS: Dict[str, Tuple[str, ...]] = {
+    'chat_dialog': ('messages',),
+    'email_structure': ('correct_blocks', 'incorrect_blocks'),
+}
 
 
 class GeminiServiceError(Exception):
@@ -107,123 +49,232 @@ class GeminiService:
             self.rate_limiter = RateLimiter(
                 requests_per_minute=settings.REQUESTS_PER_MINUTE,
                 min_interval=settings.MIN_REQUEST_INTERVAL,
+                burst=settings.REQUESTS_BURST,
+                max_wait=settings.REQUEST_MAX_WAIT,
             )
+            self.batcher = PromptBatcher(self._generate_batch)
 
             logger.info('GeminiService initialized successfully')
         except Exception as e:
             logger.error(f'Error initializing GeminiService: {e}', exc_info=True)
 
-    def _clean_json_string(self, json_str: str) -> str:
-        logger.debug(f'_clean_json_string called with: {json_str}')
+    def _extract_json_from_response(self, response_text: str) -> Dict:
         try:
-            json_str = re.sub(r',(\s*})', r'\1', json_str)
-            logger.info('Removed trailing commas before }')
-            json_str = re.sub(r',(\s*])', r'\1', json_str)
-            logger.info('Removed trailing commas before ]')
-            logger.debug(f'Cleaned JSON string: {json_str}')
-            return json_str
+            result = extract_json(response_text)
+        except JsonExtractError as e:
+            logger.error(f'Failed to parse model response: {e}')
+            # Полный ответ пишем только в DEBUG, без форматирования при INFO
+            logger.debug('Raw response from Gemini: %s', response_text)
+            raise GeminiServiceError(str(e), raw_response=response_text) from e
+        logger.info('Parsed JSON successfully')
+        return result
+
+    def _render_prompt(self, template_name: str, input_data: Dict) -> str:
+        template = self.prompt_loader.get_template(template_name)
+        prompt = template.prompt.format_map(input_data)
+        return prompt.replace('{{', '{').replace('}}', '}')
+
+    @staticmethod
+    def _cache_key(template_name: str, prompt: str) -> str:
+        return prompt_key(
+            template_name,
+            prompt,
+            settings.GEMINI_MODEL_NAME,
+            settings.DEFAULT_TEMPERATURE,
+            settings.DEFAULT_TOP_P,
+        )
+
+    async def execute_prompt(
+        self,
+        template_name: str,
+        input_data: Dict,
+        priority: Optional[int] = None,
+        use_cache: bool = True,
+        batch: bool = True,
+    ) -> Dict:
+        try:
+            prompt = self._render_prompt(template_name, input_data)
+
+            if priority is None:
+                priority = TEMPLATE_PRIORITIES.get(template_name, PRIORITY_NORMAL)
+
+            async def generate() -> Dict:
+                if batch and self.batcher.max_size > 1:
+                    # Одновременные запросы шаблона занимают одно место лимита
+                    return await self.batcher.submit(
+                        template_name, prompt, priority
+                    )
+                return await self._generate(template_name, prompt, priority)
+
+            if not use_cache:
+                return await generate()
+
+            # Одинаковый промпт с теми же параметрами модели не генерируем заново
+            key = self._cache_key(template_name, prompt)
+            return await prompt_cache.get_or_generate(template_name, key, generate)
+
         except Exception as e:
-            logger.error(f'Exception in _clean_json_string: {e}', exc_info=True)
-            return json_str
+            logger.error(f'Error in execute_prompt: {e}', exc_info=True)
+            raise
 
-    def _extract_json_from_response(self, response_text: str) -> Dict:
+    async def execute_batch(
+        self,
+        template_name: str,
+        inputs: List[Dict],
+        priority: Optional[int] = None,
+    ) -> List[Union[Dict, Exception]]:
+        """
+        Несколько запросов одного шаблона.
+
+        Запросы собираются в пачки до PROMPT_BATCH_SIZE штук, каждая пачка
+        выполняется одним промптом и занимает одно место лимита запросов.
+        Ошибка запроса возвращается на его месте, остальные не страдают.
+        """
+        return await asyncio.gather(
+            *(
+                self.execute_prompt(template_name, input_data, priority=priority)
+                for input_data in inputs
+            ),
+            return_exceptions=True,
+        )
+
+    async def _generate_batch(
+        self, template_name: str, prompts: List[str], priority: int
+    ) -> List[Union[Dict, Exception]]:
+        """
+        Один промпт на несколько запросов с ответом-массивом.
+
+        Каждая часть ответа проверяется отдельно, неподходящая (нет
+        обязательных ключей, массив короче) генерируется заново одна.
+        """
+        if len(prompts) == 1:
+            return [await self._generate(template_name, prompts[0], priority)]
+
+        tasks = '\n\n'.join(
+            f'=== TASK {number} ===\n{prompt}\n=== END TASK {number} ==='
+            for number, prompt in enumerate(prompts, 1)
+        )
+        batch_prompt = self.prompt_loader.get_template('batch').prompt.format_map(
+            {'count': len(prompts), 'tasks': tasks}
+        )
+        metrics.observe(
+            'prompt_batch_size',
+            len(prompts),
+            buckets=(2, 3, 4, 6, 8, 12, 16),
+            template=template_name,
+        )
+
+        parts = []
         try:
-            logger.debug(f'Raw response from Gemini: {response_text[:100]}')
-
-            if not response_text or response_text.isspace():
-                logger.info('Empty response received')
-                raise GeminiServiceError('Empty response from model')
-
-            cleaned_response = response_text.strip()
-            logger.debug(f'Cleaned response: {cleaned_response}')
-
-            if '```json' in cleaned_response:
-                parts = cleaned_response.split('```json')
-                logger.debug(f'Split response into parts: {parts}')
-                if len(parts) < 2:
-                    logger.error('Malformed JSON block in response')
-                    raise GeminiServiceError('Malformed JSON block in response')
-                json_str = parts[1].split('```')[0].strip()
-                logger.info('Extracted JSON from ```json block')
-            elif '```' in cleaned_response:
-                parts = cleaned_response.split('```')
-                logger.debug(f'Split response into parts: {parts}')
-                if len(parts) < 3:
-                    logger.error('Malformed code block in response')
-                    raise GeminiServiceError('Malformed code block in response')
-                json_str = parts[1].strip()
-                logger.info('Extracted JSON from ``` block')
-            else:
-                json_str = cleaned_response
-                logger.info('Extracted JSON from plain text')
-
-            logger.debug(
-                f'Extracted JSON string before cleaning: {json_str[:100]}'
-            )
+            response = await self._generate(template_name, batch_prompt, priority)
+            parts = response.get('results')
+            if not isinstance(parts, list):
+                raise GeminiServiceError('Batch response has no results array')
+        except GeminiServiceError as e:
+            logger.warning(f'Invalid batch response for {template_name}: {e}')
+            parts = []
 
-            json_str = self._clean_json_string(json_str)
-            logger.debug(f'Cleaned JSON string: {json_str}')
+        required = TEMPLATE_REQUIRED_KEYS.get(template_name, ())
 
-            try:
-                parsed_json = json.loads(json_str)
-                logger.info('Parsed JSON successfully')
-                if not isinstance(parsed_json, dict):
-                    logger.error('Response is not a JSON object')
-                    raise GeminiServiceError('Response is not a JSON object')
-                logger.debug(f'Parsed JSON: {parsed_json}')
-                return parsed_json
-            except json.JSONDecodeError as e:
-                logger.error(f'JSON decode error: {e}', exc_info=True)
-                raise GeminiServiceError(
-                    f'Invalid JSON format: {str(e)}', raw_response=response_text
+        async def resolve(index: int) -> Union[Dict, Exception]:
+            part = parts[index] if index < len(parts) else None
+            if isinstance(part, dict) and all(part.get(key) for key in required):
+                metrics.inc(
+                    'prompt_batch_parts_total', template=template_name, result='ok'
                 )
+                return part
 
-        except GeminiServiceError as e:
-            logger.error(f'GeminiServiceError: {e.message}', exc_info=True)
-            raise
-        except Exception as e:
-            logger.error(f'Error extracting JSON: {e}', exc_info=True)
-            raise GeminiServiceError(
-                f'Failed to parse response: {str(e)}', raw_response=response_text
+            metrics.inc(
+                'prompt_batch_parts_total', template=template_name, result='retry'
             )
+            try:
+                return await self._generate(
+                    template_name, prompts[index], priority
+                )
+            except Exception as e:
+                return e
 
-    async def execute_prompt(
+        return await asyncio.gather(
+            *(resolve(index) for index in range(len(prompts)))
+        )
+
+    async def stream_prompt(
         self,
         template_name: str,
         input_data: Dict,
-    ) -> Dict:
-        try:
-            await self.rate_limiter.acquire('execute_prompt')
+        array_key: str,
+        priority: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Генерация с потоковым ответом модели.
+
+        Отдает ('item', объект) для каждого объекта массива array_key, как
+        только он завершен в ответе, и в конце ('result', полный ответ).
+        Результат попадает в кэш промптов, при попадании в кэш объекты
+        отдаются сразу без запроса к модели.
+        """
+        prompt = self._render_prompt(template_name, input_data)
+        key = self._cache_key(template_name, prompt)
+        cached = await prompt_cache.get(template_name, key)
+        if cached is not None:
+            for item in cached.get(array_key) or []:
+                yield 'item', item
+            yield 'result', cached
+            return
+
+        if priority is None:
+            priority = TEMPLATE_PRIORITIES.get(template_name, PRIORITY_NORMAL)
+        await self.rate_limiter.acquire(template_name, priority)
+
+        generation_config = genai.types.GenerationConfig(
+            temperature=settings.DEFAULT_TEMPERATURE,
+            top_p=settings.DEFAULT_TOP_P,
+        )
+        started = time.monotonic()
+        first_item = True
+        stream = JsonArrayStream(array_key)
+        response = await self.model.generate_content_async(
+            [prompt], generation_config=generation_config, stream=True
+        )
+        async for chunk in response:
+            for item in stream.feed(chunk.text):
+                if first_item:
+                    first_item = False
+                    metrics.observe(
+                        'ai_stream_first_item_seconds',
+                        time.monotonic() - started,
+                        template=template_name,
+                    )
+                yield 'item', item
 
-            template = self.prompt_loader.get_template(template_name)
-            prompt = template.prompt.format_map(input_data)
-            prompt = prompt.replace('{{', '{').replace('}}', '}')
+        result = self._extract_json_from_response(stream.text)
+        await prompt_cache.set(key, result)
+        yield 'result', result
 
-            generation_parts = []
+    async def _generate(
+        self, template_name: str, prompt: str, priority: int
+    ) -> Dict:
+        await self.rate_limiter.acquire(template_name, priority)
 
-            generation_parts.append(prompt)
+        generation_parts = []
 
-            generation_config = genai.types.GenerationConfig(
-                temperature=settings.DEFAULT_TEMPERATURE,
-                top_p=settings.DEFAULT_TOP_P,
-            )
-            logger.debug(f'Prompt: {prompt}')
-            logger.debug(
-                f'Generation parts length: {len(generation_parts)} and types: {[type(element) for element in generation_parts]}'
-            )
-            response = await self.model.generate_content_async(
-                generation_parts, generation_config=generation_config
-            )
+        generation_parts.append(prompt)
 
-            if not response or not response.text:
-                raise GeminiServiceError('Empty response from Gemini')
+        generation_config = genai.types.GenerationConfig(
+            temperature=settings.DEFAULT_TEMPERATURE,
+            top_p=settings.DEFAULT_TOP_P,
+        )
+        # Промпт форматируется в лог, только если включен DEBUG
+        logger.debug('Prompt for %s: %s', template_name, prompt)
+        response = await self.model.generate_content_async(
+            generation_parts, generation_config=generation_config
+        )
 
-            result = self._extract_json_from_response(response.text)
-            return result
+        if not response or not response.text:
+            raise GeminiServiceError('Empty response from Gemini')
 
-        except Exception as e:
-            logger.error(f'Error in execute_prompt: {e}', exc_info=True)
-            raise
+        result = self._extract_json_from_response(response.text)
+        return result
 
 
 GeminiServiceSinglethon = GeminiService()
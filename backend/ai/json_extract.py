@@ -0,0 +1,115 @@
+import json
+import re
+from typing import Any, Dict
+
+try:
+    # Необязательная зависимость: разбор в несколько раз быстрее json
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_TRAILING_COMMA = re.compile(r',(?=\s*[}\]])')
+
+
+class JsonExtractError(ValueError):
+    """В ответе модели нет корректного JSON объекта."""
+
+
+def extract_json_text(text: str) -> str:
+    """
+    JSON из ответа модели: блок ```json, блок ``` или весь текст.
+
+    Границы блока ищутся по индексу, без разбиения всей строки.
+    """
+    start = text.find('```json')
+    if start != -1:
+        start += len('```json')
+        end = text.find('```', start)
+        return text[start : end if end != -1 else len(text)].strip()
+
+    start = text.find('```')
+    if start != -1:
+        start += len('```')
+        end = text.find('```', start)
+        if end == -1:
+            raise JsonExtractError('Malformed code block in response')
+        return text[start:end].strip()
+
+    return text.strip()
+
+
+def remove_trailing_commas(json_str: str) -> str:
+    """
+    Убирает запятые перед } и ] вне строк.
+
+    Regex находит кандидатов, между ними просматриваются только кавычки
+    (str.find), чтобы понять, не внутри ли строки запятая. Если висячих
+    запятых нет, строка возвращается без копирования.
+    """
+    parts = []
+    copied = 0  # Начало еще не скопированной части
+    scanned = 0  # До этой позиции кавычки учтены
+    in_string = False
+    for match in _TRAILING_COMMA.finditer(json_str):
+        comma = match.start()
+        quote = json_str.find('"', scanned, comma)
+        while quote != -1:
+            if in_string:
+                # Кавычка закрывает строку, если перед ней четное число \\
+                backslash = quote - 1
+                while json_str[backslash] == '\\':
+                    backslash -= 1
+                in_string = (quote - 1 - backslash) % 2 == 1
+            else:
+                in_string = True
+            quote = json_str.find('"', quote + 1, comma)
+        scanned = comma
+        if not in_string:
+            parts.append(json_str[copied:comma])
+            copied = comma + 1
+
+    if not parts:
+        return json_str
+    parts.append(json_str[copied:])
+    return ''.join(parts)
+
+
+def loads(json_str: str) -> Any:
+    """json.loads через orjson, если он установлен."""
+    if orjson is not None:
+        return orjson.loads(json_str)
+    return json.loads(json_str)
+
+
+def parse_object(json_str: str) -> Dict:
+    """
+    JSON объект из строки, с исправлением висячих запятых.
+
+    Raises:
+        JsonExtractError: Неверный JSON или не объект
+    """
+    try:
+        parsed = loads(json_str)
+    except ValueError:
+        # Частая ошибка модели - висячие запятые, чиним только при ошибке
+        try:
+            parsed = loads(remove_trailing_commas(json_str))
+        except ValueError as e:
+            raise JsonExtractError(f'Invalid JSON format: {e}') from e
+
+    if not isinstance(parsed, dict):
+        raise JsonExtractError('Response is not a JSON object')
+    return parsed
+
+
+def extract_json(text: str) -> Dict:
+    """
+    JSON объект из ответа модели.
+
+    Raises:
+        JsonExtractError: Пустой ответ, битый блок, неверный JSON или
+            не объект
+    """
+    if not text or text.isspace():
+        raise JsonExtractError('Empty response from model')
+    return parse_object(extract_json_text(text))
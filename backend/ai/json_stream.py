@@ -0,0 +1,99 @@
+from typing import Dict, List, Optional
+
+from .json_extract import JsonExtractError, parse_object
+
+
+class JsonArrayStream:
+    """
+    Инкрементальный разбор массива объектов в JSON ответе модели.
+
+    Текст подается кусками по мере генерации, feed возвращает объекты
+    массива array_key корневого объекта, которые завершились в этом куске.
+    Строки и экранирование учитываются, обертка ```json не мешает.
+
+        stream = JsonArrayStream('messages')
+        for chunk in chunks:
+            for message in stream.feed(chunk):
+                ...
+        text = stream.text  # Полный ответ для обычного разбора
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self._parts: List[str] = []
+        self._item: List[str] = []  # Текущий объект массива
+        self._depth = 0
+        self._array_depth: Optional[int] = None  # Глубина внутри массива
+        self._array_done = False
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []  # Строка на уровне корневого объекта
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None  # Ключ текущего значения корня
+
+    @property
+    def text(self) -> str:
+        return ''.join(self._parts)
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Добавляет кусок текста, возвращает завершенные объекты массива."""
+        self._parts.append(chunk)
+        completed = []
+        for char in chunk:
+            in_item = bool(self._item)
+            if in_item:
+                self._item.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = ''.join(self._string)
+                elif self._depth == 1:
+                    self._string.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string = []
+            elif char == ':' and self._depth == 1:
+                self._key = self._last_string
+            elif char == ',' and self._depth == 1:
+                self._key = None
+            elif char in '{[':
+                if (
+                    char == '['
+                    and self._depth == 1
+                    and self._key == self.array_key
+                    and self._array_depth is None
+                ):
+                    self._array_depth = 2
+                elif (
+                    char == '{'
+                    and not self._array_done
+                    and self._depth == self._array_depth
+                ):
+                    self._item = [char]
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if in_item and char == '}' and self._depth == self._array_depth:
+                    item = self._parse(''.join(self._item))
+                    self._item = []
+                    if item is not None:
+                        completed.append(item)
+                elif char == ']' and self._depth == 1 and self._array_depth:
+                    self._array_done = True
+        return completed
+
+    @staticmethod
+    def _parse(text: str) -> Optional[Dict]:
+        try:
+            return parse_object(text)
+        except JsonExtractError:
+            # Битый объект пропускаем, полный ответ проверяется в конце
+            return None
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
 from logger import setup_logger
 
@@ -24,10 +24,12 @@ class BaseOperation(ABC):
 
 
 class ActivityName(BaseOperation):
-    async def execute(self, input_data: Dict) -> Dict[str, Any]:
+    async def execute(
+        self, input_data: Dict, priority: Optional[int] = None
+    ) -> Dict[str, Any]:
         try:
             response = await self.gemini_service.execute_prompt(
-                'activity_name', input_data
+                'activity_name', input_data, priority=priority
             )
             return response
         except Exception as e:
@@ -36,22 +38,35 @@ class ActivityName(BaseOperation):
 
 
 class ChatDialog(BaseOperation):
-    async def execute(self, input_data: Dict) -> Dict[str, Any]:
+    async def execute(
+        self, input_data: Dict, priority: Optional[int] = None
+    ) -> Dict[str, Any]:
         try:
             response = await self.gemini_service.execute_prompt(
-                'chat_dialog', input_data
+                'chat_dialog', input_data, priority=priority
             )
             return response
         except Exception as e:
             logger.error(f'Error: {str(e)}')
             raise
 
+    async def stream(
+        self, input_data: Dict, priority: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """Сообщения диалога по мере генерации, затем полный ответ."""
+        async for event in self.gemini_service.stream_prompt(
+            'chat_dialog', input_data, 'messages', priority=priority
+        ):
+            yield event
+
 
 class EmailStructure(BaseOperation):
-    async def execute(self, input_data: Dict) -> Dict[str, Any]:
+    async def execute(
+        self, input_data: Dict, priority: Optional[int] = None
+    ) -> Dict[str, Any]:
         try:
             response = await self.gemini_service.execute_prompt(
-                'email_structure', input_data
+                'email_structure', input_data, priority=priority
             )
             return response
         except Exception as e:
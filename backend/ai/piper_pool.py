@@ -0,0 +1,260 @@
+import asyncio
+import json
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from logger import setup_logger
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+
+logger = setup_logger(__name__)
+
+STDERR_TAIL = 20  # Последние строки stderr процесса для сообщений об ошибках
+
+
+class PiperWorkerError(Exception):
+    """Ошибка синтеза в процессе Piper"""
+
+
+class PiperWorkerCrashed(PiperWorkerError):
+    """Процесс Piper завершился, не ответив на задание"""
+
+
+class PiperWorker:
+    """
+    Долгоживущий процесс Piper в режиме --json-input.
+
+    Модель голоса загружается один раз при старте процесса. Задание -
+    строка JSON {"text", "output_file"} в stdin, Piper пишет файл и
+    выводит его путь строкой в stdout.
+    """
+
+    def __init__(self, args: Tuple[str, ...]):
+        self.args = args
+        self.jobs = 0
+        self.last_used = time.monotonic()
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._stderr: Deque[str] = deque(maxlen=STDERR_TAIL)
+        self._stderr_task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                *self.args,
+                '--json-input',
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except OSError as e:
+            raise PiperWorkerError(f'Failed to start Piper: {e}')
+        # stderr читается постоянно, иначе заполненный буфер остановит Piper
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+        logger.info(f'Piper worker started, pid={self.process.pid}')
+
+    async def _drain_stderr(self) -> None:
+        async for line in self.process.stderr:
+            self._stderr.append(line.decode('utf-8', 'replace').rstrip())
+
+    async def synthesize(
+        self, text: str, output_path: Path, timeout: float
+    ) -> None:
+        """
+        Синтезирует text в output_path.
+
+        Raises:
+            PiperWorkerCrashed: Процесс завершился до ответа
+            PiperWorkerError: Ответ не получен за timeout секунд
+        """
+        job = json.dumps(
+            {'text': text, 'output_file': str(output_path)}, ensure_ascii=False
+        )
+        try:
+            self.process.stdin.write(job.encode('utf-8') + b'\n')
+            await self.process.stdin.drain()
+            line = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+        except asyncio.TimeoutError:
+            raise PiperWorkerError(f'Piper timed out after {timeout}s')
+        except ConnectionError:
+            line = b''
+
+        if not line:
+            stderr = '\n'.join(self._stderr)
+            raise PiperWorkerCrashed(f'Piper worker exited: {stderr}')
+        self.jobs += 1
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        """Закрывает stdin: Piper завершится после текущего задания."""
+        if self.alive:
+            self.process.stdin.close()
+
+    def kill(self) -> None:
+        if self.alive:
+            self.process.kill()
+
+
+class PiperPool:
+    """
+    Пул процессов Piper с загруженными моделями голосов.
+
+    Процессы группируются по аргументам запуска (голос и скорость).
+    Одновременно выполняется не больше size заданий на воркер uvicorn,
+    остальные ждут в очереди. Процесс, завершившийся с ошибкой,
+    заменяется новым, задание повторяется один раз. Процессы, простоявшие
+    idle_timeout секунд или выполнившие max_jobs заданий, завершаются.
+    """
+
+    def __init__(
+        self,
+        size: int = settings.PIPER_WORKERS,
+        idle_timeout: float = settings.PIPER_IDLE_TIMEOUT,
+        max_jobs: int = settings.PIPER_WORKER_MAX_JOBS,
+        timeout: float = settings.PIPER_TIMEOUT,
+    ):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(size)
+        self._idle: Dict[Tuple[str, ...], List[PiperWorker]] = {}
+        self._waiting = 0
+        self._running = 0
+        self._reaper: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        """Место в пуле, с метриками очереди."""
+        queued = time.monotonic()
+        self._waiting += 1
+        metrics.set('tts_queue_depth', self._waiting)
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+            metrics.set('tts_queue_depth', self._waiting)
+        metrics.observe('tts_queue_wait_seconds', time.monotonic() - queued)
+
+        self._running += 1
+        metrics.set('tts_running', self._running)
+        try:
+            yield
+        finally:
+            self._running -= 1
+            metrics.set('tts_running', self._running)
+            self._slots.release()
+
+    async def synthesize(
+        self, args: Tuple[str, ...], text: str, output_path: Path
+    ) -> None:
+        """
+        Синтезирует text в output_path процессом Piper с аргументами args.
+
+        Raises:
+            PiperWorkerError: Процесс не запустился, упал дважды подряд
+                или не уложился в timeout
+        """
+        async with self._slot():
+            for attempt in range(2):
+                worker = await self._acquire(args)
+                started = time.monotonic()
+                try:
+                    await worker.synthesize(text, output_path, self.timeout)
+                except PiperWorkerCrashed as e:
+                    metrics.inc('tts_worker_restarts_total', reason='crash')
+                    logger.warning(f'Piper worker crashed: {e}')
+                    worker.kill()
+                    if attempt:
+                        raise
+                    continue
+                except BaseException:
+                    # Ошибка или отмена: ответ процесса не прочитан, процесс
+                    # нельзя использовать для следующего задания
+                    worker.kill()
+                    raise
+                metrics.observe(
+                    'tts_synthesis_seconds', time.monotonic() - started
+                )
+                self._release(args, worker)
+                return
+
+    async def _acquire(self, args: Tuple[str, ...]) -> PiperWorker:
+        idle = self._idle.get(args, [])
+        while idle:
+            worker = idle.pop()
+            if worker.alive:
+                self._set_idle_gauge()
+                return worker
+            metrics.inc('tts_worker_restarts_total', reason='exited')
+
+        worker = PiperWorker(args)
+        await worker.start()
+        metrics.inc('tts_workers_started_total')
+        return worker
+
+    def _release(self, args: Tuple[str, ...], worker: PiperWorker) -> None:
+        if worker.jobs >= self.max_jobs:
+            metrics.inc('tts_workers_recycled_total', reason='max_jobs')
+            worker.close()
+            return
+
+        self._idle.setdefault(args, []).append(worker)
+        idle = [other for workers in self._idle.values() for other in workers]
+        if len(idle) > self.size:
+            # Процессы других голосов: держим не больше size всего
+            oldest = min(idle, key=lambda other: other.last_used)
+            self._remove(oldest, reason='evicted')
+        self._set_idle_gauge()
+
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+
+    def _remove(self, worker: PiperWorker, reason: str) -> None:
+        self._idle[worker.args].remove(worker)
+        metrics.inc('tts_workers_recycled_total', reason=reason)
+        worker.close()
+
+    def _set_idle_gauge(self) -> None:
+        metrics.set(
+            'tts_workers_idle',
+            sum(len(workers) for workers in self._idle.values()),
+        )
+
+    async def _reap(self) -> None:
+        """Завершает простаивающие процессы, пока они есть."""
+        while any(self._idle.values()):
+            await asyncio.sleep(self.idle_timeout / 2)
+            deadline = time.monotonic() - self.idle_timeout
+            for workers in list(self._idle.values()):
+                for worker in list(workers):
+                    if worker.last_used < deadline:
+                        self._remove(worker, reason='idle')
+            self._set_idle_gauge()
+
+    async def stop(self) -> None:
+        """Завершает все процессы (в lifespan приложения)."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        workers = [worker for workers in self._idle.values() for worker in workers]
+        self._idle = {}
+        self._set_idle_gauge()
+        for worker in workers:
+            worker.close()
+        for worker in workers:
+            try:
+                await asyncio.wait_for(worker.process.wait(), 5)
+            except asyncio.TimeoutError:
+                worker.kill()
+
+
+# Глобальный пул процессов Piper
+piper_pool = PiperPool()
@@ -1,10 +1,18 @@
 import os
-import subprocess
+import uuid
 from pathlib import Path
 from typing import Dict, Optional, Union
 
 from logger import setup_logger
 
+from backend.ai.audio_encoder import (
+    AUDIO_FORMATS,
+    encode_variants,
+    remove_variants,
+)
+from backend.ai.piper_pool import PiperPool, PiperWorkerError, piper_pool
+from backend.core.metrics import metrics
+
 logger = setup_logger(__name__)
 
 
@@ -42,6 +50,7 @@ class PiperTTS:
         self,
         piper_path: Optional[str] = None,
         output_base_path: Optional[str] = None,
+        pool: Optional[PiperPool] = None,
     ):
         """
         Инициализация TTS
@@ -49,6 +58,7 @@ class PiperTTS:
         Args:
             piper_path: Путь к директории с piper.exe и моделями
             output_base_path: Базовый путь для сохранения аудио файлов
+            pool: Пул процессов Piper, по умолчанию общий piper_pool
         """
         logger.info('Initializing PiperTTS')
         logger.info(f'Piper path: {piper_path}')
@@ -66,6 +76,7 @@ class PiperTTS:
             Path(output_base_path) if output_base_path else Path('static/audio')
         )
         self._ensure_directories()
+        self.pool = pool or piper_pool
 
         logger.info(
             f'PiperTTS initialized with base path: {self.output_base_path}'
@@ -117,17 +128,18 @@ class PiperTTS:
             logger.error(f'Error getting voice paths: {e}')
             raise
 
-    def get_audio_path(self, filename: str) -> Path:
+    def get_audio_path(self, filename: str, fmt: str = 'wav') -> Path:
         """
         Формирует путь для сохранения аудио файла
 
         Args:
             filename: Имя файла
+            fmt: Формат из AUDIO_FORMATS
 
         Returns:
             Path: Путь к аудио файлу
         """
-        return self.output_base_path / f'{filename}.wav'
+        return self.output_base_path / f'{filename}{AUDIO_FORMATS[fmt].extension}'
 
     def audio_exists(self, filename: str) -> bool:
         """
@@ -178,38 +190,44 @@ class PiperTTS:
             logger.info(f'Audio file already exists: {output_path}')
             return output_path
 
+        paths = self._get_voice_paths(voice)
+        # Без -f: файл задается в каждом задании процессу пула
+        args = (
+            str(self.piper_exe),
+            '-m',
+            str(paths['model']),
+            '-c',
+            str(paths['config']),
+            '--rate',
+            str(rate),
+        )
+
+        # Piper пишет во временный файл, os.replace атомарно подменяет
+        # готовый: читатель не увидит недописанный .wav
+        temp_path = output_path.with_name(f'{filename}.{uuid.uuid4().hex}.tmp')
         try:
-            paths = self._get_voice_paths(voice)
-
-            # Формируем команду
-            command = (
-                f'echo "{text}" | "{self.piper_exe}" '
-                f'-m "{paths["model"]}" '
-                f'-c "{paths["config"]}" '
-                f'--rate {rate} '
-                f'-f "{output_path}"'
-            )
-
-            logger.debug(f'Executing command: {command}')
-            process = subprocess.run(
-                command, shell=True, check=True, capture_output=True, text=True
-            )
-
-            if process.returncode == 0:
-                logger.info(f'Audio generated successfully: {output_path}')
-                return output_path
-
-            logger.error(f'Piper process failed: {process.stderr}')
-            raise AudioGenerationError(f'Piper process failed: {process.stderr}')
-
-        except subprocess.CalledProcessError as e:
-            error_msg = f'Error executing Piper: {e.stderr}'
+            await self.pool.synthesize(args, text, temp_path)
+            # Варианты прежнего текста удаляются до замены WAV: пока идет
+            # кодирование, отдается новый WAV, а не старый Opus/MP3
+            remove_variants(output_path)
+            os.replace(temp_path, output_path)
+        except PiperWorkerError as e:
+            metrics.inc('tts_synthesis_total', result='error')
+            error_msg = f'Error executing Piper: {e}'
             logger.error(error_msg)
             raise AudioGenerationError(error_msg)
-        except Exception as e:
-            error_msg = f'Unexpected error during audio generation: {e}'
+        except OSError as e:
+            metrics.inc('tts_synthesis_total', result='error')
+            error_msg = f'Failed to save audio file: {e}'
             logger.error(error_msg)
             raise AudioGenerationError(error_msg)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        metrics.inc('tts_synthesis_total', result='ok')
+        await encode_variants(output_path)
+
+        logger.info(f'Audio generated successfully: {output_path}')
+        return output_path
 
 
 # Example usage:
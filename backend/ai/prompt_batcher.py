@@ -0,0 +1,87 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Set, Tuple, Union
+
+from logger import setup_logger
+
+from backend.core.config import settings
+
+logger = setup_logger(__name__)
+
+# Выполнение пачки: (шаблон, промпты, приоритет) -> результат для каждого
+RunBatch = Callable[[str, List[str], int], Awaitable[List[Union[Dict, Exception]]]]
+
+
+class PromptBatcher:
+    """
+    Сбор одновременных запросов одного шаблона в пачку.
+
+    Первый запрос открывает окно в window секунд, запросы того же шаблона
+    и приоритета, пришедшие за это время, выполняются одним вызовом
+    run_batch. Пачка отправляется раньше, если набрано max_size запросов.
+    """
+
+    def __init__(
+        self,
+        run_batch: RunBatch,
+        window: float = settings.PROMPT_BATCH_WINDOW,
+        max_size: int = settings.PROMPT_BATCH_SIZE,
+    ):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_size = max_size
+        self._pending: Dict[Tuple[str, int], List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple[str, int], asyncio.TimerHandle] = {}
+        # Ссылки на запущенные пачки, чтобы их не собрал сборщик мусора
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, template_name: str, prompt: str, priority: int) -> Dict:
+        """Результат промпта, выполненного в составе пачки."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (template_name, priority)
+        batch = self._pending.setdefault(key, [])
+        batch.append((prompt, future))
+
+        if len(batch) >= self.max_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+
+        return await future
+
+    def _flush(self, key: Tuple[str, int]) -> None:
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            task = asyncio.create_task(self._run(key, batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(
+        self, key: Tuple[str, int], batch: List[Tuple[str, asyncio.Future]]
+    ) -> None:
+        template_name, priority = key
+        # Запросы, отмененные за время окна, не отправляем
+        batch = [(prompt, future) for prompt, future in batch if not future.done()]
+        if not batch:
+            return
+
+        try:
+            results = await self.run_batch(
+                template_name, [prompt for prompt, _ in batch], priority
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,138 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from logger import setup_logger
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+from backend.core.single_flight import SingleFlight
+from backend.core.task_store import task_store
+
+logger = setup_logger(__name__)
+
+KEY_PREFIX = 'prompt_cache:'
+
+
+def prompt_key(
+    template_name: str,
+    prompt: str,
+    model_name: str,
+    temperature: float,
+    top_p: float,
+) -> str:
+    """Ключ кэша: sha256 от шаблона, готового промпта и параметров модели."""
+    payload = json.dumps(
+        [template_name, prompt, model_name, temperature, top_p],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PromptCache:
+    """
+    Кэш результатов промптов по содержимому.
+
+    - LRU в памяти процесса (max_items записей)
+    - Redis с TTL, общий для воркеров
+    - Одновременные одинаковые запросы выполняются один раз
+
+    Значения хранятся как JSON строки: каждый вызывающий получает свою
+    копию и может ее изменять.
+    """
+
+    def __init__(
+        self,
+        max_items: int = settings.PROMPT_CACHE_MAX_ITEMS,
+        ttl: int = settings.PROMPT_CACHE_TTL,
+    ):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._flights = SingleFlight()
+
+    def _remember(self, key: str, raw: str) -> None:
+        self._memory[key] = raw
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    async def _lookup(self, template_name: str, key: str) -> Optional[str]:
+        raw = self._memory.get(key)
+        if raw is not None:
+            self._memory.move_to_end(key)
+            metrics.inc(
+                'prompt_cache_requests_total',
+                template=template_name,
+                tier='memory',
+            )
+            return raw
+
+        try:
+            raw = await task_store.redis.get(KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning(f'Prompt cache lookup failed: {e}')
+            raw = None
+        if raw is None:
+            return None
+
+        self._remember(key, raw)
+        metrics.inc(
+            'prompt_cache_requests_total', template=template_name, tier='redis'
+        )
+        return raw
+
+    async def get(self, template_name: str, key: str) -> Optional[Dict]:
+        """Результат из памяти или Redis, None при промахе."""
+        raw = await self._lookup(template_name, key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, result: Dict) -> str:
+        raw = json.dumps(result, ensure_ascii=False)
+        self._remember(key, raw)
+        try:
+            await task_store.redis.set(KEY_PREFIX + key, raw, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f'Prompt cache store failed: {e}')
+        return raw
+
+    async def get_or_generate(
+        self,
+        template_name: str,
+        key: str,
+        generate: Callable[[], Awaitable[Dict]],
+    ) -> Dict:
+        """
+        Результат из кэша или от generate.
+
+        При промахе generate выполняется один раз на процесс, даже если
+        одинаковый промпт запросили несколько раз одновременно.
+        """
+        raw = await self._lookup(template_name, key)
+        if raw is None:
+            if key in self._flights:
+                metrics.inc('prompt_cache_shared_total', template=template_name)
+            raw = await self._flights.do(
+                key, lambda: self._load(template_name, key, generate)
+            )
+        return json.loads(raw)
+
+    async def _load(
+        self,
+        template_name: str,
+        key: str,
+        generate: Callable[[], Awaitable[Dict]],
+    ) -> str:
+        metrics.inc(
+            'prompt_cache_requests_total', template=template_name, tier='miss'
+        )
+        return await self.set(key, await generate())
+
+    def clear(self) -> None:
+        """Очищает кэш в памяти (Redis не трогается)."""
+        self._memory.clear()
+
+
+# Глобальный кэш промптов
+prompt_cache = PromptCache()
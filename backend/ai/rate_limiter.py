@@ -0,0 +1,258 @@
+import asyncio
+import time
+import uuid
+from typing import Optional
+
+from logger import setup_logger
+
+from backend.core.metrics import metrics
+from backend.core.task_store import task_store
+
+logger = setup_logger(__name__)
+
+PRIORITY_HIGH = 0  # Пользователь ждет ответа
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2  # Фоновые задачи (прогрев, пакетная генерация)
+
+MAX_POLL_INTERVAL = 1.0  # Не дольше, чем LEASE_MS: ожидающий продлевает место
+LEASE_MS = 3000  # Место в очереди без продления освобождается
+MIN_QUEUE_POLL_MS = 50  # Не первый в очереди не опрашивает чаще
+REDIS_TIMEOUT = 1.0  # Дольше ответа Redis не ждем, переходим на локальный режим
+REDIS_RETRY_DELAY = 10.0  # Пауза перед повторной попыткой использовать Redis
+
+# Атомарный шаг ожидания: токен-бакет + очередь FIFO по приоритету.
+#
+# KEYS: бакет (hash tokens/ts/last), очередь (zset), аренды (hash), счетчик
+# ARGV: участник, приоритет, токенов в мс, емкость, мин. интервал (мс),
+#       первый вызов (1/0), TTL ключей (мс), аренда места (мс),
+#       минимальная пауза не первого в очереди (мс)
+#
+# Возвращает 0 - токен выдан, -1 - место в очереди потеряно,
+# иначе рекомендуемое время ожидания в мс.
+ACQUIRE_SCRIPT = """
+local bucket, queue, leases, counter = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local member = ARGV[1]
+local priority = tonumber(ARGV[2])
+local rate = tonumber(ARGV[3])
+local capacity = tonumber(ARGV[4])
+local interval = tonumber(ARGV[5])
+local first = ARGV[6] == '1'
+local ttl = tonumber(ARGV[7])
+local lease = tonumber(ARGV[8])
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+if first then
+    -- Приоритет важнее порядка прихода, внутри приоритета FIFO
+    local ticket = redis.call('INCR', counter)
+    redis.call('ZADD', queue, priority * 1e12 + ticket, member)
+elseif not redis.call('ZSCORE', queue, member) then
+    return -1
+end
+redis.call('HSET', leases, member, now + lease)
+
+-- Участники, переставшие продлевать место, не держат очередь
+while true do
+    local head = redis.call('ZRANGE', queue, 0, 0)[1]
+    if not head or head == member then
+        break
+    end
+    local expires = tonumber(redis.call('HGET', leases, head))
+    if expires and expires >= now then
+        break
+    end
+    redis.call('ZREM', queue, head)
+    redis.call('HDEL', leases, head)
+end
+
+for _, key in ipairs({bucket, queue, leases, counter}) do
+    redis.call('PEXPIRE', key, ttl)
+end
+
+local state = redis.call('HMGET', bucket, 'tokens', 'ts', 'last')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+local last = tonumber(state[3]) or 0
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+
+local wait = 0
+if tokens < 1 then
+    wait = math.ceil((1 - tokens) / rate)
+end
+wait = math.max(wait, last + interval - now)
+
+local rank = redis.call('ZRANK', queue, member)
+if rank > 0 then
+    -- Перед нами rank участников, каждому нужен свой токен
+    local period = math.max(math.ceil(1 / rate), interval)
+    local ahead = math.max(0, rank - math.floor(tokens))
+    return math.max(tonumber(ARGV[9]), wait + ahead * period)
+end
+if wait > 0 then
+    return wait
+end
+
+redis.call('HSET', bucket, 'tokens', tokens - 1, 'ts', now, 'last', now)
+redis.call('ZREM', queue, member)
+redis.call('HDEL', leases, member)
+return 0
+"""
+
+
+class RateLimitTimeout(Exception):
+    """Разрешение на запрос не получено за отведенное время."""
+
+
+class RateLimiter:
+    """
+    Ограничение запросов к модели, общее для всех воркеров.
+
+    Токен-бакет хранится в Redis и обновляется атомарным Lua скриптом:
+    - Скорость (requests_per_minute - burst) в минуту и запас burst, то
+      есть за любую минуту не больше requests_per_minute запросов
+    - Не чаще одного запроса в min_interval секунд
+    - Очередь ожидающих в порядке приоритета, внутри приоритета FIFO
+    - Ожидание дольше max_wait завершается RateLimitTimeout
+
+    Ожидающие не держат блокировок: каждый спит рекомендованное скриптом
+    время и повторяет попытку. Если Redis недоступен, используется
+    локальное расписание процесса.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 15,
+        min_interval: float = 1.0,
+        burst: int = 1,
+        max_wait: float = 60.0,
+        name: str = 'gemini',
+    ):
+        logger.info(
+            f'RateLimiter initialized: {requests_per_minute} rpm, '
+            f'{min_interval}s interval, burst {burst}'
+        )
+        self.requests_per_minute = requests_per_minute
+        self.min_interval = min_interval
+        self.burst = max(1, min(burst, requests_per_minute))
+        self.max_wait = max_wait
+        self.name = name
+
+        refill_per_minute = max(1, requests_per_minute - self.burst)
+        self._rate_per_ms = refill_per_minute / 60_000
+        self._keys = [
+            f'ratelimit:{name}:{suffix}'
+            for suffix in ('bucket', 'queue', 'leases', 'counter')
+        ]
+        self._script = task_store.redis.register_script(ACQUIRE_SCRIPT)
+        # Локальное расписание: время следующего свободного слота
+        self._next_slot = 0.0
+        self._redis_retry_at = 0.0
+
+    async def acquire(
+        self,
+        request_type: str,
+        priority: int = PRIORITY_NORMAL,
+        max_wait: Optional[float] = None,
+    ) -> None:
+        """
+        Ожидает разрешения на запрос.
+
+        Args:
+            request_type: Что запрашивается (для логов и метрик)
+            priority: Меньше - раньше, см. PRIORITY_*
+            max_wait: Максимальное ожидание в секундах
+
+        Raises:
+            RateLimitTimeout: Разрешение не получено за max_wait
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        started = time.monotonic()
+        try:
+            try:
+                if started < self._redis_retry_at:
+                    raise ConnectionError('Redis rate limiter is paused')
+                await self._acquire_redis(priority, started + max_wait)
+            except RateLimitTimeout:
+                raise
+            except Exception as e:
+                if started >= self._redis_retry_at:
+                    logger.warning(
+                        f'Redis rate limiter unavailable, local mode: {e!r}'
+                    )
+                    self._redis_retry_at = time.monotonic() + REDIS_RETRY_DELAY
+                await self._acquire_local(started + max_wait)
+        except RateLimitTimeout:
+            metrics.inc('rate_limit_timeouts_total', request_type=request_type)
+            logger.warning(
+                f'Rate limit wait exceeded {max_wait}s for {request_type}'
+            )
+            raise
+
+        waited = time.monotonic() - started
+        metrics.observe(
+            'rate_limit_wait_seconds', waited, request_type=request_type
+        )
+        if waited > 0.5:
+            logger.info(f'Rate limit delayed {request_type} by {waited:.2f}s')
+
+    def _args(self, member: str, priority: int, first: bool) -> list:
+        return [
+            member,
+            priority,
+            self._rate_per_ms,
+            self.burst,
+            int(self.min_interval * 1000),
+            1 if first else 0,
+            int((self.max_wait + 60) * 1000),
+            LEASE_MS,
+            MIN_QUEUE_POLL_MS,
+        ]
+
+    async def _acquire_redis(self, priority: int, deadline: float) -> None:
+        member = uuid.uuid4().hex
+        first = True
+        try:
+            while True:
+                wait_ms = await asyncio.wait_for(
+                    self._script(
+                        keys=self._keys, args=self._args(member, priority, first)
+                    ),
+                    REDIS_TIMEOUT,
+                )
+                if wait_ms == 0:
+                    member = None
+                    return
+                if wait_ms < 0:
+                    # Место потеряно (например, долгая пауза процесса)
+                    first = True
+                    continue
+                first = False
+
+                remaining = deadline - time.monotonic()
+                if wait_ms / 1000 > remaining:
+                    raise RateLimitTimeout(
+                        f'Rate limit wait exceeds {remaining:.1f}s'
+                    )
+                await asyncio.sleep(min(wait_ms / 1000, MAX_POLL_INTERVAL))
+        finally:
+            if member is not None and not first:
+                # Освобождаем место, не дожидаясь истечения аренды
+                try:
+                    await asyncio.wait_for(
+                        task_store.redis.zrem(self._keys[1], member), REDIS_TIMEOUT
+                    )
+                except Exception:
+                    pass
+
+    async def _acquire_local(self, deadline: float) -> None:
+        now = time.monotonic()
+        interval = max(self.min_interval, 60 / self.requests_per_minute)
+        slot = max(now, self._next_slot)
+        if slot > deadline:
+            raise RateLimitTimeout(
+                f'Rate limit wait exceeds {deadline - now:.1f}s'
+            )
+        # Резервирование без await атомарно в event loop, блокировка не нужна
+        self._next_slot = slot + interval
+        await asyncio.sleep(slot - now)
@@ -1,9 +1,11 @@
+from pathlib import Path
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.ai.audio_encoder import FORMAT_BY_EXTENSION, negotiate_format
 from backend.ai.piper_tts import TTSError
 from backend.api.deps import get_session
 from backend.core.exceptions import NotFoundError
@@ -19,18 +21,29 @@ async def get_audio_service(
     return AudioService(session)
 
 
+def audio_response(audio_path: Path, filename: str) -> FileResponse:
+    """Файл аудио с типом по расширению, ответ зависит от Accept."""
+    return FileResponse(
+        path=audio_path,
+        media_type=FORMAT_BY_EXTENSION[audio_path.suffix].media_type,
+        filename=filename,
+        headers={'Vary': 'Accept'},
+    )
+
+
 @router.get('/terms/{term_id}')
 async def get_term_audio(
     term_id: int,
     type: Optional[str] = None,
+    accept: Optional[str] = Header(None),
     audio_service: AudioService = Depends(get_audio_service),
 ):
     """Получение аудио для термина"""
     try:
-        audio_path, filename = await audio_service.get_term_audio(term_id, type)
-        return FileResponse(
-            path=audio_path, media_type='audio/wav', filename=filename
+        audio_path, filename = await audio_service.get_term_audio(
+            term_id, type, fmt=negotiate_format(accept)
         )
+        return audio_response(audio_path, filename)
     except NotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except TTSError as e:
@@ -43,14 +56,15 @@ async def get_term_audio(
 async def get_word_audio(
     word_id: int,
     type: Optional[str] = None,
+    accept: Optional[str] = Header(None),
     audio_service: AudioService = Depends(get_audio_service),
 ):
     """Получение аудио для слова"""
     try:
-        audio_path, filename = await audio_service.get_word_audio(word_id, type)
-        return FileResponse(
-            path=audio_path, media_type='audio/wav', filename=filename
+        audio_path, filename = await audio_service.get_word_audio(
+            word_id, type, fmt=negotiate_format(accept)
         )
+        return audio_response(audio_path, filename)
     except NotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except TTSError as e:
@@ -64,16 +78,15 @@ async def regenerate_audio(
     item_type: str,
     item_id: int,
     type: Optional[str] = None,
+    accept: Optional[str] = Header(None),
     audio_service: AudioService = Depends(get_audio_service),
 ):
     """Принудительная перегенерация аудио"""
     try:
         audio_path, filename = await audio_service.regenerate_audio(
-            item_type, item_id, type
-        )
-        return FileResponse(
-            path=audio_path, media_type='audio/wav', filename=filename
+            item_type, item_id, type, fmt=negotiate_format(accept)
         )
+        return audio_response(audio_path, filename)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except (NotFoundError, TTSError) as e:
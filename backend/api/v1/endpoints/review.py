@@ -0,0 +1,36 @@
+# backend/api/v1/endpoints/review.py
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.api.deps import get_current_user_id, get_session
+from backend.db.models import ItemType
+from backend.services.learning import ReviewQueueService
+
+from ..schemas.review import DueItemsPage
+
+router = APIRouter()
+
+
+@router.get('/due', response_model=DueItemsPage)
+async def get_due_items(
+    limit: int = Query(20, ge=1, le=100, description='Размер страницы'),
+    cursor: Optional[str] = Query(
+        None, description='Курсор next_cursor из предыдущего ответа'
+    ),
+    item_type: Optional[ItemType] = Query(
+        None, description='Только слова (word) или только термины (term)'
+    ),
+    current_user_id: int = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_session),
+):
+    """Очередь повторения: элементы с наступившей next_review_date"""
+    service = ReviewQueueService(session)
+    try:
+        return await service.get_due_page(
+            current_user_id, limit, cursor, item_type
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
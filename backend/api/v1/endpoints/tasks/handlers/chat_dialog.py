@@ -1,23 +1,34 @@
-import json
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from backend.db.orm import get_terms_for_learning, get_words_for_learning
+from backend.db.orm import (
+    get_terms_for_learning,
+    get_words_for_learning,
+    record_interactions,
+)
 from logger import setup_logger
-from sqlalchemy import String, func, select
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.ai.operations import ChatDialog
 from backend.api.v1.endpoints.tasks.base import BaseTaskHandler
 from backend.core.exceptions import ValidationError
+from backend.core.single_flight import DistributedSingleFlight
 from backend.db.models import (
     ChatDialogGenerated,
     ItemType,
     LearningAttempt,
     TaskType,
     TermORM,
-    UserWordStatus,
     WordORM,
 )
+from backend.services.srs import SrsService
+from backend.services.task_pool import (
+    find_pooled_task,
+    index_task_items,
+    record_task_items,
+    task_fingerprint,
+)
 
 logger = setup_logger(__name__)
 
@@ -28,37 +39,20 @@ class ChatDialogHandler(BaseTaskHandler):
     def __init__(self):
         super().__init__()
         self.operation = ChatDialog()
+        self.flight = DistributedSingleFlight('flight:chat_dialog')
 
     async def _find_existing_task(
-        self,
-        session: AsyncSession,
-        words: List[str],
-        terms: List[str],
-        difficulty: str,
+        self, session: AsyncSession, fingerprint: str
     ) -> Dict[str, Any] | None:
         """Поиск существующего задания с такими же параметрами."""
         try:
-            # Сортируем списки для обеспечения постоянного порядка
-            sorted_words = sorted(words) if words else []
-            sorted_terms = sorted(terms) if terms else []
-
-            # Выполняем поиск и берем самую свежую запись
-            stmt = (
-                select(ChatDialogGenerated)
-                .where(
-                    ChatDialogGenerated.words.cast(String)
-                    == json.dumps(sorted_words),
-                    ChatDialogGenerated.terms.cast(String)
-                    == json.dumps(sorted_terms),
-                    ChatDialogGenerated.difficulty == difficulty,
+            # Одно обращение к уникальному индексу по fingerprint
+            existing_task = await session.scalar(
+                select(ChatDialogGenerated).where(
+                    ChatDialogGenerated.fingerprint == fingerprint
                 )
-                .order_by(ChatDialogGenerated.created_at.desc())
-                .limit(1)
             )
 
-            result = await session.execute(stmt)
-            existing_task = result.scalar_one_or_none()
-
             if existing_task:
                 logger.info(
                     f'Found existing chat dialog task with ID: {existing_task.id}'
@@ -79,6 +73,7 @@ class ChatDialogHandler(BaseTaskHandler):
         words: List[str],
         terms: List[str],
         difficulty: str,
+        fingerprint: str,
         response: Dict[str, Any],
     ) -> None:
         """Сохранение сгенерированного задания в БД."""
@@ -87,15 +82,23 @@ class ChatDialogHandler(BaseTaskHandler):
             sorted_words = sorted(words) if words else []
             sorted_terms = sorted(terms) if terms else []
 
-            # Создаем новую запись
-            new_task = ChatDialogGenerated(
-                words=sorted_words,
-                terms=sorted_terms,
-                difficulty=difficulty,
-                response=response,
+            # Такое же задание мог сохранить другой воркер
+            task_id = await session.scalar(
+                pg_insert(ChatDialogGenerated)
+                .values(
+                    words=sorted_words,
+                    terms=sorted_terms,
+                    difficulty=difficulty,
+                    fingerprint=fingerprint,
+                    response=response,
+                )
+                .on_conflict_do_nothing(index_elements=['fingerprint'])
+                .returning(ChatDialogGenerated.id)
             )
-
-            session.add(new_task)
+            if task_id is not None:
+                await index_task_items(
+                    session, 'chat_dialog', task_id, sorted_words, sorted_terms
+                )
             # Убираем await session.commit() отсюда, так как коммит будет выполнен в контексте
 
             logger.info('Created new chat dialog task, waiting for commit')
@@ -104,91 +107,227 @@ class ChatDialogHandler(BaseTaskHandler):
             logger.error(f'Error saving chat dialog task: {e}', exc_info=True)
             raise
 
-    async def generate(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Генерация задания с диалогом."""
-        logger.debug(f'Generating chat dialog task with params: {params}')
-        try:
-            session: AsyncSession = params.get('session')
-            user_id: int = params.get('user_id')
-            messages_count: int = params.get('params', {}).get('messages_count', 3)
-            specific_terms: list = params.get('params', {}).get('terms', [])
-            specific_words: list = params.get('params', {}).get('words', [])
-            difficulty: str = params.get('difficulty', 'intermediate')
-            categories: list = params.get('params', {}).get('categories', [])
-
-            if not session:
-                raise ValidationError('Session is required')
-            if not user_id:
-                raise ValidationError('User ID is required')
-
-            # Если не указаны конкретные слова/термины, выбираем на основе критериев
-            if not specific_terms and not specific_words:
-                words = await get_words_for_learning(
-                    session=session,
-                    user_id=user_id,
-                    limit=3
+    @staticmethod
+    def _existing_response(response: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'type': 'chat_dialog',
+            'content': response.get('content'),
+            'metadata': response.get('metadata'),
+        }
+
+    @staticmethod
+    def _build_task(
+        result: Dict[str, Any],
+        specific_words: List[str],
+        specific_terms: List[str],
+    ) -> Dict[str, Any]:
+        return {
+            'type': 'chat_dialog',
+            'content': result,
+            'metadata': {
+                'used_terms': specific_terms,
+                'used_words': specific_words,
+                'difficulty_metrics': result.get('metrics', {}),
+            },
+        }
+
+    async def find_or_create_task(
+        self,
+        session: AsyncSession,
+        specific_words: List[str],
+        specific_terms: List[str],
+        difficulty: str,
+        messages_count: int,
+        priority: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Существующее задание с такими параметрами или новое от модели."""
+        fingerprint = task_fingerprint(specific_words, specific_terms, difficulty)
+
+        # Проверяем есть ли уже сгенерированное задание
+        existing_task = await self._find_existing_task(session, fingerprint)
+
+        logger.info(f'Existing task: {existing_task}')
+
+        if existing_task:
+            logger.info('Using existing chat dialog task')
+            return self._existing_response(existing_task)
+
+        # Если существующего задания нет, генерируем новое
+        ai_params = {
+            'messages_count': messages_count,
+            'terms': specific_terms,
+            'words': specific_words,
+            'difficulty': difficulty,
+        }
+
+        result = await self.operation.execute(ai_params, priority=priority)
+
+        # Создаем задание
+        task = self._build_task(result, specific_words, specific_terms)
+
+        # Сохраняем сгенерированное задание
+        await self._save_generated_task(
+            session, specific_words, specific_terms, difficulty, fingerprint, task
+        )
+
+        # Коммитим изменения здесь
+        await session.commit()
+
+        logger.info('Generated and saved new chat dialog task')
+        return task
+
+    async def _prepare(
+        self, params: Dict[str, Any]
+    ) -> Tuple[List[str], List[str], str, int, Optional[Dict[str, Any]]]:
+        """
+        Параметры генерации: слова, термины, сложность, число сообщений.
+
+        Если слова и термины не указаны, они выбираются для пользователя,
+        и последним элементом возвращается готовое задание из пула, если
+        оно подходит (иначе None).
+        """
+        session: AsyncSession = params.get('session')
+        user_id: int = params.get('user_id')
+        messages_count: int = params.get('params', {}).get('messages_count', 3)
+        specific_terms: list = params.get('params', {}).get('terms', [])
+        specific_words: list = params.get('params', {}).get('words', [])
+        difficulty: str = params.get('difficulty', 'intermediate')
+        categories: list = params.get('params', {}).get('categories', [])
+
+        if not session:
+            raise ValidationError('Session is required')
+        if not user_id:
+            raise ValidationError('User ID is required')
+
+        # Если не указаны конкретные слова/термины, выбираем на основе критериев
+        if not specific_terms and not specific_words:
+            words = await get_words_for_learning(
+                session=session, user_id=user_id, limit=3, record=False
+            )
+            terms = await get_terms_for_learning(
+                session=session, user_id=user_id, limit=3, record=False
+            )
+            specific_words = [word.word for word in words]
+            specific_terms = [term.term for term in terms]
+
+            # Готовое задание, ближе всего к элементам пользователя
+            pooled = await find_pooled_task(
+                session,
+                ChatDialogGenerated,
+                'chat_dialog',
+                difficulty,
+                specific_words,
+                specific_terms,
+            )
+            if pooled:
+                await record_task_items(
+                    session, user_id, pooled.words, pooled.terms
                 )
-                terms = await get_terms_for_learning(
-                    session=session,
-                    user_id=user_id,
-                    limit=3
+                return (
+                    specific_words,
+                    specific_terms,
+                    difficulty,
+                    messages_count,
+                    self._existing_response(pooled.response),
                 )
-                specific_words = [word.word for word in words]
-                specific_terms = [term.term for term in terms]
 
-            # Проверяем есть ли уже сгенерированное задание
-            existing_task = await self._find_existing_task(
-                session, specific_words, specific_terms, difficulty
+            # Одна запись взаимодействия на слова и термины вместе
+            await record_interactions(
+                session,
+                user_id,
+                [(word.id, ItemType.WORD) for word in words]
+                + [(term.id, ItemType.TERM) for term in terms],
             )
 
-            logger.info(f'Existing task: {existing_task}')
+        return specific_words, specific_terms, difficulty, messages_count, None
 
-            if existing_task:
-                logger.info('Using existing chat dialog task')
-                return {
-                    'type': 'chat_dialog',
-                    'content': existing_task.get('content'),
-                    'metadata': existing_task.get('metadata'),
-                }
-
-            # Если существующего задания нет, генерируем новое
-            ai_params = {
-                'messages_count': messages_count,
-                'terms': specific_terms,
-                'words': specific_words,
-                'difficulty': difficulty,
-            }
-
-            result = await self.operation.execute(ai_params)
-
-            # Создаем задание
-            task = {
-                'type': 'chat_dialog',
-                'content': result,
-                'metadata': {
-                    'used_terms': specific_terms,
-                    'used_words': specific_words,
-                    'difficulty_metrics': result.get('metrics', {}),
-                },
-            }
-
-            # Сохраняем сгенерированное задание
-            await self._save_generated_task(
-                session, specific_words, specific_terms, difficulty, task
+    async def generate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Генерация задания с диалогом."""
+        logger.debug(f'Generating chat dialog task with params: {params}')
+        session: AsyncSession = params.get('session')
+        try:
+            (
+                specific_words,
+                specific_terms,
+                difficulty,
+                messages_count,
+                pooled_task,
+            ) = await self._prepare(params)
+            if pooled_task:
+                return pooled_task
+
+            # Одновременные запросы с теми же параметрами генерируют одно задание
+            key = task_fingerprint(specific_words, specific_terms, difficulty)
+            return await self.flight.do(
+                key,
+                lambda: self.find_or_create_task(
+                    session,
+                    specific_words,
+                    specific_terms,
+                    difficulty,
+                    messages_count,
+                ),
             )
 
-            # Коммитим изменения здесь
-            await session.commit()
-
-            logger.info('Generated and saved new chat dialog task')
-            return task
-
         except Exception as e:
             logger.error(f'Error generating chat dialog task: {e}', exc_info=True)
             # В случае ошибки делаем rollback
-            await session.rollback()
+            if session:
+                await session.rollback()
             raise ValidationError(f'Error generating chat dialog task: {str(e)}')
 
+    async def stream(
+        self, params: Dict[str, Any]
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Генерация задания с выдачей сообщений по мере ответа модели.
+
+        Отдает ('message', сообщение) для каждого готового сообщения и
+        в конце ('task', задание) как у generate. Задание из пула или с
+        теми же параметрами отдается сразу.
+        """
+        session: AsyncSession = params.get('session')
+        (
+            specific_words,
+            specific_terms,
+            difficulty,
+            messages_count,
+            task,
+        ) = await self._prepare(params)
+
+        fingerprint = task_fingerprint(specific_words, specific_terms, difficulty)
+        if task is None:
+            existing_task = await self._find_existing_task(session, fingerprint)
+            if existing_task:
+                task = self._existing_response(existing_task)
+
+        if task is not None:
+            for message in (task.get('content') or {}).get('messages') or []:
+                yield 'message', message
+            yield 'task', task
+            return
+
+        ai_params = {
+            'messages_count': messages_count,
+            'terms': specific_terms,
+            'words': specific_words,
+            'difficulty': difficulty,
+        }
+        result = None
+        async for event, data in self.operation.stream(ai_params):
+            if event == 'item':
+                yield 'message', data
+            else:
+                result = data
+
+        task = self._build_task(result, specific_words, specific_terms)
+        await self._save_generated_task(
+            session, specific_words, specific_terms, difficulty, fingerprint, task
+        )
+        await session.commit()
+        logger.info('Streamed and saved new chat dialog task')
+        yield 'task', task
+
     async def validate(self, task_id: str, answer: Dict[str, Any]) -> bool:
         """Проверка ответов на задание."""
         session: AsyncSession = answer['session']
@@ -222,42 +361,15 @@ class ChatDialogHandler(BaseTaskHandler):
         )
         session.add(attempt)
 
-        # Обновляем статистику для каждого использованного термина/слова
-        for word_id in answer.get('used_items', []):
-            item_type = answer.get('item_types', {}).get(str(word_id))
+        # Обновляем SRS статусы использованных терминов/слов
+        reviews = []
+        for item_id in answer.get('used_items', []):
+            item_type = answer.get('item_types', {}).get(str(item_id))
             if not item_type:
                 continue
+            reviews.append((item_id, ItemType(item_type), score))
 
-            status = await session.execute(
-                select(UserWordStatus).where(
-                    UserWordStatus.user_id == user_id,
-                    UserWordStatus.item_id == word_id,
-                    UserWordStatus.item_type == ItemType(item_type),
-                )
-            )
-            word_status = status.scalar_one_or_none()
-
-            if word_status:
-                if is_successful:
-                    word_status.mastery_level = min(
-                        100, word_status.mastery_level + 5
-                    )
-                    word_status.ease_factor = min(
-                        3.0, word_status.ease_factor + 0.05
-                    )
-                else:
-                    word_status.ease_factor = max(
-                        1.3, word_status.ease_factor - 0.1
-                    )
-            else:
-                word_status = UserWordStatus(
-                    user_id=user_id,
-                    item_id=word_id,
-                    item_type=ItemType(item_type),
-                    mastery_level=5.0 if is_successful else 0.0,
-                    ease_factor=2.5,
-                )
-                session.add(word_status)
+        await SrsService(session).apply_reviews(user_id, reviews)
 
         await session.commit()
         return is_successful
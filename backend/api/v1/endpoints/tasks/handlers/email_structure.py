@@ -1,28 +1,38 @@
 # backend/api/v1/endpoints/tasks/handlers/email_structure.py
 
-import json
 import random
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from logger import setup_logger
-from sqlalchemy import String, select
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.ai.operations import EmailStructure  # Нужно будет создать
 from backend.api.v1.endpoints.tasks.base import BaseTaskHandler
 from backend.core.exceptions import ValidationError
+from backend.core.single_flight import DistributedSingleFlight
 from backend.db.models import (
     DifficultyLevel,
     EmailStructureGenerated,
     ItemType,
     LearningAttempt,
     TaskType,
-    TermORM,
     UserORM,
-    UserWordStatus,
-    WordORM,
 )
-from backend.db.orm import get_terms_for_learning, get_words_for_learning
+from backend.db.orm import (
+    find_item_ids,
+    get_terms_for_learning,
+    get_words_for_learning,
+    record_interactions,
+)
+from backend.services.srs import SrsService
+from backend.services.task_pool import (
+    find_pooled_task,
+    index_task_items,
+    record_task_items,
+    task_fingerprint,
+)
 
 logger = setup_logger(__name__)
 
@@ -43,24 +53,32 @@ class EmailStructureHandler(BaseTaskHandler):
     def __init__(self):
         super().__init__()
         self.operation = EmailStructure()
+        self.flight = DistributedSingleFlight('flight:email_structure')
 
-    async def _get_random_terms(
-        self, session: AsyncSession, user_id: int, count: int = 3
-    ) -> List[str]:
-        """Получение случайных технических терминов."""
+    async def _get_random_items(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        terms_count: int = 3,
+        words_count: int = 3,
+        record: bool = True,
+    ) -> Tuple[List[str], List[str]]:
+        """Получение случайных технических терминов и бизнес-слов."""
         terms = await get_terms_for_learning(
-            session=session, user_id=user_id, limit=count
+            session=session, user_id=user_id, limit=terms_count, record=False
         )
-        return [term.term for term in terms]
-
-    async def _get_random_words(
-        self, session: AsyncSession, user_id: int, count: int = 3
-    ) -> List[str]:
-        """Получение случайных бизнес-слов."""
         words = await get_words_for_learning(
-            session=session, user_id=user_id, limit=count
+            session=session, user_id=user_id, limit=words_count, record=False
         )
-        return [word.word for word in words]
+        if record:
+            # Одна запись взаимодействия на слова и термины вместе
+            await record_interactions(
+                session,
+                user_id,
+                [(term.id, ItemType.TERM) for term in terms]
+                + [(word.id, ItemType.WORD) for word in words],
+            )
+        return [term.term for term in terms], [word.word for word in words]
 
     async def _get_user_difficulty(
         self, session: AsyncSession, user_id: int
@@ -80,39 +98,17 @@ class EmailStructureHandler(BaseTaskHandler):
         return self.DIFFICULTY_MAPPING.get(user.current_level, 'intermediate')
 
     async def _find_existing_task(
-        self,
-        session: AsyncSession,
-        words: List[str],
-        terms: List[str],
-        style: str,
-        topic: str,
-        difficulty: str,
+        self, session: AsyncSession, fingerprint: str
     ) -> Dict[str, Any] | None:
         """Поиск существующего задания с такими же параметрами."""
         try:
-            # Сортируем списки для обеспечения постоянного порядка
-            sorted_words = sorted(words) if words else []
-            sorted_terms = sorted(terms) if terms else []
-
-            # Ищем задание с такими же параметрами, берем самое свежее
-            query = (
-                select(EmailStructureGenerated)
-                .where(
-                    EmailStructureGenerated.words.cast(String)
-                    == json.dumps(sorted_words),
-                    EmailStructureGenerated.terms.cast(String)
-                    == json.dumps(sorted_terms),
-                    EmailStructureGenerated.style == style,
-                    EmailStructureGenerated.topic == topic,
-                    EmailStructureGenerated.difficulty == difficulty,
+            # Одно обращение к уникальному индексу по fingerprint
+            existing_task = await session.scalar(
+                select(EmailStructureGenerated).where(
+                    EmailStructureGenerated.fingerprint == fingerprint
                 )
-                .order_by(EmailStructureGenerated.created_at.desc())
-                .limit(1)
             )
 
-            result = await session.execute(query)
-            existing_task = result.scalar_one_or_none()
-
             if existing_task:
                 logger.info(
                     f'Found existing email structure task with ID: {existing_task.id}'
@@ -135,6 +131,7 @@ class EmailStructureHandler(BaseTaskHandler):
         style: str,
         topic: str,
         difficulty: str,
+        fingerprint: str,
         response: Dict[str, Any],
     ) -> None:
         """Сохранение сгенерированного задания в БД."""
@@ -143,17 +140,25 @@ class EmailStructureHandler(BaseTaskHandler):
             sorted_words = sorted(words) if words else []
             sorted_terms = sorted(terms) if terms else []
 
-            # Создаем новую запись
-            new_task = EmailStructureGenerated(
-                words=sorted_words,
-                terms=sorted_terms,
-                style=style,
-                topic=topic,
-                difficulty=difficulty,
-                response=response,
+            # Такое же задание мог сохранить другой воркер
+            task_id = await session.scalar(
+                pg_insert(EmailStructureGenerated)
+                .values(
+                    words=sorted_words,
+                    terms=sorted_terms,
+                    style=style,
+                    topic=topic,
+                    difficulty=difficulty,
+                    fingerprint=fingerprint,
+                    response=response,
+                )
+                .on_conflict_do_nothing(index_elements=['fingerprint'])
+                .returning(EmailStructureGenerated.id)
             )
-
-            session.add(new_task)
+            if task_id is not None:
+                await index_task_items(
+                    session, 'email_structure', task_id, sorted_words, sorted_terms
+                )
             await session.commit()
 
             logger.info('Created new chat dialog task, waiting for commit')
@@ -163,6 +168,62 @@ class EmailStructureHandler(BaseTaskHandler):
             await session.rollback()
             raise
 
+    async def find_or_create_task(
+        self,
+        session: AsyncSession,
+        words: List[str],
+        terms: List[str],
+        style: str,
+        topic: str,
+        difficulty: str,
+        priority: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Существующее задание с такими параметрами или новое от модели."""
+        fingerprint = task_fingerprint(words, terms, difficulty, style, topic)
+
+        # Проверяем есть ли уже сгенерированное задание
+        existing_task = await self._find_existing_task(session, fingerprint)
+
+        if existing_task:
+            logger.info('Using existing email structure task')
+            return {
+                'type': 'email_structure',
+                'content': existing_task.get('content'),
+                'metadata': existing_task.get('metadata'),
+            }
+
+        # Если существующего задания нет, генерируем новое
+        ai_params = {
+            'style': style,
+            'difficulty': difficulty,
+            'topic': topic,
+            'terms': terms,
+            'words': words,
+        }
+
+        result = await self.operation.execute(ai_params, priority=priority)
+
+        # Создаем задание
+        task = {
+            'type': 'email_structure',
+            'content': result,
+            'metadata': {
+                'style': style,
+                'topic': topic,
+                'used_terms': terms,
+                'used_words': words,
+                'difficulty_metrics': result.get('metrics', {}),
+            },
+        }
+
+        # Сохраняем сгенерированное задание
+        await self._save_generated_task(
+            session, words, terms, style, topic, difficulty, fingerprint, task
+        )
+
+        logger.info('Generated and saved new email structure task')
+        return task
+
     async def generate(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Генерация задания на составление email."""
         logger.debug(f'Generating email structure task with params: {params}')
@@ -191,59 +252,52 @@ class EmailStructureHandler(BaseTaskHandler):
 
             # Если оба списка пустые, только тогда генерируем случайные
             if not terms and not words:
-                terms = await self._get_random_terms(session, user_id, count=2)
-                words = await self._get_random_words(session, user_id, count=3)
+                terms, words = await self._get_random_items(
+                    session, user_id, terms_count=2, words_count=3, record=False
+                )
+
+                # Готовое задание, ближе всего к элементам пользователя.
+                # Стиль и тема ограничивают выбор, только если их указали
+                filters = []
+                if params_dict.get('style'):
+                    filters.append(EmailStructureGenerated.style == style)
+                if params_dict.get('topic'):
+                    filters.append(EmailStructureGenerated.topic == topic)
+                pooled = await find_pooled_task(
+                    session,
+                    EmailStructureGenerated,
+                    'email_structure',
+                    difficulty,
+                    words,
+                    terms,
+                    filters,
+                )
+                if pooled:
+                    await record_task_items(
+                        session, user_id, pooled.words, pooled.terms
+                    )
+                    return {
+                        'type': 'email_structure',
+                        'content': pooled.response.get('content'),
+                        'metadata': pooled.response.get('metadata'),
+                    }
+
+                await record_task_items(session, user_id, words, terms)
 
             logger.info(
                 f'Using parameters: style={style}, topic={topic}, difficulty={difficulty}, '
                 f'terms={terms}, words={words}'
             )
 
-            # Проверяем есть ли уже сгенерированное задание
-            existing_task = await self._find_existing_task(
-                session, words, terms, style, topic, difficulty
-            )
-
-            if existing_task:
-                logger.info('Using existing email structure task')
-                return {
-                    'type': 'email_structure',
-                    'content': existing_task.get('content'),
-                    'metadata': existing_task.get('metadata'),
-                }
-
-            # Если существующего задания нет, генерируем новое
-            ai_params = {
-                'style': style,
-                'difficulty': difficulty,
-                'topic': topic,
-                'terms': terms,
-                'words': words,
-            }
-
-            result = await self.operation.execute(ai_params)
-
-            # Создаем задание
-            task = {
-                'type': 'email_structure',
-                'content': result,
-                'metadata': {
-                    'style': style,
-                    'topic': topic,
-                    'used_terms': terms,
-                    'used_words': words,
-                    'difficulty_metrics': result.get('metrics', {}),
-                },
-            }
-
-            # Сохраняем сгенерированное задание
-            await self._save_generated_task(
-                session, words, terms, style, topic, difficulty, task
+            # Одновременные запросы с теми же параметрами генерируют одно задание
+            key = task_fingerprint(words, terms, difficulty, style, topic)
+            return await self.flight.do(
+                key,
+                lambda: self.find_or_create_task(
+                    session, words, terms, style, topic, difficulty
+                ),
             )
 
-            logger.info('Generated and saved new email structure task')
-            return task
-
         except Exception as e:
             logger.error(
                 f'Error generating email structure task: {e}', exc_info=True
@@ -286,22 +340,19 @@ class EmailStructureHandler(BaseTaskHandler):
         first_word_or_term = None
         first_type = None
 
+        word_ids = await find_item_ids(session, ItemType.WORD, words or [])
+        term_ids = await find_item_ids(session, ItemType.TERM, terms or [])
+
         if words:
-            first_word = await session.execute(
-                select(WordORM).filter(WordORM.word == words[0]).limit(1)
-            )
-            first_word = first_word.scalar_one_or_none()
+            first_word = await find_item_ids(session, ItemType.WORD, words[:1])
             if first_word:
-                first_word_or_term = first_word.id
+                first_word_or_term = first_word[0]
                 first_type = ItemType.WORD
 
         if not first_word_or_term and terms:
-            first_term = await session.execute(
-                select(TermORM).filter(TermORM.term == terms[0]).limit(1)
-            )
-            first_term = first_term.scalar_one_or_none()
+            first_term = await find_item_ids(session, ItemType.TERM, terms[:1])
             if first_term:
-                first_word_or_term = first_term.id
+                first_word_or_term = first_term[0]
                 first_type = ItemType.TERM
 
         # Создаем запись попытки
@@ -317,75 +368,11 @@ class EmailStructureHandler(BaseTaskHandler):
         )
         session.add(attempt)
 
-        # Обновляем статистику для слов
-        if words:
-            word_records = await session.execute(
-                select(WordORM).filter(WordORM.word.in_(words))
-            )
-            word_records = word_records.scalars().all()
-
-            for word_record in word_records:
-                status = await session.execute(
-                    select(UserWordStatus).where(
-                        UserWordStatus.user_id == user_id,
-                        UserWordStatus.item_id == word_record.id,
-                        UserWordStatus.item_type == ItemType.WORD,
-                    )
-                )
-                word_status = status.scalar_one_or_none()
-                await self._update_word_status(
-                    session,
-                    word_status,
-                    word_record.id,
-                    user_id,
-                    is_successful,
-                    ItemType.WORD,
-                )
+        # Обновляем SRS статусы слов и терминов задания
+        reviews = [(item_id, ItemType.WORD, score) for item_id in word_ids]
+        reviews += [(item_id, ItemType.TERM, score) for item_id in term_ids]
 
-        # Обновляем статистику для терминов
-        if terms:
-            term_records = await session.execute(
-                select(TermORM).filter(TermORM.term.in_(terms))
-            )
-            term_records = term_records.scalars().all()
-
-            for term_record in term_records:
-                status = await session.execute(
-                    select(UserWordStatus).where(
-                        UserWordStatus.user_id == user_id,
-                        UserWordStatus.item_id == term_record.id,
-                        UserWordStatus.item_type == ItemType.TERM,
-                    )
-                )
-                term_status = status.scalar_one_or_none()
-                await self._update_word_status(
-                    session,
-                    term_status,
-                    term_record.id,
-                    user_id,
-                    is_successful,
-                    ItemType.TERM,
-                )
+        await SrsService(session).apply_reviews(user_id, reviews)
 
         await session.commit()
         return is_successful
-
-    async def _update_word_status(
-        self, session, status, item_id, user_id, is_successful, item_type
-    ):
-        """Вспомогательная функция для обновления статуса слова/термина"""
-        if status:
-            if is_successful:
-                status.mastery_level = min(100, status.mastery_level + 5)
-                status.ease_factor = min(3.0, status.ease_factor + 0.05)
-            else:
-                status.ease_factor = max(1.3, status.ease_factor - 0.1)
-        else:
-            new_status = UserWordStatus(
-                user_id=user_id,
-                item_id=item_id,
-                item_type=item_type,
-                mastery_level=5.0 if is_successful else 0.0,
-                ease_factor=2.5,
-            )
-            session.add(new_status)
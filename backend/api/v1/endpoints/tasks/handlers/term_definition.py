@@ -4,7 +4,6 @@ import random
 from typing import Any, Dict
 
 from logger import setup_logger
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.api.v1.endpoints.tasks.base import BaseTaskHandler
@@ -13,10 +12,14 @@ from backend.db.models import (
     ItemType,
     LearningAttempt,
     TaskType,
-    TermORM,
-    UserWordStatus,
 )
-from backend.db.orm import get_terms_for_learning
+from backend.db.orm import (
+    get_distractors,
+    get_learning_item,
+    get_terms_for_learning,
+)
+from backend.services.prefetch import learning_prefetcher
+from backend.services.srs import SrsService
 
 logger = setup_logger(__name__)
 
@@ -37,38 +40,42 @@ class TermDefinitionTaskHandler(BaseTaskHandler):
             if not user_id:
                 raise ValidationError('User ID is required')
 
-            # Получаем все термины для задания
-            all_terms = await get_terms_for_learning(
-                session=session,
-                user_id=user_id,
-                limit=4,  # Получаем 4 термина (1 правильный + 3 неправильных)
-                category=category,
-            )
+            # Без категории термин можно взять из готового набора
+            prefetched = None
+            if not category:
+                prefetched = await learning_prefetcher.take(
+                    session, user_id, 'term_definition'
+                )
+
+            if prefetched:
+                _, terms = prefetched
+            else:
+                terms = await get_terms_for_learning(
+                    session=session, user_id=user_id, limit=1, category=category
+                )
 
-            if not all_terms:
+            if not terms:
                 # Если с указанной категорией не нашли, пробуем без категории
-                all_terms = await get_terms_for_learning(
-                    session=session, user_id=user_id, limit=4
+                terms = await get_terms_for_learning(
+                    session=session, user_id=user_id, limit=1
                 )
 
-                if not all_terms:
+                if not terms:
                     raise ValidationError('No terms available')
 
-            # Берем первый термин как правильный ответ
-            term = all_terms[0]
+            # Берем термин как правильный ответ
+            term = terms[0]
 
-            # Формируем варианты ответов из оставшихся терминов
-            options = []
-
-            # Добавляем неправильные варианты
-            for wrong_term in all_terms[1:]:
-                options.append(
-                    {
-                        'id': wrong_term.id,
-                        'term': wrong_term.term,
-                        'translation': wrong_term.primary_translation,
-                    }
-                )
+            # Неправильные варианты: похожие термины той же категории
+            distractors = await get_distractors(session, ItemType.TERM, term, 3)
+            options = [
+                {
+                    'id': wrong_term.id,
+                    'term': wrong_term.term,
+                    'translation': wrong_term.primary_translation,
+                }
+                for wrong_term in distractors
+            ]
 
             # Добавляем правильный вариант
             options.append(
@@ -119,7 +126,7 @@ class TermDefinitionTaskHandler(BaseTaskHandler):
             raise ValidationError('Invalid answer format')
 
         # Получаем термин
-        term = await session.get(TermORM, user_answer_id)
+        term = await get_learning_item(session, ItemType.TERM, user_answer_id)
         if not term:
             raise ValidationError('Term not found')
 
@@ -137,33 +144,10 @@ class TermDefinitionTaskHandler(BaseTaskHandler):
         )
         session.add(attempt)
 
-        # Обновляем статистику термина для пользователя
-        status = await session.execute(
-            select(UserWordStatus).where(
-                UserWordStatus.user_id == user_id,
-                UserWordStatus.item_id == term.id,
-                UserWordStatus.item_type == ItemType.TERM,
-            )
+        # Обновляем SRS статус термина для пользователя
+        await SrsService(session).apply_reviews(
+            user_id, [(term.id, ItemType.TERM, attempt.score)]
         )
-        term_status = status.scalar_one_or_none()
-
-        if term_status:
-            if is_correct:
-                term_status.mastery_level = min(
-                    100, term_status.mastery_level + 10
-                )
-                term_status.ease_factor = min(3.0, term_status.ease_factor + 0.1)
-            else:
-                term_status.ease_factor = max(1.3, term_status.ease_factor - 0.2)
-        else:
-            term_status = UserWordStatus(
-                user_id=user_id,
-                item_id=term.id,
-                item_type=ItemType.TERM,
-                mastery_level=10.0 if is_correct else 0.0,
-                ease_factor=2.5,
-            )
-            session.add(term_status)
 
         await session.commit()
         return is_correct
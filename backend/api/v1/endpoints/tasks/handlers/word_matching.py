@@ -2,20 +2,15 @@
 
 from typing import Any, Dict, List
 
-from backend.db.orm import get_words_for_learning
+from backend.db.orm import get_words_for_learning, record_attempts
 from logger import setup_logger
-from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.api.v1.endpoints.tasks.base import BaseTaskHandler
 from backend.core.exceptions import ValidationError
-from backend.db.models import (
-    ItemType,
-    LearningAttempt,
-    TaskType,
-    UserWordStatus,
-    WordORM,
-)
+from backend.db.models import ItemType, TaskType
+from backend.services.prefetch import learning_prefetcher
+from backend.services.srs import SrsService
 
 logger = setup_logger(__name__)
 
@@ -37,12 +32,16 @@ class WordMatchingTaskHandler(BaseTaskHandler):
 
             words_count = 15
 
-            # Получаем слова через новый метод
-            words = await get_words_for_learning(
-                session=session,
-                user_id=user_id,
-                limit=words_count
+            prefetched = await learning_prefetcher.take(
+                session, user_id, 'word_matching', words_count
             )
+            if prefetched:
+                _, words = prefetched
+            else:
+                # Получаем слова через новый метод
+                words = await get_words_for_learning(
+                    session=session, user_id=user_id, limit=words_count
+                )
 
             if len(words) < words_count:
                 raise ValidationError('Not enough words available')
@@ -119,8 +118,9 @@ class WordMatchingTaskHandler(BaseTaskHandler):
         correct_count = 0
         total_pairs = len(correct_pairs)
         words_stats = {}
+        results = []
 
-        # Анализ попыток сопоставления
+        # Анализ попыток сопоставления (в памяти, без обращений к БД)
         for word_id, translation in user_pairs.items():
             is_correct = correct_pairs.get(word_id) == translation.lower()
             if is_correct:
@@ -131,6 +131,9 @@ class WordMatchingTaskHandler(BaseTaskHandler):
                 'wrong_attempts': 0,
                 'is_correct': is_correct,
             }
+            results.append(
+                (int(word_id), ItemType.WORD, 1.0 if is_correct else 0.0)
+            )
 
         # Анализ неправильных попыток
         for attempt in wrong_attempts:
@@ -142,51 +145,9 @@ class WordMatchingTaskHandler(BaseTaskHandler):
         # Расчет точности
         accuracy = correct_count / total_pairs if total_pairs > 0 else 0
 
-        # Создаем записи о попытках для каждого слова
-        for word_id, translation in user_pairs.items():
-            is_correct = correct_pairs.get(word_id) == translation.lower()
-
-            attempt = LearningAttempt(
-                user_id=user_id,
-                item_id=int(word_id),
-                item_type=ItemType.WORD,
-                task_type=TaskType.WORD_MATCHING,
-                is_successful=is_correct,
-                score=1.0 if is_correct else 0.0,
-            )
-            session.add(attempt)
-
-            # Обновляем статистику для каждого слова
-            status = await session.execute(
-                select(UserWordStatus).where(
-                    UserWordStatus.user_id == user_id,
-                    UserWordStatus.item_id == int(word_id),
-                    UserWordStatus.item_type == ItemType.WORD,
-                )
-            )
-            word_status = status.scalar_one_or_none()
-
-            if word_status:
-                if is_correct:
-                    word_status.mastery_level = min(
-                        100, word_status.mastery_level + 5
-                    )
-                    word_status.ease_factor = min(
-                        3.0, word_status.ease_factor + 0.05
-                    )
-                else:
-                    word_status.ease_factor = max(
-                        1.3, word_status.ease_factor - 0.1
-                    )
-            else:
-                word_status = UserWordStatus(
-                    user_id=user_id,
-                    item_id=int(word_id),
-                    item_type=ItemType.WORD,
-                    mastery_level=5.0 if is_correct else 0.0,
-                    ease_factor=2.5,
-                )
-                session.add(word_status)
+        # Попытки по всем словам одним INSERT, статусы одним чтением и одним upsert
+        await record_attempts(session, user_id, TaskType.WORD_MATCHING, results)
+        await SrsService(session).apply_reviews(user_id, results)
 
         await session.commit()
 
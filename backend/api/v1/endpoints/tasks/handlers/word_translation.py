@@ -4,7 +4,6 @@ import random
 from typing import Any, Dict
 
 from logger import setup_logger
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.api.v1.endpoints.tasks.base import BaseTaskHandler
@@ -13,11 +12,15 @@ from backend.db.models import (
     ItemType,
     LearningAttempt,
     TaskType,
-    UserWordStatus,
-    WordORM,
     WordType,
 )
-from backend.db.orm import get_words_for_learning
+from backend.db.orm import (
+    get_distractors,
+    get_learning_item,
+    get_words_for_learning,
+)
+from backend.services.prefetch import learning_prefetcher
+from backend.services.srs import SrsService
 
 logger = setup_logger(__name__)
 
@@ -41,7 +44,16 @@ class WordTranslationTaskHandler(BaseTaskHandler):
             if not user_id:
                 raise ValidationError('User ID is required')
 
+            # Без явного word_type слово можно взять из готового набора
+            prefetched = None
             if not word_type:
+                prefetched = await learning_prefetcher.take(
+                    session, user_id, 'word_translation'
+                )
+
+            if prefetched:
+                word_type, words = prefetched
+            elif not word_type:
                 word_type = random.choice(list(WordType)).name
 
             if word_type.upper() not in [wordType.value for wordType in WordType]:
@@ -49,55 +61,30 @@ class WordTranslationTaskHandler(BaseTaskHandler):
 
             word_type = word_type.upper()
 
-            # Получаем все слова для задания, передавая word_type
-            all_words = await get_words_for_learning(
-                session=session,
-                user_id=user_id,
-                limit=incorrect_options + 1,  # +1 для правильного ответа
-                word_type=word_type,
-            )
+            # Получаем слово для задания, передавая word_type
+            if not prefetched:
+                words = await get_words_for_learning(
+                    session=session, user_id=user_id, limit=1, word_type=word_type
+                )
 
-            if not all_words:
+            if not words:
                 # Если не нашли слова указанного типа, пробуем без фильтра по типу
-                all_words = await get_words_for_learning(
-                    session=session, user_id=user_id, limit=incorrect_options + 1
+                words = await get_words_for_learning(
+                    session=session, user_id=user_id, limit=1
                 )
 
-                if not all_words:
+                if not words:
                     raise ValidationError('No words available')
 
-            # Берем первое слово как правильный ответ
-            word = all_words[0]
-
-            # Формируем варианты ответов
-            options = []
-
-            # Добавляем неправильные варианты
-            for wrong_word in all_words[1:]:
-                options.append(wrong_word.translation.lower())
+            word = words[0]
 
-            # Если не хватает вариантов ответов, получаем дополнительные слова того же типа
-            if len(options) < incorrect_options:
-                additional_words = await get_words_for_learning(
-                    session=session,
-                    user_id=user_id,
-                    limit=incorrect_options - len(options),
-                    word_type=word_type,
-                )
-                for add_word in additional_words:
-                    if add_word.id != word.id:
-                        options.append(add_word.translation.lower())
-
-                # Если всё ещё не хватает, берем любые слова
-                if len(options) < incorrect_options:
-                    additional_words = await get_words_for_learning(
-                        session=session,
-                        user_id=user_id,
-                        limit=incorrect_options - len(options),
-                    )
-                    for add_word in additional_words:
-                        if add_word.id != word.id:
-                            options.append(add_word.translation.lower())
+            # Неправильные варианты: близкие переводы слов того же типа
+            distractors = await get_distractors(
+                session, ItemType.WORD, word, incorrect_options
+            )
+            options = [
+                wrong_word.translation.lower() for wrong_word in distractors
+            ]
 
             # Добавляем правильный вариант
             options.append(word.translation.lower())
@@ -146,7 +133,7 @@ class WordTranslationTaskHandler(BaseTaskHandler):
 
         # Получаем слово
         if word_id:
-            word = await session.get(WordORM, word_id)
+            word = await get_learning_item(session, ItemType.WORD, word_id)
             if not word:
                 raise ValidationError('Word not found')
 
@@ -164,35 +151,10 @@ class WordTranslationTaskHandler(BaseTaskHandler):
         )
         session.add(attempt)
 
-        # Обновляем статистику слова для пользователя
-        status = await session.execute(
-            select(UserWordStatus).where(
-                UserWordStatus.user_id == user_id,
-                UserWordStatus.item_id == word.id,
-                UserWordStatus.item_type == ItemType.WORD,
-            )
+        # Обновляем SRS статус слова для пользователя
+        await SrsService(session).apply_reviews(
+            user_id, [(word.id, ItemType.WORD, attempt.score)]
         )
-        word_status = status.scalar_one_or_none()
-
-        if word_status:
-            # Обновляем существующий статус
-            if is_correct:
-                word_status.mastery_level = min(
-                    100, word_status.mastery_level + 10
-                )
-                word_status.ease_factor = min(3.0, word_status.ease_factor + 0.1)
-            else:
-                word_status.ease_factor = max(1.3, word_status.ease_factor - 0.2)
-        else:
-            # Создаем новый статус
-            word_status = UserWordStatus(
-                user_id=user_id,
-                item_id=word.id,
-                item_type=ItemType.WORD,
-                mastery_level=10.0 if is_correct else 0.0,
-                ease_factor=2.5,
-            )
-            session.add(word_status)
 
         await session.commit()
 
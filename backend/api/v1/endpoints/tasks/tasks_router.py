@@ -1,16 +1,20 @@
 # backend/api/v1/endpoints/tasks/router.py
 
+import json
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Body, Depends, Query
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from logger import setup_logger
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.api.deps import get_current_user_id
-from backend.core.exceptions import ValidationError
-from backend.db.database import get_session
+from backend.core.exceptions import NotFoundError, ValidationError
+from backend.db.database import async_session, get_session
+from backend.services.generation_queue import generation_queue
+from backend.services.prefetch import learning_prefetcher
 
 from .base import TaskRegistry, TaskRequest, TaskResponse
 
@@ -18,6 +22,8 @@ logger = setup_logger(__name__)
 
 router = APIRouter()
 
+MAX_STATUS_WAIT = 30  # Максимальное время long polling в секундах
+
 
 class TaskLevel(str, Enum):
     BEGINNER = 'beginner'
@@ -137,13 +143,73 @@ class EmailStructureRequest(BaseTaskRequest):
 async def generate_chat_dialog(
     request: ChatDialogRequest,
     background_tasks: BackgroundTasks,
+    response: Response,
+    run_async: bool = Query(
+        False,
+        alias='async',
+        description='Return job ID and generate in background',
+    ),
     current_user_id: int = Depends(get_current_user_id),
     session: AsyncSession = Depends(get_session),
 ):
     """Генерация задания с диалогом."""
+    if run_async:
+        return await _enqueue_task(
+            'chat_dialog', request, current_user_id, response
+        )
     return await _generate_task('chat_dialog', request, current_user_id, session)
 
 
+@router.post(
+    '/generate/chat-dialog/stream',
+    response_class=StreamingResponse,
+    summary='Stream chat dialog task',
+    description="""
+    Generates a chat dialog task and streams it as Server-Sent Events.
+
+    Events:
+    - `message`: next dialog message, sent as soon as the model finishes it
+    - `task`: the complete task, same as `result` of /generate/chat-dialog
+    - `error`: generation failed, `{"detail": "..."}`
+
+    Request body is the same as for /generate/chat-dialog.
+    """,
+    tags=['tasks'],
+)
+async def stream_chat_dialog(
+    request: ChatDialogRequest,
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """Генерация задания с диалогом с выдачей сообщений по мере генерации."""
+    handler = TaskRegistry.get_handler('chat_dialog')
+
+    if not handler:
+        raise ValidationError('chat_dialog task handler not found')
+
+    params = request.model_dump(exclude_none=True)
+
+    async def events():
+        # Своя сессия: ответ передается уже после выхода из обработчика
+        async with async_session() as session:
+            try:
+                async for event, data in handler.stream(
+                    {**params, 'session': session}
+                ):
+                    yield _sse_event(event, data)
+            except Exception as e:
+                await session.rollback()
+                logger.error(f'Error streaming chat dialog: {e}', exc_info=True)
+                detail = getattr(e, 'detail', None) or str(e)
+                yield _sse_event('error', {'detail': detail})
+
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        # Без буферизации в прокси, иначе сообщения придут все вместе
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 @router.post(
     '/generate/chat-dialog/validate',
     response_model=Dict[str, Any],
@@ -257,6 +323,7 @@ async def generate_word_matching(
     tags=['tasks'],
 )
 async def validate_word_matching(
+    background_tasks: BackgroundTasks,
     task_id: str = Body(..., description='ID of the task'),
     pairs: Dict[str, str] = Body(..., description='Matched word pairs'),
     correct_pairs: Dict[str, str] = Body(..., description='Matched word pairs'),
@@ -298,6 +365,11 @@ async def validate_word_matching(
             }
         )
 
+        # Готовим наборы слов для следующего задания
+        background_tasks.add_task(
+            learning_prefetcher.refill, current_user_id, 'word_matching'
+        )
+
         return {
             'statistics': {
                 'correct_pairs': result['correct_pairs'],
@@ -360,6 +432,7 @@ async def generate_term_definition(
     tags=['tasks'],
 )
 async def validate_term_definition(
+    background_tasks: BackgroundTasks,
     task_id: str = Body(..., description='ID задания'),
     term_id: int = Body(..., description='ID выбранного термина'),
     correct_term_id: int = Body(..., description='ID правильного термина'),
@@ -383,6 +456,10 @@ async def validate_term_definition(
             }
         )
 
+        background_tasks.add_task(
+            learning_prefetcher.refill, current_user_id, 'term_definition'
+        )
+
         return {'is_correct': is_correct}
 
     except Exception as e:
@@ -436,6 +513,7 @@ async def generate_word_translation(
     tags=['tasks'],
 )
 async def validate_word_translation(
+    background_tasks: BackgroundTasks,
     task_id: str = Body(..., description='ID of the task'),
     answer: str = Body(..., description='Selected translation'),
     word_id: int = Body(..., description='ID of the word'),
@@ -461,6 +539,10 @@ async def validate_word_translation(
             }
         )
 
+        background_tasks.add_task(
+            learning_prefetcher.refill, current_user_id, 'word_translation'
+        )
+
         return {'is_correct': result}
 
     except Exception as e:
@@ -498,6 +580,12 @@ async def validate_word_translation(
 async def generate_email_structure(
     request: EmailStructureRequest,
     background_tasks: BackgroundTasks,
+    response: Response,
+    run_async: bool = Query(
+        False,
+        alias='async',
+        description='Return job ID and generate in background',
+    ),
     current_user_id: int = Depends(get_current_user_id),
     session: AsyncSession = Depends(get_session),
 ):
@@ -505,6 +593,11 @@ async def generate_email_structure(
     logger.info(f'Received email structure request: {request}')
     logger.info(f'Current user ID: {current_user_id}')
 
+    if run_async:
+        return await _enqueue_task(
+            'email_structure', request, current_user_id, response
+        )
+
     try:
         result = await _generate_task(
             'email_structure', request, current_user_id, session
@@ -612,6 +705,68 @@ async def _generate_task(
         return TaskResponse(task_id='error', status='error', error=str(e))
 
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Событие Server-Sent Events с JSON данными."""
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+async def _enqueue_task(
+    task_type: str,
+    request: BaseTaskRequest,
+    current_user_id: int,
+    response: Response,
+) -> TaskResponse:
+    """Ставит генерацию в фоновую очередь и сразу возвращает ID задания."""
+    handler = TaskRegistry.get_handler(task_type)
+
+    if not handler:
+        raise ValidationError(f'{task_type} task handler not found')
+
+    params = request.model_dump(exclude_none=True)
+
+    async def run(session: AsyncSession) -> Dict[str, Any]:
+        return await handler.generate({**params, 'session': session})
+
+    job_id = await generation_queue.submit(task_type, current_user_id, run)
+    response.status_code = 202
+    return TaskResponse(task_id=job_id, status='pending')
+
+
+@router.get(
+    '/status/{task_id}',
+    response_model=TaskResponse,
+    summary='Get generation job status',
+    description="""
+    Returns status of a task generated with `?async=true`:
+    pending, running, completed (with result) or error.
+
+    With `wait` the request is held until the job finishes
+    or the timeout expires (long polling).
+    """,
+    tags=['tasks'],
+)
+async def get_task_status(
+    task_id: str,
+    wait: float = Query(
+        0, ge=0, le=MAX_STATUS_WAIT, description='Seconds to wait for completion'
+    ),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """Статус фоновой генерации задания."""
+    data = await generation_queue.wait(task_id, wait)
+
+    # Чужие задания не раскрываем
+    if not data or data.get('user_id') != current_user_id:
+        raise NotFoundError(f'Task {task_id} not found')
+
+    return TaskResponse(
+        task_id=task_id,
+        status=data['status'],
+        result=data.get('result'),
+        error=data.get('error'),
+    )
+
+
 @router.get(
     '/info',
     response_model=List[TaskInfo],
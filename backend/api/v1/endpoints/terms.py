@@ -13,6 +13,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from backend.api.deps import get_current_user_id, get_session
+from backend.core.status_cache import status_cache
+from backend.services.catalog import catalog
 from backend.db.models import (
     ItemType,
     TermORM,
@@ -84,9 +86,12 @@ async def get_terms(
 
 @router.get('/all')
 async def get_all_terms(db: AsyncSession = Depends(get_session)):
-    query = select(TermORM)
-    result = await db.execute(query)
-    terms = result.scalars().all()
+    snapshot = catalog.snapshot
+    if snapshot:
+        terms = snapshot.all(ItemType.TERM)
+    else:
+        result = await db.execute(select(TermORM))
+        terms = result.scalars().all()
     response = [
         {
             'id': term.id,
@@ -149,6 +154,9 @@ async def add_term_to_favorites(
         )
         db.add(status)
 
+    status_cache.stage(
+        db, user_id, {(term_id, ItemType.TERM): {'is_favorite': state}}
+    )
     await db.commit()
 
     if state:
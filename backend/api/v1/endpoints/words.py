@@ -8,6 +8,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from backend.api.deps import get_current_user_id, get_session
+from backend.core.status_cache import status_cache
+from backend.services.catalog import catalog
 from backend.db.models import (  # Добавлены импорты
     ItemType,
     UserWordStatus,
@@ -79,9 +81,12 @@ async def get_words(
 
 @router.get('/all')
 async def get_all_words(db: AsyncSession = Depends(get_session)):
-    query = select(WordORM)
-    result = await db.execute(query)
-    words = result.scalars().all()
+    snapshot = catalog.snapshot
+    if snapshot:
+        words = snapshot.all(ItemType.WORD)
+    else:
+        result = await db.execute(select(WordORM))
+        words = result.scalars().all()
     response = [
         {
             'id': word.id,
@@ -142,5 +147,8 @@ async def add_word_to_favorites(
         )
         db.add(status)
 
+    status_cache.stage(
+        db, user_id, {(word_id, ItemType.WORD): {'is_favorite': state}}
+    )
     await db.commit()
     return {'message': 'Word added to favorites'}
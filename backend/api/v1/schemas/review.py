@@ -0,0 +1,30 @@
+# api/v1/schemas/review.py
+
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from backend.db.models import ItemType
+
+
+class DueItem(BaseModel):
+    """Элемент, который пора повторить"""
+
+    item_id: int
+    item_type: ItemType
+    text: Optional[str]  # слово или термин
+    mastery_level: float
+    ease_factor: float
+    interval_level: int
+    last_reviewed: Optional[datetime]
+    next_review_date: datetime
+
+
+class DueItemsPage(BaseModel):
+    """Страница очереди повторения"""
+
+    items: List[DueItem]
+    next_cursor: Optional[str] = Field(
+        None, description='Курсор следующей страницы или null, если это конец'
+    )
@@ -1,5 +1,6 @@
 # core/config.py
 
+import os
 from datetime import timedelta
 from pathlib import Path
 from typing import Optional
@@ -16,6 +17,16 @@ class Settings(BaseSettings):
     PIPER_PATH: str = str(BASE_DIR / 'ai' / 'piper')
     PIPER_AUDIO_PATH: str = str(BASE_DIR / 'static' / 'audio')
     PIPER_DEFAULT_VOICE: str = 'rayn'  # Голос по умолчанию
+    PIPER_WORKERS: int = os.cpu_count() or 1  # Процессов Piper на воркер
+    PIPER_TIMEOUT: float = 60.0  # Максимальное время синтеза в секундах
+    PIPER_IDLE_TIMEOUT: float = 300.0  # Простой процесса до завершения
+    PIPER_WORKER_MAX_JOBS: int = 1000  # Заданий до перезапуска процесса
+
+    # Сжатые варианты аудио рядом с WAV (ffmpeg)
+    FFMPEG_PATH: str = 'ffmpeg'
+    AUDIO_ENCODE_FORMATS: list[str] = ['opus', 'mp3']
+    AUDIO_OPUS_BITRATE: str = '24k'
+    AUDIO_MP3_BITRATE: str = '48k'
 
     # Database settings
     DB_USER: str
@@ -29,6 +40,12 @@ class Settings(BaseSettings):
     GEMINI_MODEL_NAME: str
     REQUESTS_PER_MINUTE: int
     MIN_REQUEST_INTERVAL: float
+    REQUESTS_BURST: int = 1  # Запас запросов сверх равномерной скорости
+    REQUEST_MAX_WAIT: float = 60.0  # Максимальное ожидание лимита в секундах
+    PROMPT_CACHE_TTL: int = 7 * 24 * 3600  # Время жизни результатов в Redis
+    PROMPT_CACHE_MAX_ITEMS: int = 256  # Размер LRU в памяти воркера
+    PROMPT_BATCH_SIZE: int = 4  # Запросов в одном промпте, 1 - без пачек
+    PROMPT_BATCH_WINDOW: float = 0.05  # Окно сбора пачки в секундах
     DEFAULT_TEMPERATURE: float
     DEFAULT_TOP_P: float
 
@@ -58,6 +75,16 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: Optional[str] = None
 
+    # Кэш статусов пользователей (UserWordStatus)
+    STATUS_CACHE_MAX_USERS: int = 1024
+
+    # Фоновая генерация заданий через AI
+    GENERATION_WORKERS: int = 4
+    GENERATION_QUEUE_SIZE: int = 100
+    GENERATION_JOB_TTL: int = 3600  # Время хранения результата в секундах
+    # Доля слов и терминов пользователя, которую должно покрывать задание пула
+    TASK_POOL_MIN_COVERAGE: float = 0.5
+
     # Security settings
     PASSWORD_RESET_TOKEN_EXPIRE_HOURS: int = 24
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 24
@@ -35,3 +35,14 @@ class PermissionError(HTTPException):
 
     def __init__(self, detail: str):
         super().__init__(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+
+class ServiceUnavailableError(HTTPException):
+    """Service temporarily unavailable error."""
+
+    def __init__(self, detail: str, retry_after: int = 5):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={'Retry-After': str(retry_after)},
+        )
@@ -0,0 +1,102 @@
+# backend/core/metrics.py
+
+import math
+from collections import defaultdict
+from typing import Dict, Sequence
+
+# Границы корзин гистограмм по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+
+class Histogram:
+    """Накопительная гистограмма: число, сумма, минимум, максимум, корзины."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def snapshot(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'buckets': {
+                str(bound): count
+                for bound, count in zip(self.buckets, self.counts)
+            },
+        }
+
+
+class MetricsRegistry:
+    """
+    Счетчики и гистограммы в памяти процесса.
+
+    Метрики собираются отдельно в каждом воркере uvicorn, отдаются
+    эндпоинтом /metrics в формате JSON.
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._histograms: Dict[str, Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> str:
+        if not labels:
+            return name
+        rendered = ','.join(
+            f'{key}="{value}"' for key, value in sorted(labels.items())
+        )
+        return f'{name}{{{rendered}}}'
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Увеличивает счетчик."""
+        self._counters[self._key(name, labels)] += value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Устанавливает текущее значение показателя."""
+        self._gauges[self._key(name, labels)] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        **labels,
+    ) -> None:
+        """Добавляет наблюдение в гистограмму."""
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def snapshot(self) -> Dict:
+        return {
+            'counters': dict(self._counters),
+            'gauges': dict(self._gauges),
+            'histograms': {
+                key: histogram.snapshot()
+                for key, histogram in self._histograms.items()
+            },
+        }
+
+
+# Глобальный реестр метрик
+metrics = MetricsRegistry()
@@ -0,0 +1,171 @@
+# backend/core/single_flight.py
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from logger import setup_logger
+
+from backend.core.metrics import metrics
+from backend.core.task_store import task_store
+
+logger = setup_logger(__name__)
+
+T = TypeVar('T')
+
+MIN_POLL_INTERVAL = 0.05  # Опрос результата ведущего, секунды
+MAX_POLL_INTERVAL = 0.5
+
+# Снимает блокировку, только если она все еще принадлежит нам
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Объединение одновременных одинаковых вызовов внутри процесса.
+
+    Первый вызов с ключом выполняет функцию, остальные ждут его результат
+    (или исключение). После завершения ключ освобождается, следующий вызов
+    выполнит функцию заново.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет call или присоединяется к уже идущему вызову с тем же key.
+
+        Returns:
+            T: Результат call
+        """
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                break
+            try:
+                # shield: отмена ожидающего не отменяет общий вызов
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Отменен выполнявший вызов, пробуем выполнить сами
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Исключение уже получено здесь, без ожидающих не логируем
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._calls.pop(key, None)
+
+
+class DistributedSingleFlight:
+    """
+    Объединение одинаковых вызовов между воркерами через Redis.
+
+    Внутри процесса вызовы объединяет SingleFlight. Между процессами
+    ведущий берет блокировку {prefix}:{key}:lock (SET NX PX), выполняет
+    вызов и кладет JSON результат в {prefix}:{key}:result на result_ttl
+    секунд. Остальные опрашивают результат, пока блокировка жива. Если
+    ведущий упал без результата, блокировку берет следующий. Без Redis
+    или после wait_timeout вызов выполняется локально.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        lock_ttl: float = 120,
+        result_ttl: int = 30,
+        wait_timeout: float = 90,
+    ):
+        self.prefix = prefix
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.wait_timeout = wait_timeout
+        self._local = SingleFlight()
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет call один раз на key для всех воркеров.
+
+        Результат call должен сериализоваться в JSON.
+        """
+        return await self._local.do(key, lambda: self._run(key, call))
+
+    async def _run(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        lock_key = f'{self.prefix}:{key}:lock'
+        result_key = f'{self.prefix}:{key}:result'
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        delay = MIN_POLL_INTERVAL
+
+        while True:
+            try:
+                raw = await task_store.redis.get(result_key)
+                if raw is not None:
+                    metrics.inc(
+                        'single_flight_total', flight=self.prefix, role='follower'
+                    )
+                    return json.loads(raw)
+                acquired = await task_store.redis.set(
+                    lock_key, token, nx=True, px=int(self.lock_ttl * 1000)
+                )
+            except Exception as e:
+                logger.warning(f'Single flight {self.prefix} without Redis: {e}')
+                metrics.inc(
+                    'single_flight_total', flight=self.prefix, role='fallback'
+                )
+                return await call()
+
+            if acquired:
+                break
+            if time.monotonic() >= deadline:
+                logger.warning(f'Single flight {self.prefix} wait timed out')
+                metrics.inc(
+                    'single_flight_total', flight=self.prefix, role='fallback'
+                )
+                return await call()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_POLL_INTERVAL)
+
+        metrics.inc('single_flight_total', flight=self.prefix, role='leader')
+        try:
+            result = await call()
+            try:
+                await task_store.redis.set(
+                    result_key,
+                    json.dumps(result, ensure_ascii=False),
+                    ex=self.result_ttl,
+                )
+            except Exception as e:
+                logger.warning(
+                    f'Single flight {self.prefix} result not shared: {e}'
+                )
+            return result
+        finally:
+            try:
+                await task_store.redis.eval(RELEASE_SCRIPT, 1, lock_key, token)
+            except Exception as e:
+                # Блокировка истечет сама через lock_ttl
+                logger.warning(f'Single flight {self.prefix} release failed: {e}')
@@ -0,0 +1,386 @@
+# backend/core/status_cache.py
+
+import asyncio
+import heapq
+import json
+import math
+import uuid
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from logger import setup_logger
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.core.task_store import task_store
+from backend.db.models import ItemType, UserWordStatus
+
+logger = setup_logger(__name__)
+
+INVALIDATION_CHANNEL = 'status_cache:invalidate'
+RECONNECT_DELAY = 5  # Пауза перед повторной подпиской в секундах
+
+FLAG_FAVORITE = 1
+FLAG_KNOWN = 2
+
+ITEM_TYPE_CODES = {ItemType.WORD: 0, ItemType.TERM: 1}
+
+# Значения по умолчанию колонок UserWordStatus
+DEFAULT_VALUES = {
+    'mastery_level': 0.0,
+    'ease_factor': 2.5,
+    'interval_level': 0,
+    'next_review_date': None,
+    'is_favorite': False,
+    'is_known': False,
+}
+
+# Ключ в session.info с изменениями, ожидающими коммита
+PENDING_KEY = 'status_cache_pending'
+
+EPOCH = datetime(1970, 1, 1)
+
+StatusKey = Tuple[int, ItemType]
+
+
+def _to_timestamp(value: Optional[datetime]) -> float:
+    """Naive UTC datetime -> секунды от эпохи, None -> NaN."""
+    if value is None:
+        return math.nan
+    return (value - EPOCH).total_seconds()
+
+
+def _to_datetime(value: float) -> Optional[datetime]:
+    if math.isnan(value):
+        return None
+    return EPOCH + timedelta(seconds=value)
+
+
+class UserWorkingSet:
+    """
+    Компактная таблица SRS статусов одного пользователя.
+
+    Каждая колонка хранится в отдельном array, строка ищется по индексу
+    (item_id, item_type). Около 40 байт на статус вместо ORM объекта.
+    """
+
+    __slots__ = (
+        '_index',
+        '_ids',
+        '_types',
+        '_mastery',
+        '_ease',
+        '_interval',
+        '_next_review',
+        '_flags',
+    )
+
+    def __init__(self):
+        self._index: Dict[StatusKey, int] = {}
+        self._ids = array('q')
+        self._types = array('b')
+        self._mastery = array('d')
+        self._ease = array('d')
+        self._interval = array('l')
+        self._next_review = array('d')
+        self._flags = array('B')
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, key: StatusKey) -> bool:
+        return key in self._index
+
+    def get(self, item_id: int, item_type: ItemType) -> Optional[Dict]:
+        """Статус элемента в виде словаря колонок или None."""
+        row = self._index.get((item_id, item_type))
+        if row is None:
+            return None
+
+        flags = self._flags[row]
+        return {
+            'mastery_level': self._mastery[row],
+            'ease_factor': self._ease[row],
+            'interval_level': self._interval[row],
+            'next_review_date': _to_datetime(self._next_review[row]),
+            'is_favorite': bool(flags & FLAG_FAVORITE),
+            'is_known': bool(flags & FLAG_KNOWN),
+        }
+
+    def update(self, item_id: int, item_type: ItemType, values: Mapping) -> None:
+        """Обновляет колонки статуса, создавая строку при необходимости."""
+        key = (item_id, item_type)
+        row = self._index.get(key)
+        current = self.get(item_id, item_type) or DEFAULT_VALUES
+        merged = {
+            column: values[column] if column in values else current[column]
+            for column in DEFAULT_VALUES
+        }
+
+        flags = (FLAG_FAVORITE if merged['is_favorite'] else 0) | (
+            FLAG_KNOWN if merged['is_known'] else 0
+        )
+        columns = (
+            (self._mastery, merged['mastery_level'] or 0.0),
+            (self._ease, merged['ease_factor'] or DEFAULT_VALUES['ease_factor']),
+            (self._interval, merged['interval_level'] or 0),
+            (self._next_review, _to_timestamp(merged['next_review_date'])),
+            (self._flags, flags),
+        )
+
+        if row is None:
+            self._index[key] = len(self._ids)
+            self._ids.append(item_id)
+            self._types.append(ITEM_TYPE_CODES[item_type])
+            for column, value in columns:
+                column.append(value)
+        else:
+            for column, value in columns:
+                column[row] = value
+
+    def item_ids(self, item_type: ItemType) -> List[int]:
+        """ID всех отслеживаемых элементов типа."""
+        code = ITEM_TYPE_CODES[item_type]
+        return [
+            item_id
+            for item_id, type_code in zip(self._ids, self._types)
+            if type_code == code
+        ]
+
+    def due_first(
+        self,
+        item_type: ItemType,
+        limit: int,
+        keep: Optional[Callable[[int], bool]] = None,
+    ) -> List[int]:
+        """
+        ID элементов в порядке next_review_date, как ORDER BY ... ASC
+        в Postgres: элементы без даты идут последними.
+
+        Args:
+            item_type: Тип элементов
+            limit: Сколько ID вернуть
+            keep: Дополнительный фильтр по item_id
+        """
+        code = ITEM_TYPE_CODES[item_type]
+        rows = (
+            row
+            for row, type_code in enumerate(self._types)
+            if type_code == code and (keep is None or keep(self._ids[row]))
+        )
+
+        def sort_key(row: int) -> Tuple[float, int]:
+            next_review = self._next_review[row]
+            return (math.inf if math.isnan(next_review) else next_review, row)
+
+        return [
+            self._ids[row] for row in heapq.nsmallest(limit, rows, key=sort_key)
+        ]
+
+
+class StatusCache:
+    """
+    Кэш рабочих наборов UserWordStatus в памяти процесса.
+
+    - LRU по пользователям, не больше max_users наборов
+    - Изменения применяются после коммита сессии (write-through)
+    - Другие воркеры сбрасывают свой набор пользователя по сообщению
+      в Redis канале INVALIDATION_CHANNEL
+
+    Кэш работает только пока активна подписка на канал: без нее
+    изменения из других воркеров не видны и данные могли бы устареть.
+    """
+
+    def __init__(self, max_users: int = 1024):
+        self.max_users = max_users
+        self._users: OrderedDict[int, UserWorkingSet] = OrderedDict()
+        self._worker_id = uuid.uuid4().hex
+        self._writes = 0  # Счетчик применений, защищает load от гонок
+        self._subscribed = False
+        self._listener: Optional[asyncio.Task] = None
+        self._publish_tasks: set = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self._subscribed
+
+    def peek(self, user_id: int) -> Optional[UserWorkingSet]:
+        """Набор пользователя, если он уже в кэше."""
+        if not self._subscribed:
+            return None
+
+        working_set = self._users.get(user_id)
+        if working_set is not None:
+            self._users.move_to_end(user_id)
+        return working_set
+
+    async def load(
+        self, session: AsyncSession, user_id: int
+    ) -> Optional[UserWorkingSet]:
+        """
+        Набор пользователя из кэша или из БД одним запросом.
+
+        Returns:
+            Optional[UserWorkingSet]: None, если кэш выключен
+        """
+        if not self._subscribed:
+            return None
+
+        working_set = self.peek(user_id)
+        if working_set is not None:
+            return working_set
+
+        writes_before = self._writes
+        result = await session.execute(
+            select(
+                UserWordStatus.item_id,
+                UserWordStatus.item_type,
+                *(getattr(UserWordStatus, column) for column in DEFAULT_VALUES),
+            ).where(UserWordStatus.user_id == user_id)
+        )
+
+        working_set = UserWorkingSet()
+        for row in result:
+            working_set.update(row.item_id, row.item_type, row._mapping)
+
+        # Не кэшируем набор, если за время чтения что-то применилось или
+        # сессия видит собственные незакоммиченные изменения
+        pending = session.sync_session.info.get(PENDING_KEY)
+        if self._writes == writes_before and not pending:
+            self._users[user_id] = working_set
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+        return working_set
+
+    def stage(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        updates: Mapping[StatusKey, Mapping],
+        replace: bool = True,
+    ) -> None:
+        """
+        Запоминает изменения статусов до коммита сессии.
+
+        Args:
+            session: Сессия, в которой выполнена запись в БД
+            user_id: ID пользователя
+            updates: Новые значения колонок по ключу (item_id, item_type)
+            replace: False - только создать отсутствующие строки
+                (INSERT ... ON CONFLICT без изменения SRS колонок)
+        """
+        if not updates:
+            return
+        pending = session.sync_session.info.setdefault(PENDING_KEY, [])
+        pending.append((user_id, dict(updates), replace))
+
+    def invalidate(self, user_id: int) -> None:
+        """Сбрасывает набор пользователя в этом воркере."""
+        self._writes += 1
+        self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._writes += 1
+        self._users.clear()
+
+    def _apply(self, pending: List) -> None:
+        self._writes += 1
+        user_ids = set()
+        for user_id, updates, replace in pending:
+            user_ids.add(user_id)
+            working_set = self._users.get(user_id)
+            if working_set is None:
+                continue
+            for (item_id, item_type), values in updates.items():
+                if replace or (item_id, item_type) not in working_set:
+                    working_set.update(item_id, item_type, values)
+
+        self._publish(user_ids)
+
+    def _publish(self, user_ids: set) -> None:
+        if not self._subscribed:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        message = json.dumps({'worker': self._worker_id, 'users': list(user_ids)})
+        task = loop.create_task(
+            task_store.redis.publish(INVALIDATION_CHANNEL, message)
+        )
+        self._publish_tasks.add(task)
+        task.add_done_callback(self._on_published)
+
+    def _on_published(self, task: asyncio.Task) -> None:
+        self._publish_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            # Другие воркеры могли не узнать об изменении
+            logger.warning(f'Status cache publish failed: {task.exception()}')
+
+    def _handle_message(self, data: str) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        if message.get('worker') == self._worker_id:
+            return
+        for user_id in message.get('users', []):
+            self.invalidate(user_id)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = task_store.redis.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                self._subscribed = True
+                logger.info('Status cache subscribed to invalidations')
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self._handle_message(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f'Status cache listener error: {e}')
+            finally:
+                # Без подписки кэш мог пропустить изменения других воркеров
+                self._subscribed = False
+                self.clear()
+                await pubsub.aclose()
+
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def start(self) -> None:
+        """Запускает подписку на инвалидации (в lifespan приложения)."""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+# Глобальный экземпляр кэша
+status_cache = StatusCache(settings.STATUS_CACHE_MAX_USERS)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_after_commit(session: Session) -> None:
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending:
+        status_cache._apply(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
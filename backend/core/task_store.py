@@ -26,6 +26,7 @@ class TaskStatusStore:
         result: Optional[Dict] = None,
         error: Optional[str] = None,
         ttl: int = 3600,  # 1 час по умолчанию
+        user_id: Optional[int] = None,
     ) -> None:
         """
         Установка статуса задания.
@@ -36,8 +37,11 @@ class TaskStatusStore:
             result: Результат выполнения
             error: Ошибка если есть
             ttl: Время жизни записи в секундах
+            user_id: Владелец задания
         """
         data = {'status': status, 'result': result, 'error': error}
+        if user_id is not None:
+            data['user_id'] = user_id
 
         await self.redis.setex(
             f'task:{task_id}', timedelta(seconds=ttl), json.dumps(data)
@@ -299,12 +299,14 @@ class ChatDialogGenerated(Base):
     words = Column(JSON, nullable=False)  # List[str]
     terms = Column(JSON, nullable=False)  # List[str]
     difficulty = Column(String, nullable=False)
+    # sha256 отсортированных слов, терминов и сложности (task_fingerprint)
+    fingerprint = Column(String(64))
     created_at = Column(DateTime, default=datetime.utcnow)
     response = Column(JSON, nullable=False)  # Полный ответ от модели
 
     __table_args__ = (
-        # Индекс для поиска по комбинации слов и терминов
-        Index('idx_chat_dialog_words_terms', 'words', 'terms'),
+        # Поиск задания по комбинации параметров одним обращением к индексу
+        Index('uq_chat_dialog_fingerprint', 'fingerprint', unique=True),
     )
 
 
@@ -319,17 +321,31 @@ class EmailStructureGenerated(Base):
     style = Column(String, nullable=False)
     topic = Column(String, nullable=False)
     difficulty = Column(String, nullable=False)
+    # sha256 слов, терминов, сложности, стиля и темы (task_fingerprint)
+    fingerprint = Column(String(64))
     created_at = Column(DateTime, default=datetime.utcnow)
     response = Column(JSON, nullable=False)  # Полный ответ от модели
 
     __table_args__ = (
-        # Индекс для поиска по комбинации слов и терминов
-        Index('idx_email_structure_words_terms', 'words', 'terms'),
+        # Поиск задания по комбинации параметров одним обращением к индексу
+        Index('uq_email_structure_fingerprint', 'fingerprint', unique=True),
         # Индекс для поиска по стилю и теме
         Index('idx_email_structure_style_topic', 'style', 'topic'),
     )
 
 
+class GeneratedTaskItem(Base):
+    """Обратный индекс: слово или термин -> сгенерированные задания с ним."""
+
+    __tablename__ = 'generated_task_items'
+
+    # chat_dialog или email_structure, task_id ссылается на таблицу типа
+    task_type = Column(String, primary_key=True)
+    item_type = Column(Enum(ItemType), primary_key=True)
+    item = Column(String, primary_key=True)  # Текст слова/термина
+    task_id = Column(Integer, primary_key=True)
+
+
 class LearningAttempt(Base):
     """Модель для хранения всех попыток изучения"""
 
@@ -1,17 +1,24 @@
 import random
 from datetime import datetime
-from typing import List, Optional
+from typing import Collection, List, Optional, Sequence, Tuple
 
 from logger import setup_logger
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, exists, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.core.status_cache import UserWorkingSet, status_cache
 from backend.db.database import async_engine, get_session
+from backend.services.catalog import CatalogSnapshot, catalog
+from backend.services.sampling import sample_ids, sample_ids_from_db
+from backend.services.srs import SUCCESS_SCORE, SrsService
 
 from .models import (
     Base,
     DifficultyLevel,
     ItemType,
+    LearningAttempt,
+    TaskType,
     TermORM,
     UserWordStatus,
     WordORM,
@@ -108,20 +115,33 @@ async def init_db_tables() -> None:
         await conn.run_sync(Base.metadata.create_all)
 
 
+async def sample_learning_items(
+    session: AsyncSession, item_type: ItemType, limit: int, filters: Sequence = ()
+) -> list:
+    """
+    Случайные слова/термины без ORDER BY random().
+
+    При загруженном каталоге ID выбираются из его индекса, иначе
+    коротким поиском по первичному ключу (см. services/sampling.py).
+    """
+    snapshot = catalog.snapshot
+    if snapshot and not filters:
+        item_ids = sample_ids(snapshot.ids(item_type), limit)
+    else:
+        item_ids = await sample_ids_from_db(
+            session, LEARNING_MODELS[item_type], limit, filters
+        )
+    return await get_learning_items_by_ids(session, item_type, item_ids)
+
+
 async def get_random_terms(session: AsyncSession, limit: int = 3) -> list[TermORM]:
     """Получает случайные термины из базы данных."""
-    result = await session.execute(
-        select(TermORM).order_by(func.random()).limit(limit)
-    )
-    return result.scalars().all()
+    return await sample_learning_items(session, ItemType.TERM, limit)
 
 
 async def get_random_words(session: AsyncSession, limit: int = 3) -> list[WordORM]:
     """Получает случайные слова из базы данных."""
-    result = await session.execute(
-        select(WordORM).order_by(func.random()).limit(limit)
-    )
-    return result.scalars().all()
+    return await sample_learning_items(session, ItemType.WORD, limit)
 
 
 async def get_random_items() -> tuple[list[TermORM], list[WordORM]]:
@@ -145,34 +165,9 @@ async def save_word_statistics(
         is_correct: bool - была ли попытка успешной
     """
     try:
-        result = await session.execute(
-            select(UserWordStatus).where(
-                UserWordStatus.user_id == user_id,
-                UserWordStatus.item_id == word_id,
-                UserWordStatus.item_type == ItemType.WORD,
-            )
+        await SrsService(session).apply_reviews(
+            user_id, [(word_id, ItemType.WORD, 1.0 if is_correct else 0.0)]
         )
-        word_status = result.scalar_one_or_none()
-
-        if word_status:
-            # Обновляем существующий статус
-            if is_correct:
-                word_status.mastery_level = min(
-                    100, word_status.mastery_level + 10
-                )
-                word_status.ease_factor = min(3.0, word_status.ease_factor + 0.1)
-            else:
-                word_status.ease_factor = max(1.3, word_status.ease_factor - 0.2)
-        else:
-            # Создаем новый статус
-            word_status = UserWordStatus(
-                user_id=user_id,
-                item_id=word_id,
-                item_type=ItemType.WORD,
-                mastery_level=10.0 if is_correct else 0.0,
-                ease_factor=2.5,
-            )
-            session.add(word_status)
 
         await session.commit()
     except Exception as e:
@@ -183,180 +178,410 @@ async def save_word_statistics(
 # backend/api/v1/endpoints/words.py
 
 
-async def get_words_for_learning(
+LEARNING_MODELS = {ItemType.WORD: WordORM, ItemType.TERM: TermORM}
+
+
+async def select_learning_ids_from_db(
     session: AsyncSession,
     user_id: int,
-    limit: int = 5,
-    word_type: Optional[str] = None,
-) -> List[WordORM]:
+    item_type: ItemType,
+    limit: int,
+    filters: Sequence = (),
+) -> List[int]:
     """
-    Получает слова для изучения:
-    1. Все слова которых нет в UserWordStatus (с учетом word_type если указан)
-    2. Добавляет слова с низким mastery_level пока не достигнут limit
+    Выбирает ID элементов для изучения запросами к БД.
+
+    1. Новые элементы (anti-join с UserWordStatus) - sample_ids_from_db,
+       поиском по первичному ключу вместо ORDER BY random() по каталогу
+    2. Отслеживаемые элементы в порядке next_review_date (idx_next_review)
+       добирают выборку до limit
+
+    Каталог целиком в Python не загружается.
+
+    Args:
+        session: Сессия БД
+        user_id: ID пользователя
+        item_type: Тип элементов (слово/термин)
+        limit: Итоговое количество элементов
+        filters: Дополнительные условия на модель (word_type, category)
+
+    Returns:
+        List[int]: Новые элементы, затем элементы к повторению
     """
-    # Базовый фильтр по типу слова
-    word_type_filter = (
-        and_(True) if not word_type else WordORM.word_type == word_type
-    )
+    model = LEARNING_MODELS[item_type]
 
-    # Получаем ID слов, которые есть в UserWordStatus
-    tracked_words_query = select(UserWordStatus.item_id).where(
+    tracked = select(UserWordStatus.id).where(
         UserWordStatus.user_id == user_id,
-        UserWordStatus.item_type == ItemType.WORD,
+        UserWordStatus.item_id == model.id,
+        UserWordStatus.item_type == item_type,
     )
-    tracked_result = await session.execute(tracked_words_query)
-    tracked_word_ids = [row[0] for row in tracked_result]
-
-    # Получаем новые слова (которых нет в UserWordStatus)
-    new_words_query = select(WordORM).where(
-        and_(
-            WordORM.id.not_in(tracked_word_ids) if tracked_word_ids else True,
-            word_type_filter,
-        )
+    new_ids = await sample_ids_from_db(
+        session, model, _new_items_limit(limit), [~exists(tracked), *filters]
     )
-    new_words_result = await session.execute(new_words_query)
-    new_words = new_words_result.scalars().all()
-
-    if random.randint(0, 9) == 0:
-        new_words = new_words[:1]
+    if len(new_ids) >= limit:
+        return new_ids[:limit]
 
-    # Если новых слов >= limit, берем случайные limit штук
-    if len(new_words) >= limit:
-        selected_words = sorted(new_words, key=lambda x: random.random())[:limit]
-        # Записываем взаимодействие только для выбранных слов
-        for word in selected_words:
-            await record_interaction(session, user_id, word.id, ItemType.WORD)
-        return selected_words
-
-    # Если новых слов недостаточно, добираем с низким mastery_level
-    required_more = limit - len(new_words)
-
-    tracked_words_query = (
-        select(WordORM)
+    review_items = (
+        select(model.id)
         .join(
             UserWordStatus,
             and_(
-                UserWordStatus.item_id == WordORM.id,
-                UserWordStatus.item_type == ItemType.WORD,
+                UserWordStatus.item_id == model.id,
+                UserWordStatus.item_type == item_type,
             ),
         )
-        .where(and_(UserWordStatus.user_id == user_id, word_type_filter))
-        .order_by(UserWordStatus.mastery_level.asc())
-        .limit(required_more)
+        .where(UserWordStatus.user_id == user_id, *filters)
+        .order_by(UserWordStatus.next_review_date.asc())
+        .limit(limit - len(new_ids))
     )
+    review_ids = (await session.execute(review_items)).scalars().all()
+    return new_ids + list(review_ids)
+
 
-    tracked_words_result = await session.execute(tracked_words_query)
-    tracked_words = tracked_words_result.scalars().all()
+def _new_items_limit(limit: int) -> int:
+    # Как и раньше, в 10% случаев берем не больше одного нового элемента
+    return 1 if random.randint(0, 9) == 0 else limit
+
+
+def _learning_filters(
+    item_type: ItemType,
+    word_type: Optional[str] = None,
+    category: Optional[str] = None,
+) -> Tuple:
+    """Условия на модель для select_learning_ids_from_db."""
+    if item_type == ItemType.WORD and word_type:
+        return (WordORM.word_type == word_type,)
+    if item_type == ItemType.TERM and category:
+        return (TermORM.category_main == category,)
+    return ()
+
+
+def select_learning_ids_in_memory(
+    snapshot: CatalogSnapshot,
+    working_set: UserWorkingSet,
+    item_type: ItemType,
+    limit: int,
+    word_type: Optional[str] = None,
+    category: Optional[str] = None,
+    exclude: Collection[int] = (),
+) -> List[int]:
+    """
+    Та же выборка, что и select_learning_ids_from_db, но по снимку каталога
+    и кэшу статусов: новые элементы выбираются sample_ids из индекса
+    каталога, элементы к повторению берутся из рабочего набора.
+    ID из exclude не выбираются.
+    """
+    population = snapshot.ids(item_type, word_type=word_type, category=category)
+    new_ids = sample_ids(
+        population,
+        _new_items_limit(limit),
+        reject=lambda item_id: (
+            item_id in exclude or (item_id, item_type) in working_set
+        ),
+    )
 
-    words = new_words + tracked_words
+    keep = None
+    if word_type or category or exclude:
 
-    # Записываем взаимодействие для каждого слова
-    for word in words:
-        await record_interaction(session, user_id, word.id, ItemType.WORD)
+        def keep(item_id: int) -> bool:
+            if item_id in exclude:
+                return False
+            if not (word_type or category):
+                return True
+            entry = snapshot.get(item_type, item_id)
+            if entry is None:
+                return False
+            if item_type == ItemType.WORD:
+                return entry.word_type == WordType(word_type)
+            return entry.category_main == category
 
-    return words
+    review_ids = working_set.due_first(item_type, limit, keep)
+    return (new_ids + review_ids)[:limit]
 
 
-async def get_terms_for_learning(
+async def select_learning_ids(
     session: AsyncSession,
     user_id: int,
-    limit: int = 5,
+    item_type: ItemType,
+    limit: int,
+    word_type: Optional[str] = None,
     category: Optional[str] = None,
-) -> List[TermORM]:
+    exclude: Collection[int] = (),
+) -> List[int]:
     """
-    Получает термины для изучения:
-    1. Все термины которых нет в UserWordStatus (с учетом category если указана)
-    2. Добавляет термины с низким mastery_level пока не достигнут limit
+    ID элементов для изучения без записи взаимодействия.
+
+    Для горячих пользователей (статусы в status_cache) при загруженном
+    каталоге выборка делается в памяти без запросов, иначе запросами
+    select_learning_ids_from_db. ID из exclude не выбираются.
     """
+    snapshot = catalog.snapshot
+    working_set = await status_cache.load(session, user_id) if snapshot else None
+
+    if working_set is not None:
+        return select_learning_ids_in_memory(
+            snapshot,
+            working_set,
+            item_type,
+            limit,
+            word_type,
+            category,
+            exclude,
+        )
 
-    # Базовый фильтр категории
-    category_filter = (
-        and_(True) if not category else TermORM.category_main == category
+    filters = list(_learning_filters(item_type, word_type, category))
+    if exclude:
+        filters.append(LEARNING_MODELS[item_type].id.not_in(list(exclude)))
+    return await select_learning_ids_from_db(
+        session, user_id, item_type, limit, filters
     )
 
-    # Получаем ID терминов из UserWordStatus
-    tracked_terms_query = select(UserWordStatus.item_id).where(
-        UserWordStatus.user_id == user_id,
-        UserWordStatus.item_type == ItemType.TERM,
+
+async def select_learning_items(
+    session: AsyncSession,
+    user_id: int,
+    item_type: ItemType,
+    limit: int,
+    word_type: Optional[str] = None,
+    category: Optional[str] = None,
+    record: bool = True,
+) -> list:
+    """
+    Выбирает элементы для изучения и записывает взаимодействие.
+
+    ID выбираются select_learning_ids, объекты берутся из каталога.
+
+    Args:
+        session: Сессия БД
+        user_id: ID пользователя
+        item_type: Тип элементов (слово/термин)
+        limit: Количество элементов
+        word_type: Тип слова (только для слов)
+        category: Категория (только для терминов)
+        record: Записать взаимодействие с выбранными элементами
+
+    Returns:
+        list: Новые элементы, затем элементы к повторению
+    """
+    item_ids = await select_learning_ids(
+        session, user_id, item_type, limit, word_type, category
     )
-    tracked_result = await session.execute(tracked_terms_query)
-    tracked_term_ids = [row[0] for row in tracked_result]
-
-    # Получаем новые термины
-    new_terms_query = select(TermORM).where(
-        and_(
-            TermORM.id.not_in(tracked_term_ids) if tracked_term_ids else True,
-            category_filter,
+    items = await get_learning_items_by_ids(session, item_type, item_ids)
+
+    if record:
+        await record_interactions(
+            session, user_id, [(item.id, item_type) for item in items]
         )
-    )
-    new_terms_result = await session.execute(new_terms_query)
-    new_terms = new_terms_result.scalars().all()
 
-    if random.randint(0, 9) == 0:
-        new_terms = new_terms[:1]
+    return items
 
-    # Если новых терминов >= limit, берем случайные limit штук
-    if len(new_terms) >= limit:
-        selected_terms = sorted(new_terms, key=lambda x: random.random())[:limit]
-        # Записываем взаимодействие только для выбранных терминов
-        for term in selected_terms:
-            await record_interaction(session, user_id, term.id, ItemType.TERM)
-        return selected_terms
 
-    # Если новых терминов недостаточно, добираем с низким mastery_level
-    required_more = limit - len(new_terms)
+async def get_learning_items_by_ids(
+    session: AsyncSession, item_type: ItemType, item_ids: Sequence[int]
+) -> list:
+    """
+    Загружает слова/термины по ID, сохраняя порядок item_ids.
 
-    tracked_terms_query = (
-        select(TermORM)
-        .join(
-            UserWordStatus,
-            and_(
-                UserWordStatus.item_id == TermORM.id,
-                UserWordStatus.item_type == ItemType.TERM,
-            ),
-        )
-        .where(and_(UserWordStatus.user_id == user_id, category_filter))
-        .order_by(UserWordStatus.mastery_level.asc())
-        .limit(required_more)
+    Элементы берутся из снимка каталога, в БД читаются только те,
+    которых в снимке нет (добавлены после его загрузки).
+    """
+    items = {}
+    snapshot = catalog.snapshot
+    if snapshot:
+        items = {
+            entry.id: entry for entry in snapshot.get_many(item_type, item_ids)
+        }
+
+    missing = [item_id for item_id in item_ids if item_id not in items]
+    if missing:
+        model = LEARNING_MODELS[item_type]
+        result = await session.execute(select(model).where(model.id.in_(missing)))
+        items.update((item.id, item) for item in result.scalars())
+
+    return [items[item_id] for item_id in item_ids if item_id in items]
+
+
+async def get_learning_item(
+    session: AsyncSession, item_type: ItemType, item_id: int
+) -> Optional[object]:
+    """Слово/термин по ID из каталога или БД."""
+    items = await get_learning_items_by_ids(session, item_type, [item_id])
+    return items[0] if items else None
+
+
+async def find_item_ids(
+    session: AsyncSession, item_type: ItemType, texts: Sequence[str]
+) -> List[int]:
+    """ID слов/терминов по их тексту."""
+    unique_texts = list(dict.fromkeys(texts))
+    snapshot = catalog.snapshot
+    found = snapshot.find_ids(item_type, unique_texts) if snapshot else []
+    if len(found) == len(unique_texts):
+        return found
+
+    model = LEARNING_MODELS[item_type]
+    text_column = model.word if item_type == ItemType.WORD else model.term
+    result = await session.execute(
+        select(model.id).where(text_column.in_(unique_texts))
     )
+    return list(result.scalars())
+
 
-    tracked_terms_result = await session.execute(tracked_terms_query)
-    tracked_terms = tracked_terms_result.scalars().all()
+async def get_distractors(
+    session: AsyncSession, item_type: ItemType, item, k: int
+) -> list:
+    """
+    Неправильные варианты ответа для слова/термина.
 
-    terms = new_terms + tracked_terms
+    Берутся из индекса дистракторов каталога без запросов к БД. Без
+    каталога выбираются случайные элементы того же word_type/category_main.
+    """
+    snapshot = catalog.snapshot
+    if snapshot:
+        distractor_ids = snapshot.distractors.pick(item_type, item.id, k)
+        if distractor_ids:
+            return snapshot.get_many(item_type, distractor_ids)
+
+    model = LEARNING_MODELS[item_type]
+    if item_type == ItemType.WORD:
+        group = WordORM.word_type == item.word_type
+    else:
+        group = TermORM.category_main == item.category_main
+    return await sample_learning_items(
+        session, item_type, k, (group, model.id != item.id)
+    )
 
-    # Записываем взаимодействие для каждого термина
-    for term in terms:
-        await record_interaction(session, user_id, term.id, ItemType.TERM)
 
-    return terms
+async def get_words_for_learning(
+    session: AsyncSession,
+    user_id: int,
+    limit: int = 5,
+    word_type: Optional[str] = None,
+    record: bool = True,
+) -> List[WordORM]:
+    """
+    Получает слова для изучения:
+    1. Слова которых нет в UserWordStatus (с учетом word_type если указан)
+    2. Добавляет слова к повторению пока не достигнут limit
+    """
+    return await select_learning_items(
+        session, user_id, ItemType.WORD, limit, word_type=word_type, record=record
+    )
+
+
+async def get_terms_for_learning(
+    session: AsyncSession,
+    user_id: int,
+    limit: int = 5,
+    category: Optional[str] = None,
+    record: bool = True,
+) -> List[TermORM]:
+    """
+    Получает термины для изучения:
+    1. Термины которых нет в UserWordStatus (с учетом category если указана)
+    2. Добавляет термины к повторению пока не достигнут limit
+    """
+    return await select_learning_items(
+        session, user_id, ItemType.TERM, limit, category=category, record=record
+    )
 
 
 async def record_interaction(
     session: AsyncSession, user_id: int, item_id: int, item_type: ItemType
 ) -> None:
     """Записать взаимодействие с словом/термином"""
-    try:
-        logger.debug(f'Recording interaction for {item_type} {item_id}')
-        status = await session.execute(
-            select(UserWordStatus).where(
-                UserWordStatus.user_id == user_id,
-                UserWordStatus.item_id == item_id,
-                UserWordStatus.item_type == item_type,
-            )
-        )
-        user_word_status = status.scalar_one_or_none()
+    await record_interactions(session, user_id, [(item_id, item_type)])
 
-        if not user_word_status:
-            user_word_status = UserWordStatus(
-                user_id=user_id, item_id=item_id, item_type=item_type
-            )
-            session.add(user_word_status)
 
-        user_word_status.last_reviewed = datetime.utcnow()
-        await session.flush()
+async def record_interactions(
+    session: AsyncSession,
+    user_id: int,
+    items: Sequence[Tuple[int, ItemType]],
+) -> None:
+    """
+    Записывает взаимодействие сразу с несколькими словами/терминами.
+
+    Выполняется одним INSERT ... ON CONFLICT DO UPDATE по уникальному
+    индексу idx_user_word_status (user_id, item_id, item_type).
+    Новые элементы сразу попадают в очередь повторения (next_review_date).
+
+    Args:
+        session: Сессия БД
+        user_id: ID пользователя
+        items: Список пар (item_id, item_type)
+    """
+    # Повторяющиеся пары в одном INSERT ... ON CONFLICT недопустимы
+    unique_items = list(dict.fromkeys(items))
+    if not unique_items:
+        return
+
+    try:
+        logger.debug(f'Recording interactions for {len(unique_items)} items')
+        now = datetime.utcnow()
+        stmt = pg_insert(UserWordStatus).values(
+            [
+                {
+                    'user_id': user_id,
+                    'item_id': item_id,
+                    'item_type': item_type,
+                    'last_reviewed': now,
+                    'next_review_date': now,
+                }
+                for item_id, item_type in unique_items
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                UserWordStatus.user_id,
+                UserWordStatus.item_id,
+                UserWordStatus.item_type,
+            ],
+            set_={'last_reviewed': stmt.excluded.last_reviewed},
+        )
+        await session.execute(stmt)
+        status_cache.stage(
+            session,
+            user_id,
+            {key: {'next_review_date': now} for key in unique_items},
+            replace=False,
+        )
 
     except Exception as e:
-        logger.error(f'Error recording interaction: {e}')
+        logger.error(f'Error recording interactions: {e}')
         await session.rollback()
         raise
+
+
+async def record_attempts(
+    session: AsyncSession,
+    user_id: int,
+    task_type: TaskType,
+    results: Sequence[Tuple[int, ItemType, float]],
+) -> None:
+    """
+    Записывает попытки сразу по нескольким словам/терминам одним INSERT.
+
+    Args:
+        session: Сессия БД
+        user_id: ID пользователя
+        task_type: Тип задания
+        results: Список (item_id, item_type, score), score от 0 до 1
+    """
+    if not results:
+        return
+
+    await session.execute(
+        insert(LearningAttempt).values(
+            [
+                {
+                    'user_id': user_id,
+                    'item_id': item_id,
+                    'item_type': item_type,
+                    'task_type': task_type,
+                    'is_successful': score >= SUCCESS_SCORE,
+                    'score': score,
+                }
+                for item_id, item_type, score in results
+            ]
+        )
+    )
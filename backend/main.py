@@ -11,10 +11,12 @@ from fastapi.openapi.utils import get_openapi
 from fastapi.responses import JSONResponse
 from logger import setup_logger
 
+from backend.ai.piper_pool import piper_pool
 from backend.api.v1.endpoints import (
     achievements,
     audio,
     auth,
+    review,
     tasks,
     terms,
     users,
@@ -23,7 +25,11 @@ from backend.api.v1.endpoints import (
 from backend.api.v1.endpoints.tasks.handlers import register_handlers
 from backend.core.config import settings
 from backend.core.exceptions import AuthError, NotFoundError, ValidationError
+from backend.core.metrics import metrics
+from backend.core.status_cache import status_cache
 from backend.db.database import init_db
+from backend.services.catalog import catalog
+from backend.services.generation_queue import generation_queue
 
 logger = setup_logger(__name__)
 
@@ -35,9 +41,15 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     logger.info('Starting up FastAPI application')
     await init_db()
     register_handlers()  # Регистрируем обработчики при запуске
+    await catalog.reload()  # Снимок слов и терминов в памяти воркера
+    status_cache.start()  # Подписка на инвалидации кэша статусов
+    generation_queue.start()  # Воркеры фоновой генерации заданий
     yield
     # Shutdown
     logger.info('Shutting down FastAPI application')
+    await generation_queue.stop()
+    await status_cache.stop()
+    await piper_pool.stop()
 
 
 # Инициализация FastAPI
@@ -61,6 +73,10 @@ app = FastAPI(
             'name': 'audio',
             'description': 'Озвучивание текста',
         },
+        {
+            'name': 'review',
+            'description': 'Очередь повторения',
+        },
         {
             'name': 'users',
             'description': 'Операции с пользователями',
@@ -195,6 +211,9 @@ app.include_router(
 app.include_router(
     users.router, prefix=f'{settings.API_V1_STR}/users', tags=['users']
 )
+app.include_router(
+    review.router, prefix=f'{settings.API_V1_STR}/review', tags=['review']
+)
 app.include_router(
     achievements.router,
     prefix=f'{settings.API_V1_STR}/achievements',
@@ -209,5 +228,11 @@ async def health_check() -> dict:
     return {'status': 'ok', 'version': '1.0.0'}
 
 
+@app.get('/metrics', tags=['health'])
+async def get_metrics() -> dict:
+    """Метрики текущего воркера."""
+    return metrics.snapshot()
+
+
 if __name__ == '__main__':
     uvicorn.run('main:app', host='127.0.0.1', port=7000, reload=True)
@@ -6,7 +6,32 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from backend.ai.piper_tts import PiperTTS
 from backend.core.config import settings
 from backend.core.exceptions import NotFoundError
-from backend.db.models import TermORM, WordORM
+from backend.core.single_flight import DistributedSingleFlight
+from backend.db.models import ItemType, TermORM, WordORM
+from backend.db.orm import get_learning_item
+
+# Одна генерация на файл: в процессе и между воркерами с общим
+# PIPER_AUDIO_PATH (блокировка в Redis)
+audio_flight = DistributedSingleFlight(
+    'flight:audio',
+    lock_ttl=settings.PIPER_TIMEOUT * 2,
+    result_ttl=5,
+    wait_timeout=settings.PIPER_TIMEOUT * 2,
+)
+
+
+def term_audio(term: TermORM, type: Optional[str] = None) -> Tuple[str, str]:
+    """Имя файла и текст аудио термина (type='def' - определение)."""
+    if type == 'def':
+        return f'term_{term.id}_def', term.definition_en
+    return f'term_{term.id}', term.term
+
+
+def word_audio(word: WordORM, type: Optional[str] = None) -> Tuple[str, str]:
+    """Имя файла и текст аудио слова (type='context' - пример)."""
+    if type == 'context' and word.context:
+        return f'word_{word.id}_context', word.context
+    return f'word_{word.id}', word.word
 
 
 class AudioService:
@@ -17,8 +42,42 @@ class AudioService:
             output_base_path=settings.PIPER_AUDIO_PATH,
         )
 
+    async def _ensure_audio(
+        self, filename: str, text: str, force: bool, fmt: str
+    ) -> Path:
+        """
+        Генерирует аудио, если его нет (или force), путь к варианту fmt.
+
+        Одновременные запросы одного файла ждут одну генерацию. Если
+        варианта нет (файл до перекодирования, ошибка ffmpeg), отдается WAV.
+        """
+
+        async def generate() -> str:
+            # Файл мог появиться, пока ждали блокировку
+            if force or not self.tts.audio_exists(filename):
+                await self.tts.generate_audio(
+                    text=text, filename=filename, force_regenerate=force
+                )
+            return str(self.tts.get_audio_path(filename))
+
+        if force:
+            # Отдельный ключ: принудительная генерация не присоединяется к
+            # обычной, которая пропустит синтез, раз файл уже есть
+            await audio_flight.do(f'{filename}:force', generate)
+        elif not self.tts.audio_exists(filename):
+            await audio_flight.do(filename, generate)
+
+        audio_path = self.tts.get_audio_path(filename, fmt)
+        if fmt != 'wav' and not audio_path.exists():
+            audio_path = self.tts.get_audio_path(filename)
+        return audio_path
+
     async def get_term_audio(
-        self, term_id: int, type: Optional[str] = None
+        self,
+        term_id: int,
+        type: Optional[str] = None,
+        force: bool = False,
+        fmt: str = 'wav',
     ) -> Tuple[Path, str]:
         """
         Получает или генерирует аудио для термина
@@ -27,27 +86,21 @@ class AudioService:
             Tuple[Path, str]: (путь к файлу, имя файла)
         """
         # Получаем термин
-        term = await self.session.get(TermORM, term_id)
+        term = await get_learning_item(self.session, ItemType.TERM, term_id)
         if not term:
             raise NotFoundError('Term not found')
 
-        # Определяем имя файла и текст
-        if type == 'def':
-            filename = f'term_{term_id}_def'
-            text = term.definition_en
-        else:
-            filename = f'term_{term_id}'
-            text = term.term
-
-        # Генерируем если нужно
-        if not self.tts.audio_exists(filename):
-            await self.tts.generate_audio(text=text, filename=filename)
+        filename, text = term_audio(term, type)
 
-        audio_path = self.tts.get_audio_path(filename)
-        return audio_path, f'{filename}.wav'
+        audio_path = await self._ensure_audio(filename, text, force, fmt)
+        return audio_path, audio_path.name
 
     async def get_word_audio(
-        self, word_id: int, type: Optional[str] = None
+        self,
+        word_id: int,
+        type: Optional[str] = None,
+        force: bool = False,
+        fmt: str = 'wav',
     ) -> Tuple[Path, str]:
         """
         Получает или генерирует аудио для слова
@@ -56,32 +109,30 @@ class AudioService:
             Tuple[Path, str]: (путь к файлу, имя файла)
         """
         # Получаем слово
-        word = await self.session.get(WordORM, word_id)
+        word = await get_learning_item(self.session, ItemType.WORD, word_id)
         if not word:
             raise NotFoundError('Word not found')
 
-        # Определяем имя файла и текст
-        if type == 'context' and word.context:
-            filename = f'word_{word_id}_context'
-            text = word.context
-        else:
-            filename = f'word_{word_id}'
-            text = word.word
-
-        # Генерируем если нужно
-        if not self.tts.audio_exists(filename):
-            await self.tts.generate_audio(text=text, filename=filename)
+        filename, text = word_audio(word, type)
 
-        audio_path = self.tts.get_audio_path(filename)
-        return audio_path, f'{filename}.wav'
+        audio_path = await self._ensure_audio(filename, text, force, fmt)
+        return audio_path, audio_path.name
 
     async def regenerate_audio(
-        self, item_type: str, item_id: int, type: Optional[str] = None
+        self,
+        item_type: str,
+        item_id: int,
+        type: Optional[str] = None,
+        fmt: str = 'wav',
     ) -> Tuple[Path, str]:
         """Принудительная перегенерация аудио"""
         if item_type == 'term':
-            return await self.get_term_audio(term_id=item_id, type=type)
+            return await self.get_term_audio(
+                term_id=item_id, type=type, force=True, fmt=fmt
+            )
         elif item_type == 'word':
-            return await self.get_word_audio(word_id=item_id, type=type)
+            return await self.get_word_audio(
+                word_id=item_id, type=type, force=True, fmt=fmt
+            )
         else:
             raise ValueError('Invalid item type')
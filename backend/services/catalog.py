@@ -0,0 +1,245 @@
+# backend/services/catalog.py
+
+import asyncio
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from logger import setup_logger
+from sqlalchemy import select
+
+from backend.core.metrics import metrics
+from backend.db.database import async_session
+from backend.db.models import DifficultyLevel, ItemType, TermORM, WordORM, WordType
+from backend.services.distractors import DistractorIndex
+
+logger = setup_logger(__name__)
+
+
+class WordEntry:
+    """Слово из каталога. Атрибуты совпадают с WordORM."""
+
+    __slots__ = (
+        'id',
+        'word',
+        'translation',
+        'context',
+        'context_translation',
+        'word_type',
+        'difficulty',
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+
+class TermEntry:
+    """Термин из каталога. Атрибуты совпадают с TermORM."""
+
+    __slots__ = (
+        'id',
+        'term',
+        'primary_translation',
+        'category_main',
+        'category_sub',
+        'difficulty',
+        'definition_en',
+        'definition_ru',
+        'example_en',
+        'example_context',
+        'related_terms',
+        'alternate_translations',
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+
+CatalogEntry = Union[WordEntry, TermEntry]
+
+
+def _group_ids(entries: Iterable[CatalogEntry], attribute: str) -> Dict:
+    """Индекс значение атрибута -> отсортированный array ID."""
+    groups: Dict = {}
+    for entry in entries:
+        groups.setdefault(getattr(entry, attribute), array('q')).append(entry.id)
+    return groups
+
+
+class CatalogSnapshot:
+    """
+    Неизменяемый снимок слов и терминов.
+
+    Снимок не меняется после создания: перезагрузка строит новый и
+    подменяет ссылку целиком, поэтому читатель, взявший снимок один раз
+    за запрос, видит согласованные данные.
+    """
+
+    __slots__ = (
+        'version',
+        'loaded_at',
+        '_entries',
+        '_ids',
+        '_by_text',
+        '_by_word_type',
+        '_by_category',
+        '_by_difficulty',
+        'distractors',
+    )
+
+    def __init__(
+        self,
+        version: int,
+        words: Sequence[WordEntry],
+        terms: Sequence[TermEntry],
+    ):
+        self.version = version
+        self.loaded_at = time.time()
+
+        self._entries: Dict[ItemType, Dict[int, CatalogEntry]] = {
+            ItemType.WORD: {word.id: word for word in words},
+            ItemType.TERM: {term.id: term for term in terms},
+        }
+        self._ids = {
+            item_type: array('q', sorted(entries))
+            for item_type, entries in self._entries.items()
+        }
+        self._by_text = {
+            ItemType.WORD: {word.word: word.id for word in words},
+            ItemType.TERM: {term.term: term.id for term in terms},
+        }
+        self._by_word_type = _group_ids(words, 'word_type')
+        self._by_category = _group_ids(terms, 'category_main')
+        self._by_difficulty = {
+            ItemType.WORD: _group_ids(words, 'difficulty'),
+            ItemType.TERM: _group_ids(terms, 'difficulty'),
+        }
+        self.distractors = DistractorIndex(words, terms)
+
+    def count(self, item_type: ItemType) -> int:
+        return len(self._ids[item_type])
+
+    def get(self, item_type: ItemType, item_id: int) -> Optional[CatalogEntry]:
+        return self._entries[item_type].get(item_id)
+
+    def get_many(
+        self, item_type: ItemType, item_ids: Iterable[int]
+    ) -> List[CatalogEntry]:
+        """Элементы по ID в порядке item_ids, отсутствующие пропускаются."""
+        entries = self._entries[item_type]
+        return [entries[item_id] for item_id in item_ids if item_id in entries]
+
+    def all(self, item_type: ItemType) -> List[CatalogEntry]:
+        """Все элементы типа в порядке ID."""
+        entries = self._entries[item_type]
+        return [entries[item_id] for item_id in self._ids[item_type]]
+
+    def find_ids(self, item_type: ItemType, texts: Iterable[str]) -> List[int]:
+        """ID элементов по тексту слова/термина."""
+        by_text = self._by_text[item_type]
+        return [by_text[text] for text in texts if text in by_text]
+
+    def ids(
+        self,
+        item_type: ItemType,
+        word_type: Optional[Union[WordType, str]] = None,
+        category: Optional[str] = None,
+        difficulty: Optional[Union[DifficultyLevel, str]] = None,
+    ) -> array:
+        """
+        ID элементов с учетом фильтров.
+
+        Args:
+            item_type: Тип элементов
+            word_type: Тип слова (только для слов)
+            category: Основная категория (только для терминов)
+            difficulty: Уровень сложности
+
+        Returns:
+            array: Отсортированные ID
+        """
+        groups = []
+        if word_type and item_type == ItemType.WORD:
+            groups.append(self._by_word_type.get(WordType(word_type)))
+        if category and item_type == ItemType.TERM:
+            groups.append(self._by_category.get(category))
+        if difficulty:
+            groups.append(
+                self._by_difficulty[item_type].get(DifficultyLevel(difficulty))
+            )
+
+        if not groups:
+            return self._ids[item_type]
+        if any(group is None for group in groups):
+            return array('q')
+        if len(groups) == 1:
+            return groups[0]
+
+        common = set(groups[0]).intersection(*groups[1:])
+        return array('q', sorted(common))
+
+
+class CatalogService:
+    """Текущий снимок каталога и его перезагрузка."""
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        """Текущий снимок или None, если каталог еще не загружен."""
+        return self._snapshot
+
+    async def reload(self) -> CatalogSnapshot:
+        """Загружает таблицы words и terms и атомарно подменяет снимок."""
+        async with self._lock:
+            async with async_session() as session:
+                # Порядок по ID: индексы получаются отсортированными
+                words = await session.execute(
+                    select(*WordORM.__table__.columns).order_by(WordORM.id)
+                )
+                terms = await session.execute(
+                    select(*TermORM.__table__.columns).order_by(TermORM.id)
+                )
+                word_entries = [WordEntry(**row._mapping) for row in words]
+                term_entries = [
+                    TermEntry(
+                        **{
+                            **row._mapping,
+                            'related_terms': tuple(row.related_terms or ()),
+                            'alternate_translations': tuple(
+                                row.alternate_translations or ()
+                            ),
+                        }
+                    )
+                    for row in terms
+                ]
+
+            self._version += 1
+            # Индексы строятся в отдельном потоке, чтобы не держать event loop
+            snapshot = await asyncio.to_thread(
+                CatalogSnapshot, self._version, word_entries, term_entries
+            )
+            self._snapshot = snapshot
+
+        metrics.set('catalog_version', snapshot.version)
+        for item_type in ItemType:
+            metrics.set(
+                'catalog_items',
+                snapshot.count(item_type),
+                item_type=item_type.value,
+            )
+        logger.info(
+            f'Catalog v{snapshot.version} loaded: '
+            f'{snapshot.count(ItemType.WORD)} words, '
+            f'{snapshot.count(ItemType.TERM)} terms'
+        )
+        return snapshot
+
+
+# Глобальный каталог воркера
+catalog = CatalogService()
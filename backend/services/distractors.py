@@ -0,0 +1,146 @@
+# backend/services/distractors.py
+
+import random
+from array import array
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, List, Sequence
+
+from backend.db.models import ItemType
+
+TOP_DISTRACTORS = 8  # Сколько ближайших вариантов хранить на элемент
+MAX_POSTING = 300  # Слишком частые n-граммы не используются для поиска
+NGRAM_SIZE = 3
+
+
+def char_ngrams(text: str, size: int = NGRAM_SIZE) -> FrozenSet[str]:
+    """Символьные n-граммы строки с границами слова."""
+    padded = f' {text.lower().strip()} '
+    if len(padded) <= size:
+        return frozenset((padded,))
+    return frozenset(padded[i : i + size] for i in range(len(padded) - size + 1))
+
+
+def similarity(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    """Коэффициент Жаккара по множествам n-грамм."""
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def _rank_group(
+    entries: Sequence,
+    text_of: Callable,
+    result: Dict[int, array],
+) -> None:
+    """
+    Ранжирует кандидатов внутри группы по похожести текста.
+
+    Кандидаты ищутся через инвертированный индекс n-грамм, поэтому
+    сравниваются только элементы с общими n-граммами. Тексты, совпадающие
+    с текстом элемента, пропускаются: такой вариант был бы вторым
+    правильным ответом.
+    """
+    grams = {entry.id: char_ngrams(text_of(entry)) for entry in entries}
+    texts = {entry.id: text_of(entry).lower().strip() for entry in entries}
+
+    postings: Dict[str, List[int]] = defaultdict(list)
+    for item_id, item_grams in grams.items():
+        for gram in item_grams:
+            postings[gram].append(item_id)
+
+    for item_id, item_grams in grams.items():
+        needed = TOP_DISTRACTORS - len(result.get(item_id, ()))
+        if needed <= 0:
+            continue
+
+        candidates = set()
+        for gram in item_grams:
+            posting = postings[gram]
+            if len(posting) <= MAX_POSTING:
+                candidates.update(posting)
+
+        ranked = sorted(
+            candidates,
+            key=lambda other: similarity(item_grams, grams[other]),
+            reverse=True,
+        )
+        # Группа небольшая или похожих нет: добираем случайными из группы
+        if len(ranked) < needed + 1:
+            rest = [other for other in grams if other not in candidates]
+            ranked += random.sample(rest, min(len(rest), needed * 2))
+
+        chosen = result.setdefault(item_id, array('q'))
+        used_texts = {texts[item_id]} | {texts.get(other) for other in chosen}
+        for other in ranked:
+            if len(chosen) >= TOP_DISTRACTORS:
+                break
+            if other == item_id or other in chosen or texts[other] in used_texts:
+                continue
+            chosen.append(other)
+            used_texts.add(texts[other])
+
+
+def _build(
+    entries: Sequence,
+    text_of: Callable,
+    group_keys: Sequence[Callable],
+) -> Dict[int, array]:
+    """Индекс по уровням группировки: от самой узкой к более широкой."""
+    result: Dict[int, array] = {}
+    for group_key in group_keys:
+        groups: Dict = defaultdict(list)
+        for entry in entries:
+            groups[group_key(entry)].append(entry)
+        for group in groups.values():
+            _rank_group(group, text_of, result)
+    return result
+
+
+class DistractorIndex:
+    """
+    Заранее посчитанные неправильные варианты ответа для каждого элемента.
+
+    - Слова: тот же word_type и difficulty, затем тот же word_type;
+      ранжирование по похожести перевода
+    - Термины: тот же category_main и difficulty, затем та же категория;
+      ранжирование по похожести термина
+
+    Строится один раз при загрузке каталога, выбор вариантов не делает
+    запросов к БД.
+    """
+
+    __slots__ = ('_distractors',)
+
+    def __init__(self, words: Sequence, terms: Sequence):
+        self._distractors = {
+            ItemType.WORD: _build(
+                words,
+                lambda word: word.translation or '',
+                (
+                    lambda word: (word.word_type, word.difficulty),
+                    lambda word: word.word_type,
+                    lambda word: None,
+                ),
+            ),
+            ItemType.TERM: _build(
+                terms,
+                lambda term: term.term or '',
+                (
+                    lambda term: (term.category_main, term.difficulty),
+                    lambda term: term.category_main,
+                    lambda term: None,
+                ),
+            ),
+        }
+
+    def pick(self, item_type: ItemType, item_id: int, k: int) -> List[int]:
+        """
+        ID k неправильных вариантов для элемента.
+
+        Берутся случайные k из ближайших TOP_DISTRACTORS, чтобы задание
+        не повторялось дословно, но сложность оставалась одинаковой.
+        """
+        candidates = self._distractors[item_type].get(item_id)
+        if not candidates:
+            return []
+        return random.sample(list(candidates), min(k, len(candidates)))
@@ -0,0 +1,211 @@
+# backend/services/generation_queue.py
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from logger import setup_logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.config import settings
+from backend.core.exceptions import ServiceUnavailableError
+from backend.core.metrics import metrics
+from backend.core.task_store import task_store
+from backend.db.database import async_session
+
+logger = setup_logger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_COMPLETED = 'completed'
+STATUS_ERROR = 'error'
+FINAL_STATUSES = (STATUS_COMPLETED, STATUS_ERROR)
+
+POLL_INTERVAL = 0.5  # Опрос Redis, если задание выполняет другой воркер
+
+GenerateCallable = Callable[[AsyncSession], Awaitable[Dict]]
+
+
+@dataclass
+class GenerationJob:
+    id: str
+    task_type: str
+    user_id: int
+    run: GenerateCallable
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class GenerationQueue:
+    """
+    Очередь фоновой генерации заданий через AI.
+
+    Запрос ставит задание в очередь и сразу получает его ID, воркеры
+    выполняют генерацию со своей сессией БД и пишут статус и результат
+    в TaskStatusStore. HTTP соединение и сессия запроса не держатся на
+    время ответа модели и ожидания лимита запросов.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.GENERATION_WORKERS,
+        max_size: int = settings.GENERATION_QUEUE_SIZE,
+        ttl: int = settings.GENERATION_JOB_TTL,
+    ):
+        self.workers_count = workers
+        self.max_size = max_size
+        self.ttl = ttl
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # Завершение заданий этого воркера для long polling без опроса Redis
+        self._done: Dict[str, asyncio.Event] = {}
+
+    async def submit(
+        self, task_type: str, user_id: int, run: GenerateCallable
+    ) -> str:
+        """
+        Ставит генерацию в очередь.
+
+        Args:
+            task_type: Тип задания
+            user_id: Владелец задания
+            run: Корутина генерации, получает сессию воркера
+
+        Returns:
+            str: ID задания для /tasks/status/{task_id}
+        """
+        if self._queue is None:
+            raise ServiceUnavailableError('Generation queue is not running')
+        if self._queue.full():
+            metrics.inc(
+                'generation_jobs_total', task_type=task_type, result='rejected'
+            )
+            raise ServiceUnavailableError('Generation queue is full')
+
+        job = GenerationJob(
+            id=f'{task_type}_{uuid.uuid4().hex}',
+            task_type=task_type,
+            user_id=user_id,
+            run=run,
+        )
+        await self._set_status(job, STATUS_PENDING)
+        self._done[job.id] = asyncio.Event()
+        self._queue.put_nowait(job)
+        metrics.set('generation_queue_depth', self._queue.qsize())
+        return job.id
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """
+        Статус задания, ожидая завершения не дольше timeout секунд.
+
+        Returns:
+            Optional[Dict]: Данные TaskStatusStore или None, если задания нет
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            data = await task_store.get_status(job_id)
+            remaining = deadline - loop.time()
+            if data is None or data['status'] in FINAL_STATUSES or remaining <= 0:
+                return data
+
+            event = self._done.get(job_id)
+            if event is None:
+                await asyncio.sleep(min(POLL_INTERVAL, remaining))
+                continue
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _set_status(
+        self,
+        job: GenerationJob,
+        status: str,
+        result: Optional[Dict] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        await task_store.set_status(
+            job.id, status, result, error, ttl=self.ttl, user_id=job.user_id
+        )
+
+    async def _run(self, job: GenerationJob) -> None:
+        metrics.observe(
+            'generation_queue_wait_seconds',
+            time.monotonic() - job.created_at,
+            task_type=job.task_type,
+        )
+        started = time.monotonic()
+        status, result, error = STATUS_ERROR, None, 'Generation was interrupted'
+        try:
+            await self._set_status(job, STATUS_RUNNING)
+            async with async_session() as session:
+                try:
+                    result = await job.run(session)
+                    await session.commit()
+                except BaseException:
+                    await session.rollback()
+                    raise
+            status, error = STATUS_COMPLETED, None
+        except Exception as e:
+            logger.error(f'Generation job {job.id} failed: {e}', exc_info=True)
+            error = getattr(e, 'detail', None) or str(e)
+        finally:
+            metrics.inc(
+                'generation_jobs_total', task_type=job.task_type, result=status
+            )
+            metrics.observe(
+                'generation_job_seconds',
+                time.monotonic() - started,
+                task_type=job.task_type,
+            )
+            try:
+                await self._set_status(job, status, result, error)
+            finally:
+                event = self._done.pop(job.id, None)
+                if event:
+                    event.set()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            metrics.set('generation_queue_depth', self._queue.qsize())
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Ошибка записи статуса не должна останавливать воркер
+                logger.error(f'Generation worker error: {e}', exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        """Запускает воркеры (в lifespan приложения)."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(self.max_size)
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers_count)
+        ]
+
+    async def stop(self) -> None:
+        """Останавливает воркеры, ожидающие задания помечаются ошибкой."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            try:
+                await self._set_status(
+                    job, STATUS_ERROR, error='Server is shutting down'
+                )
+            except Exception as e:
+                logger.warning(f'Failed to cancel generation job {job.id}: {e}')
+        self._queue = None
+        self._done.clear()
+
+
+# Глобальная очередь генерации воркера
+generation_queue = GenerationQueue()
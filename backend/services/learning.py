@@ -0,0 +1,139 @@
+# backend/services/learning.py
+
+import base64
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from sqlalchemy import and_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.api.v1.schemas.review import DueItem, DueItemsPage
+from backend.db.models import ItemType, TermORM, UserWordStatus, WordORM
+
+
+def encode_cursor(next_review_date: datetime, status_id: int) -> str:
+    """Кодирует позицию в очереди (next_review_date, id) в непрозрачный курсор."""
+    raw = f'{next_review_date.isoformat()}|{status_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Декодирует курсор, полученный от encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        review_date, status_id = raw.split('|')
+        return datetime.fromisoformat(review_date), int(status_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+class ReviewQueueService:
+    """Очередь повторения пользователя на основе idx_next_review."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_due_page(
+        self,
+        user_id: int,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        item_type: Optional[ItemType] = None,
+    ) -> DueItemsPage:
+        """
+        Получение страницы элементов, которые пора повторить.
+
+        Пагинация по ключу (next_review_date, id), без OFFSET: каждая страница
+        это диапазонное чтение idx_next_review (user_id, next_review_date),
+        поэтому стоимость не зависит от номера страницы и числа статусов.
+
+        Args:
+            user_id: ID пользователя
+            limit: Размер страницы
+            cursor: Курсор из предыдущей страницы
+            item_type: Только слова или только термины
+
+        Returns:
+            DueItemsPage: Элементы страницы и курсор следующей
+        """
+        query = (
+            select(UserWordStatus, WordORM.word, TermORM.term)
+            .outerjoin(
+                WordORM,
+                and_(
+                    UserWordStatus.item_type == ItemType.WORD,
+                    WordORM.id == UserWordStatus.item_id,
+                ),
+            )
+            .outerjoin(
+                TermORM,
+                and_(
+                    UserWordStatus.item_type == ItemType.TERM,
+                    TermORM.id == UserWordStatus.item_id,
+                ),
+            )
+            .where(
+                UserWordStatus.user_id == user_id,
+                UserWordStatus.next_review_date <= datetime.utcnow(),
+            )
+        )
+
+        if cursor:
+            after_date, after_id = decode_cursor(cursor)
+            query = query.where(
+                # Первое условие задает границу диапазона для индекса
+                UserWordStatus.next_review_date >= after_date,
+                tuple_(UserWordStatus.next_review_date, UserWordStatus.id)
+                > tuple_(after_date, after_id),
+            )
+
+        if item_type:
+            query = query.where(UserWordStatus.item_type == item_type)
+
+        # Берем на один элемент больше, чтобы понять, есть ли следующая страница
+        query = query.order_by(
+            UserWordStatus.next_review_date, UserWordStatus.id
+        ).limit(limit + 1)
+
+        result = await self.session.execute(query)
+        rows = result.all()
+
+        items: List[DueItem] = [
+            DueItem(
+                item_id=status.item_id,
+                item_type=status.item_type,
+                text=word if status.item_type == ItemType.WORD else term,
+                mastery_level=status.mastery_level,
+                ease_factor=status.ease_factor,
+                interval_level=status.interval_level,
+                last_reviewed=status.last_reviewed,
+                next_review_date=status.next_review_date,
+            )
+            for status, word, term in rows[:limit]
+        ]
+
+        next_cursor = None
+        if len(rows) > limit:
+            last_status = rows[limit - 1][0]
+            next_cursor = encode_cursor(
+                last_status.next_review_date, last_status.id
+            )
+
+        return DueItemsPage(items=items, next_cursor=next_cursor)
+
+    async def iter_due_items(
+        self,
+        user_id: int,
+        page_size: int = 100,
+        item_type: Optional[ItemType] = None,
+    ) -> AsyncIterator[DueItem]:
+        """Постранично обходит всю очередь повторения пользователя."""
+        cursor = None
+        while True:
+            page = await self.get_due_page(user_id, page_size, cursor, item_type)
+            for item in page.items:
+                yield item
+
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
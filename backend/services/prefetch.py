@@ -0,0 +1,175 @@
+# backend/services/prefetch.py
+
+import json
+import random
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from logger import setup_logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.metrics import metrics
+from backend.core.task_store import task_store
+from backend.db.database import async_session
+from backend.db.models import ItemType, WordType
+from backend.db.orm import (
+    get_learning_items_by_ids,
+    record_interactions,
+    select_learning_ids,
+)
+
+logger = setup_logger(__name__)
+
+PREFETCH_SETS = 3  # Сколько наборов готовить вперед
+PREFETCH_TTL = 600  # Время жизни наборов в секундах
+
+# Тип элементов и размер набора, которые запрашивает генерация задания
+PREFETCH_PROFILES: Dict[str, Tuple[ItemType, int]] = {
+    'word_translation': (ItemType.WORD, 1),
+    'term_definition': (ItemType.TERM, 1),
+    'word_matching': (ItemType.WORD, 15),
+}
+
+
+def _choose_filter(task_type: str) -> Optional[str]:
+    """Фильтр набора, как его выбрал бы обработчик без параметров."""
+    if task_type == 'word_translation':
+        return random.choice(list(WordType)).name
+    return None
+
+
+class LearningPrefetcher:
+    """
+    Готовит следующие наборы элементов для генерации заданий.
+
+    После проверки ответа в фоне вычисляются PREFETCH_SETS непересекающихся
+    наборов и кладутся в Redis список prefetch:{user_id}:{task_type}:{size}.
+    Генерация забирает готовый набор (LPOP) вместо тяжелого запроса
+    выбора, при промахе обработчик выбирает элементы как обычно.
+    """
+
+    def __init__(self, sets_count: int = PREFETCH_SETS, ttl: int = PREFETCH_TTL):
+        self.sets_count = sets_count
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(user_id: int, task_type: str, size: int) -> str:
+        return f'prefetch:{user_id}:{task_type}:{size}'
+
+    async def _select_sets(
+        self, session: AsyncSession, user_id: int, task_type: str, size: int
+    ) -> List[Dict]:
+        item_type, _ = PREFETCH_PROFILES[task_type]
+        taken: Set[int] = set()
+        sets = []
+
+        for _ in range(self.sets_count):
+            item_filter = _choose_filter(task_type)
+            # Наборы не пересекаются: выбранные ID исключаются из следующих
+            item_ids = await select_learning_ids(
+                session,
+                user_id,
+                item_type,
+                size,
+                word_type=item_filter,
+                exclude=taken,
+            )
+            if len(item_ids) < size:
+                continue
+
+            taken.update(item_ids)
+            sets.append(
+                {'ids': item_ids, 'filter': item_filter, 'created_at': time.time()}
+            )
+
+        return sets
+
+    async def refill(
+        self, user_id: int, task_type: str, size: Optional[int] = None
+    ) -> None:
+        """
+        Пересчитывает готовые наборы пользователя (фоновая задача).
+
+        Старые наборы удаляются: после проверки ответа они устарели.
+        """
+        if task_type not in PREFETCH_PROFILES:
+            return
+        size = size or PREFETCH_PROFILES[task_type][1]
+        key = self._key(user_id, task_type, size)
+
+        try:
+            started = time.perf_counter()
+            async with async_session() as session:
+                sets = await self._select_sets(session, user_id, task_type, size)
+
+            async with task_store.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                if sets:
+                    pipe.rpush(key, *(json.dumps(entry) for entry in sets))
+                    pipe.expire(key, self.ttl)
+                await pipe.execute()
+
+            metrics.observe(
+                'prefetch_refill_seconds',
+                time.perf_counter() - started,
+                task_type=task_type,
+            )
+            logger.debug(
+                f'Prefetched {len(sets)} sets of {task_type} for user {user_id}'
+            )
+        except Exception as e:
+            # Предвыборка не должна влиять на пользователя
+            metrics.inc('prefetch_refill_errors_total', task_type=task_type)
+            logger.warning(f'Prefetch refill failed for user {user_id}: {e}')
+
+    async def take(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        task_type: str,
+        size: Optional[int] = None,
+    ) -> Optional[Tuple[Optional[str], list]]:
+        """
+        Забирает готовый набор и записывает взаимодействие с его элементами.
+
+        Returns:
+            Optional[Tuple]: (фильтр набора, ORM объекты) или None при промахе
+        """
+        item_type, default_size = PREFETCH_PROFILES[task_type]
+        key = self._key(user_id, task_type, size or default_size)
+
+        try:
+            raw = await task_store.redis.lpop(key)
+        except Exception as e:
+            logger.warning(f'Prefetch lookup failed: {e}')
+            raw = None
+
+        entry = json.loads(raw) if raw else None
+        items = []
+        if entry:
+            items = await get_learning_items_by_ids(
+                session, item_type, entry['ids']
+            )
+
+        # Элемент мог быть удален из каталога после предвыборки
+        if not entry or len(items) != len(entry['ids']):
+            metrics.inc(
+                'prefetch_requests_total', task_type=task_type, result='miss'
+            )
+            return None
+
+        metrics.inc('prefetch_requests_total', task_type=task_type, result='hit')
+        metrics.observe(
+            'prefetch_staleness_seconds',
+            time.time() - entry['created_at'],
+            task_type=task_type,
+        )
+
+        await record_interactions(
+            session, user_id, [(item.id, item_type) for item in items]
+        )
+        return entry['filter'], items
+
+
+# Глобальный экземпляр предвыборки
+learning_prefetcher = LearningPrefetcher()
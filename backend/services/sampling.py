@@ -0,0 +1,142 @@
+# backend/services/sampling.py
+
+import random
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, Select, func, literal, select, true
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Во сколько раз больше точек запрашивать у БД: часть совпадет после seek
+SEEK_OVERSAMPLING = 2
+# Раундов seek до перехода на выборку из списка id подходящих строк
+SEEK_ROUNDS = 3
+
+
+def sample_ids(
+    population: Sequence[int],
+    k: int,
+    reject: Optional[Callable[[int], bool]] = None,
+) -> List[int]:
+    """
+    Выбирает k различных случайных ID из population.
+
+    Случайные позиции берутся напрямую из массива (например, индекса
+    каталога), поэтому стоимость O(k) и не зависит от размера таблицы.
+    Если reject отбрасывает большую часть популяции, выбор идет из
+    отфильтрованного остатка за O(n).
+
+    Args:
+        population: ID, из которых выбираем
+        k: Сколько ID нужно
+        reject: Предикат исключения (например, уже изучаемые элементы)
+
+    Returns:
+        List[int]: До k ID в случайном порядке
+    """
+    size = len(population)
+    if k <= 0 or size == 0:
+        return []
+
+    chosen: List[int] = []
+    seen = set()
+    max_attempts = 4 * k + 32
+    for _ in range(max_attempts):
+        if len(chosen) == k:
+            return chosen
+        item_id = population[random.randrange(size)]
+        if item_id in seen or (reject and reject(item_id)):
+            continue
+        seen.add(item_id)
+        chosen.append(item_id)
+
+    if len(chosen) < k:
+        rest = [
+            item_id
+            for item_id in population
+            if item_id not in seen and not (reject and reject(item_id))
+        ]
+        chosen += random.sample(rest, min(k - len(chosen), len(rest)))
+
+    return chosen
+
+
+def random_seek_query(
+    model, points: Sequence[int], filters: Sequence = ()
+) -> Select:
+    """
+    Запрос случайной выборки без сортировки всей таблицы.
+
+    Для каждой случайной точки выполняется поиск по первичному ключу
+    первой подходящей строки с id >= точки (LATERAL ... LIMIT 1), то есть
+    k коротких проходов по индексу вместо ORDER BY random().
+    Элементы после больших пропусков id выпадают чаще остальных.
+
+    Args:
+        model: ORM модель с колонкой id
+        points: Случайные значения id
+        filters: Дополнительные условия на модель
+
+    Returns:
+        Select: Запрос, возвращающий id (возможны повторы)
+    """
+    seeds = (
+        func.unnest(literal(list(points), ARRAY(Integer)))
+        .table_valued('point')
+        .render_derived()
+    )
+    seek = (
+        select(model.id)
+        .where(model.id >= seeds.c.point, *filters)
+        .order_by(model.id)
+        .limit(1)
+        .lateral('seek')
+    )
+    return select(seek.c.id).select_from(seeds).join(seek, true())
+
+
+async def sample_ids_from_db(
+    session: AsyncSession, model, k: int, filters: Sequence = ()
+) -> List[int]:
+    """
+    Случайные ID строк модели: границы id по индексу и random_seek_query.
+    Используется, когда каталог не загружен или заданы filters.
+
+    Если подходящие строки сгруппированы в пространстве id (категория
+    загружена подряд), многие точки находят одну строку. Недостающие
+    ID добираются новыми раундами seek без уже найденных, после
+    SEEK_ROUNDS раундов - выборкой из списка id подходящих строк.
+    Меньше k ID возвращается, только если подходящих строк меньше k.
+    """
+    if k <= 0:
+        return []
+
+    bounds: Tuple[Optional[int], Optional[int]] = (
+        await session.execute(select(func.min(model.id), func.max(model.id)))
+    ).one()
+    low, high = bounds
+    if low is None:
+        return []
+
+    found: Dict[int, None] = {}
+    for _ in range(SEEK_ROUNDS):
+        missing = k - len(found)
+        points = [
+            random.randint(low, high) for _ in range(missing * SEEK_OVERSAMPLING)
+        ]
+        conditions = list(filters)
+        if found:
+            conditions.append(model.id.not_in(list(found)))
+        result = await session.execute(
+            random_seek_query(model, points, conditions)
+        )
+        found.update(dict.fromkeys(result.scalars()))
+        if len(found) >= k:
+            item_ids = list(found)
+            random.shuffle(item_ids)
+            return item_ids[:k]
+
+    population = (
+        (await session.execute(select(model.id).where(*filters))).scalars().all()
+    )
+    return sample_ids(population, k)
@@ -0,0 +1,204 @@
+# backend/services/srs.py
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from logger import setup_logger
+from sqlalchemy import and_, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.status_cache import status_cache
+from backend.db.models import ItemType, UserWordStatus
+
+logger = setup_logger(__name__)
+
+# Параметры SM-2 (см. metrics_explain.md)
+MIN_EASE_FACTOR = 1.3
+MAX_EASE_FACTOR = 3.0
+DEFAULT_EASE_FACTOR = 2.5
+MASTERY_WEIGHT = 0.3  # Вес нового результата в mastery_level
+SUCCESS_SCORE = 0.8  # Начиная с этой оценки повторение считается успешным
+FAILURE_SCORE = 0.3  # До этой оценки включительно интервал сбрасывается
+BASE_INTERVALS = [1, 3, 7, 14, 30]  # Базовые интервалы в днях
+
+# Колонки, которые пересчитываются при каждом повторении
+SCHEDULE_COLUMNS = (
+    'mastery_level',
+    'ease_factor',
+    'interval_level',
+    'last_reviewed',
+    'next_review_date',
+)
+
+
+def calculate_mastery_level(current_level: float, score: float) -> float:
+    """Экспоненциальное сглаживание уровня освоения (0-100)."""
+    level = current_level * (1 - MASTERY_WEIGHT) + score * 100 * MASTERY_WEIGHT
+    return max(0.0, min(100.0, level))
+
+
+def calculate_ease_factor(current_factor: float, score: float) -> float:
+    """Коррекция ease_factor: растет при успехе, падает при ошибке."""
+    if score >= SUCCESS_SCORE:
+        return min(MAX_EASE_FACTOR, round(current_factor + 0.1, 2))
+    if score <= FAILURE_SCORE:
+        return max(MIN_EASE_FACTOR, round(current_factor - 0.2, 2))
+    return current_factor
+
+
+def calculate_interval_level(current_level: int, score: float) -> int:
+    """Номер интервала: растет при успехе, сбрасывается при ошибке."""
+    if score >= SUCCESS_SCORE:
+        return current_level + 1
+    if score <= FAILURE_SCORE:
+        return 0
+    return current_level
+
+
+def calculate_next_review_date(
+    interval_level: int, ease_factor: float, score: float, now: datetime
+) -> datetime:
+    """Дата следующего повторения по номеру интервала и ease_factor."""
+    if interval_level == 0:
+        days = 1
+    else:
+        base_interval = BASE_INTERVALS[min(interval_level - 1, 4)]
+        days = base_interval * ease_factor * (0.8 + score * 0.4)
+
+    return now + timedelta(days=days)
+
+
+def schedule_review(status: Optional[Dict], score: float, now: datetime) -> Dict:
+    """
+    Рассчитывает новое SRS состояние элемента после повторения.
+
+    Args:
+        status: Текущие значения SCHEDULE_COLUMNS или None для нового элемента
+        score: Оценка попытки от 0 до 1
+        now: Время повторения
+
+    Returns:
+        Dict: Новые значения SCHEDULE_COLUMNS
+    """
+    mastery_level = status['mastery_level'] if status else 0.0
+    ease_factor = status['ease_factor'] if status else DEFAULT_EASE_FACTOR
+    interval_level = status['interval_level'] if status else 0
+
+    ease_factor = calculate_ease_factor(ease_factor or DEFAULT_EASE_FACTOR, score)
+    interval_level = calculate_interval_level(interval_level or 0, score)
+
+    return {
+        'mastery_level': calculate_mastery_level(mastery_level or 0.0, score),
+        'ease_factor': ease_factor,
+        'interval_level': interval_level,
+        'last_reviewed': now,
+        'next_review_date': calculate_next_review_date(
+            interval_level, ease_factor, score, now
+        ),
+    }
+
+
+class SrsService:
+    """Планировщик повторений: единая точка обновления UserWordStatus."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _load_statuses(
+        self, user_id: int, keys: Sequence[Tuple[int, ItemType]]
+    ) -> Dict[Tuple[int, ItemType], Dict]:
+        """Загружает текущие SRS значения элементов одним запросом."""
+        ids_by_type: Dict[ItemType, List[int]] = {}
+        for item_id, item_type in keys:
+            ids_by_type.setdefault(item_type, []).append(item_id)
+
+        result = await self.session.execute(
+            select(
+                UserWordStatus.item_id,
+                UserWordStatus.item_type,
+                *(getattr(UserWordStatus, column) for column in SCHEDULE_COLUMNS),
+            ).where(
+                UserWordStatus.user_id == user_id,
+                or_(
+                    *(
+                        and_(
+                            UserWordStatus.item_type == item_type,
+                            UserWordStatus.item_id.in_(item_ids),
+                        )
+                        for item_type, item_ids in ids_by_type.items()
+                    )
+                ),
+            )
+        )
+
+        return {(row.item_id, row.item_type): dict(row._mapping) for row in result}
+
+    async def apply_reviews(
+        self,
+        user_id: int,
+        reviews: Sequence[Tuple[int, ItemType, float]],
+    ) -> Dict[Tuple[int, ItemType], Dict]:
+        """
+        Применяет результаты повторений к пачке элементов.
+
+        Текущие значения берутся из status_cache (для горячих пользователей
+        без запроса) или читаются одним запросом, новые записываются одним
+        INSERT ... ON CONFLICT DO UPDATE по idx_user_word_status и попадают
+        в кэш после коммита.
+
+        Args:
+            user_id: ID пользователя
+            reviews: Список (item_id, item_type, score), score от 0 до 1
+
+        Returns:
+            Dict: Новое SRS состояние по ключу (item_id, item_type)
+        """
+        if not reviews:
+            return {}
+
+        now = datetime.utcnow()
+        keys = list(
+            dict.fromkeys(
+                (item_id, item_type) for item_id, item_type, _ in reviews
+            )
+        )
+        working_set = await status_cache.load(self.session, user_id)
+        if working_set is not None:
+            states = {
+                key: working_set.get(*key) for key in keys if key in working_set
+            }
+        else:
+            states = await self._load_statuses(user_id, keys)
+
+        # Повторные оценки одного элемента применяются последовательно
+        updated: Dict[Tuple[int, ItemType], Dict] = {}
+        for item_id, item_type, score in reviews:
+            key = (item_id, item_type)
+            current = updated.get(key) or states.get(key)
+            updated[key] = schedule_review(current, score, now)
+
+        stmt = pg_insert(UserWordStatus).values(
+            [
+                {
+                    'user_id': user_id,
+                    'item_id': item_id,
+                    'item_type': item_type,
+                    **state,
+                }
+                for (item_id, item_type), state in updated.items()
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                UserWordStatus.user_id,
+                UserWordStatus.item_id,
+                UserWordStatus.item_type,
+            ],
+            set_={column: stmt.excluded[column] for column in SCHEDULE_COLUMNS},
+        )
+        await self.session.execute(stmt)
+        status_cache.stage(self.session, user_id, updated)
+
+        logger.debug(f'Applied {len(reviews)} reviews for user {user_id}')
+        return updated
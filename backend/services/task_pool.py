@@ -0,0 +1,193 @@
+# backend/services/task_pool.py
+
+import hashlib
+import json
+import math
+import random
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+from backend.db.models import GeneratedTaskItem, ItemType
+from backend.db.orm import find_item_ids, record_interactions
+
+# Случайный выбор среди равных лучших, чтобы задания не повторялись
+TOP_MATCHES = 3
+
+
+class PooledTask(NamedTuple):
+    id: int
+    words: List[str]
+    terms: List[str]
+    response: Dict[str, Any]
+
+
+def task_fingerprint(
+    words: Sequence[str], terms: Sequence[str], difficulty: str, *extra: str
+) -> str:
+    """
+    Нормализованный ключ параметров задания.
+
+    sha256 от отсортированных слов и терминов, сложности и дополнительных
+    параметров (стиль и тема для email). Хранится в колонке fingerprint
+    с уникальным индексом и служит ключом объединения запросов.
+    """
+    payload = json.dumps(
+        [sorted(words or []), sorted(terms or []), difficulty, *extra],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+async def index_task_items(
+    session: AsyncSession,
+    task_type: str,
+    task_id: int,
+    words: Sequence[str],
+    terms: Sequence[str],
+) -> None:
+    """Добавляет слова и термины задания в обратный индекс."""
+    rows = [
+        {
+            'task_type': task_type,
+            'item_type': item_type,
+            'item': item,
+            'task_id': task_id,
+        }
+        for item_type, items in ((ItemType.WORD, words), (ItemType.TERM, terms))
+        for item in dict.fromkeys(items or [])
+    ]
+    if rows:
+        await session.execute(
+            pg_insert(GeneratedTaskItem).values(rows).on_conflict_do_nothing()
+        )
+
+
+async def find_pooled_task(
+    session: AsyncSession,
+    model,
+    task_type: str,
+    difficulty: str,
+    words: Sequence[str],
+    terms: Sequence[str],
+    filters: Sequence = (),
+    min_coverage: float = settings.TASK_POOL_MIN_COVERAGE,
+) -> Optional[PooledTask]:
+    """
+    Готовое задание, покрывающее больше всего элементов пользователя.
+
+    По обратному индексу generated_task_items для каждого задания нужной
+    сложности считается, сколько слов и терминов пользователя (сначала
+    к повторению) в нем есть. Задание должно покрывать не меньше
+    min_coverage элементов пользователя, иначе оно тренирует в основном
+    чужую лексику и генерируется новое. Из заданий с лучшим счетом
+    выбирается случайное (среди TOP_MATCHES).
+
+    Метрики: task_pool_requests_total (hit/miss, доля miss - доля запросов,
+    ушедших в модель), task_pool_overlap и task_pool_coverage (доля
+    элементов пользователя в выбранном задании).
+
+    Args:
+        session: Сессия БД
+        model: ChatDialogGenerated или EmailStructureGenerated
+        task_type: Тип задания в индексе и метриках
+        difficulty: Сложность задания
+        words: Слова пользователя
+        terms: Термины пользователя
+        filters: Дополнительные условия (стиль, тема)
+        min_coverage: Минимальная доля покрытых элементов пользователя
+
+    Returns:
+        Optional[PooledTask]: Задание или None, если подходящего нет
+    """
+    wanted = len(set(words)) + len(set(terms))
+    min_score = max(1, math.ceil(wanted * min_coverage))
+    matches = []
+    if wanted:
+        score = func.count().label('score')
+        item = GeneratedTaskItem
+        matches = (
+            await session.execute(
+                select(model.id, score)
+                .join(
+                    item,
+                    and_(item.task_id == model.id, item.task_type == task_type),
+                )
+                .where(
+                    or_(
+                        and_(
+                            item.item_type == ItemType.WORD,
+                            item.item.in_(list(words)),
+                        ),
+                        and_(
+                            item.item_type == ItemType.TERM,
+                            item.item.in_(list(terms)),
+                        ),
+                    ),
+                    model.difficulty == difficulty,
+                    *filters,
+                )
+                .group_by(model.id)
+                .having(score >= min_score)
+                # Случайный порядок при равном счете, чтобы задания не повторялись
+                .order_by(score.desc(), func.random())
+                .limit(TOP_MATCHES)
+            )
+        ).all()
+    if not matches:
+        metrics.inc('task_pool_requests_total', task_type=task_type, result='miss')
+        return None
+    # matches отсортированы по счету: выбираем только среди равных лучшему
+    best = random.choice(
+        [match for match in matches if match.score == matches[0].score]
+    )
+
+    task = (
+        await session.execute(
+            select(model.words, model.terms, model.response).where(
+                model.id == best.id
+            )
+        )
+    ).one()
+    metrics.inc('task_pool_requests_total', task_type=task_type, result='hit')
+    metrics.observe(
+        'task_pool_overlap',
+        best.score,
+        buckets=(0, 1, 2, 3, 4, 5, 6),
+        task_type=task_type,
+    )
+    metrics.observe(
+        'task_pool_coverage',
+        best.score / wanted,
+        buckets=(0.25, 0.5, 0.75, 1.0),
+        task_type=task_type,
+    )
+    return PooledTask(best.id, task.words, task.terms, task.response)
+
+
+async def record_task_items(
+    session: AsyncSession,
+    user_id: int,
+    words: Sequence[str],
+    terms: Sequence[str],
+) -> None:
+    """Одна запись взаимодействия со словами и терминами задания."""
+    word_ids = await find_item_ids(session, ItemType.WORD, words)
+    term_ids = await find_item_ids(session, ItemType.TERM, terms)
+    await record_interactions(
+        session,
+        user_id,
+        [(word_id, ItemType.WORD) for word_id in word_ids]
+        + [(term_id, ItemType.TERM) for term_id in term_ids],
+    )
+
+
+async def pool_sizes(session: AsyncSession, model, *columns) -> Dict[tuple, int]:
+    """Число готовых заданий по группам (difficulty, *columns)."""
+    group = (model.difficulty, *columns)
+    result = await session.execute(select(*group, func.count()).group_by(*group))
+    return {tuple(row[:-1]): row[-1] for row in result}
@@ -1,8 +1,16 @@
 # Source path: backend/tests/test_audio.py
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import requests
 
+from backend.ai.audio_encoder import remove_variants
+from backend.core.config import settings
+
+MAX_HEALTH_LATENCY = 0.25  # Допустимое время ответа /health во время синтеза
+
 
 def test_get_term_audio(base_url: str, first_term_id: int, capsys):
     """Тест получения аудио для термина"""
@@ -49,3 +57,121 @@ def test_regenerate_audio(base_url: str, first_word_id: int, capsys):
 
     assert response.status_code == 200
     assert response.headers.get('content-type') == 'audio/wav'
+
+
+def test_audio_synthesis_does_not_block_api(base_url: str, capsys):
+    """Тест: API отвечает, пока идет синтез нескольких аудио"""
+    with capsys.disabled():
+        print('\n=== Отзывчивость API во время синтеза ===')
+
+    words = requests.get(f'{base_url}/api/v1/words/all').json()[:4]
+
+    def regenerate(word_id: int) -> float:
+        started = time.perf_counter()
+        response = requests.post(
+            f'{base_url}/api/v1/audio/regenerate/word/{word_id}'
+        )
+        assert response.status_code == 200
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(len(words)) as executor:
+        synthesis = executor.map(regenerate, [word['id'] for word in words])
+        health = []
+        for _ in range(5):
+            started = time.perf_counter()
+            assert requests.get(f'{base_url}/health').status_code == 200
+            health.append(time.perf_counter() - started)
+        synthesis = list(synthesis)
+
+    with capsys.disabled():
+        print(f'Синтез: {[round(t, 3) for t in synthesis]}')
+        print(f'/health: {[round(t, 3) for t in health]}')
+
+    # Время синтеза зависит от длины текста и прогретости пула Piper,
+    # поэтому граница фиксированная, как --max-latency в load_test_audio
+    assert max(health) < MAX_HEALTH_LATENCY
+
+
+def synthesized_count(base_url: str) -> float:
+    """Число успешных синтезов по /metrics"""
+    counters = requests.get(f'{base_url}/metrics').json()['counters']
+    return counters.get('tts_synthesis_total{result="ok"}', 0)
+
+
+def test_concurrent_audio_requests_get_whole_file(
+    base_url: str, first_term_id: int, capsys
+):
+    """Тест: одновременные запросы отсутствующего аудио - один синтез"""
+    with capsys.disabled():
+        print('\n=== Одновременные запросы одного аудио ===')
+
+    # Файл удаляется, чтобы все запросы пришли во время его генерации
+    wav_path = Path(settings.PIPER_AUDIO_PATH) / f'term_{first_term_id}_def.wav'
+    remove_variants(wav_path)
+    wav_path.unlink(missing_ok=True)
+
+    url = f'{base_url}/api/v1/audio/terms/{first_term_id}?type=def'
+    synthesized_before = synthesized_count(base_url)
+    with ThreadPoolExecutor(6) as executor:
+        responses = list(executor.map(lambda _: requests.get(url), range(6)))
+    synthesized = synthesized_count(base_url) - synthesized_before
+
+    with capsys.disabled():
+        print(f'Статус коды: {[response.status_code for response in responses]}')
+        print(f'Размеры: {[len(response.content) for response in responses]}')
+        print(f'Синтезов: {synthesized}')
+
+    assert all(response.status_code == 200 for response in responses)
+    assert synthesized == 1
+    assert len({response.content for response in responses}) == 1
+    content = responses[0].content
+    assert content.startswith(b'RIFF')
+    # Размер из заголовка RIFF совпадает с полученным: файл записан целиком
+    assert int.from_bytes(content[4:8], 'little') == len(content) - 8
+
+
+def test_get_word_audio_opus(base_url: str, first_word_id: int, capsys):
+    """Тест получения аудио слова в Opus по Accept"""
+    with capsys.disabled():
+        print('\n=== Аудио слова в Opus ===')
+
+    response = requests.get(
+        f'{base_url}/api/v1/audio/words/{first_word_id}',
+        headers={'Accept': 'audio/ogg, audio/mpeg;q=0.9, audio/wav;q=0.5'},
+    )
+
+    with capsys.disabled():
+        print(f'Статус код: {response.status_code}')
+        print(f'Content-Type: {response.headers.get("content-type")}')
+        print(f'Размер: {len(response.content)}')
+
+    assert response.status_code == 200
+    assert response.headers.get('content-type') == 'audio/ogg'
+    assert response.headers.get('vary') == 'Accept'
+    assert response.content.startswith(b'OggS')
+
+
+def test_get_term_audio_mp3(base_url: str, first_term_id: int, capsys):
+    """Тест получения аудио термина в MP3 по Accept"""
+    with capsys.disabled():
+        print('\n=== Аудио термина в MP3 ===')
+
+    # Варианты создаются при синтезе: WAV, озвученный до их появления,
+    # отдавался бы без MP3
+    regenerated = requests.post(
+        f'{base_url}/api/v1/audio/regenerate/term/{first_term_id}'
+    )
+    assert regenerated.status_code == 200
+
+    response = requests.get(
+        f'{base_url}/api/v1/audio/terms/{first_term_id}',
+        headers={'Accept': 'audio/mpeg'},
+    )
+
+    with capsys.disabled():
+        print(f'Статус код: {response.status_code}')
+        print(f'Content-Type: {response.headers.get("content-type")}')
+        print(f'Размер: {len(response.content)}')
+
+    assert response.status_code == 200
+    assert response.headers.get('content-type') == 'audio/mpeg'
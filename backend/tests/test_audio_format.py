@@ -0,0 +1,26 @@
+# Source path: backend/tests/test_audio_format.py
+
+import pytest
+
+from backend.ai.audio_encoder import negotiate_format
+
+
+@pytest.mark.parametrize(
+    'accept, expected',
+    [
+        (None, 'wav'),
+        ('*/*', 'wav'),
+        ('application/json, text/plain, */*', 'wav'),
+        ('audio/*', 'wav'),
+        ('audio/ogg, audio/mpeg, audio/wav;q=0.5', 'opus'),
+        ('audio/ogg; codecs=opus', 'opus'),
+        ('audio/mpeg, audio/wav;q=0.5', 'mp3'),
+        ('audio/ogg;q=0.5, audio/mpeg', 'mp3'),
+        ('audio/ogg;q=0, audio/wav', 'wav'),
+        ('AUDIO/MPEG', 'mp3'),
+        ('audio/ogg;q=abc, audio/x-wav', 'wav'),
+    ],
+)
+def test_negotiate_format(accept, expected):
+    """Тест выбора формата аудио по Accept"""
+    assert negotiate_format(accept) == expected
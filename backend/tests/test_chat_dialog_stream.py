@@ -0,0 +1,192 @@
+# Source path: backend/tests/test_chat_dialog_stream.py
+
+import json
+import uuid
+from types import SimpleNamespace
+from typing import Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.ai.gemini import GeminiServiceSinglethon
+from backend.ai.prompt_cache import prompt_cache
+from backend.api.deps import get_current_user_id
+from backend.api.v1.endpoints.tasks import tasks_router
+from backend.api.v1.endpoints.tasks.base import TaskRegistry
+from backend.api.v1.endpoints.tasks.handlers.chat_dialog import (
+    ChatDialogHandler,
+)
+from backend.main import app
+from backend.tests.test_json_stream import example_response
+
+CHUNK_SIZE = 16
+
+
+class FakeModel:
+    """Модель, отдающая пример ответа chat_dialog кусками по CHUNK_SIZE."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content_async(self, parts, generation_config, stream):
+        assert stream is True
+        self.calls += 1
+        text = example_response()
+
+        async def chunks():
+            for start in range(0, len(text), CHUNK_SIZE):
+                yield SimpleNamespace(text=text[start : start + CHUNK_SIZE])
+
+        return chunks()
+
+
+class FakeSession:
+    """Сессия без базы: обработчик только фиксирует и откатывает."""
+
+    def __init__(self):
+        self.commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+@pytest.fixture
+def fake_model(monkeypatch) -> FakeModel:
+    """Модель и лимитер запросов сервиса Gemini без обращений к API"""
+    model = FakeModel()
+
+    async def acquire(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(GeminiServiceSinglethon, 'model', model)
+    monkeypatch.setattr(GeminiServiceSinglethon.rate_limiter, 'acquire', acquire)
+    prompt_cache.clear()
+    yield model
+    prompt_cache.clear()
+
+
+def expected_result() -> Dict:
+    return json.loads(example_response().split('```json')[1].split('```')[0])
+
+
+def dialog_params() -> Dict:
+    """Уникальные слова: ответ не должен найтись в кэше прошлых запусков"""
+    return {
+        'messages_count': 3,
+        'words': [f'word-{uuid.uuid4().hex}'],
+        'terms': ['API'],
+        'difficulty': 'intermediate',
+    }
+
+
+def parse_sse(body: str) -> List[tuple]:
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_stream_prompt_items_then_cached_result(fake_model: FakeModel):
+    """Тест порядка событий stream_prompt и кэширования результата"""
+    params = dialog_params()
+    expected = expected_result()
+
+    events = [
+        event
+        async for event in GeminiServiceSinglethon.stream_prompt(
+            'chat_dialog', params, 'messages'
+        )
+    ]
+
+    assert events == [('item', message) for message in expected['messages']] + [
+        ('result', expected)
+    ]
+    assert fake_model.calls == 1
+
+    prompt = GeminiServiceSinglethon._render_prompt('chat_dialog', params)
+    key = GeminiServiceSinglethon._cache_key('chat_dialog', prompt)
+    assert await prompt_cache.get('chat_dialog', key) == expected
+
+    # Повторный запрос отдается из кэша в том же порядке, без модели
+    cached = [
+        event
+        async for event in GeminiServiceSinglethon.stream_prompt(
+            'chat_dialog', params, 'messages'
+        )
+    ]
+    assert cached == events
+    assert fake_model.calls == 1
+
+
+def test_stream_route_sse_events(fake_model: FakeModel, monkeypatch):
+    """Тест событий SSE: сообщения по порядку, затем задание"""
+    params = dialog_params()
+    expected = expected_result()
+    session = FakeSession()
+    saved = []
+
+    async def prepare(self, request_params):
+        # Слова и термины заданы в запросе, пул и база не нужны
+        dialog = request_params['params']
+        return (
+            dialog['words'],
+            dialog['terms'],
+            request_params['difficulty'],
+            dialog['messages_count'],
+            None,
+        )
+
+    async def find_existing_task(self, session, fingerprint):
+        return None
+
+    async def save_generated_task(self, session, *args):
+        saved.append(args[-1])
+
+    monkeypatch.setattr(ChatDialogHandler, '_prepare', prepare)
+    monkeypatch.setattr(
+        ChatDialogHandler, '_find_existing_task', find_existing_task
+    )
+    monkeypatch.setattr(
+        ChatDialogHandler, '_save_generated_task', save_generated_task
+    )
+    monkeypatch.setitem(TaskRegistry._handlers, 'chat_dialog', ChatDialogHandler())
+    monkeypatch.setattr(tasks_router, 'async_session', lambda: session)
+    monkeypatch.setitem(app.dependency_overrides, get_current_user_id, lambda: 1)
+
+    task_data = {
+        'task_type': 'chat_dialog',
+        'user_id': 1,
+        'difficulty': params['difficulty'],
+        'params': params,
+    }
+    # Без with: lifespan приложения (база, Redis) не запускается
+    client = TestClient(app)
+    response = client.post(
+        '/api/v1/tasks/generate/chat-dialog/stream', json=task_data
+    )
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/event-stream')
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ['message'] * len(
+        expected['messages']
+    ) + ['task']
+    assert [data for _, data in events[:-1]] == expected['messages']
+
+    task = events[-1][1]
+    assert task['content'] == expected
+    assert task['metadata']['used_words'] == params['words']
+    assert saved == [task]
+    assert session.commits == 1
+    assert fake_model.calls == 1
@@ -17,3 +17,17 @@ def test_health_check(base_url: str, capsys):
     assert response.status_code == 200
     assert response.json()['status'] == 'ok'
     assert 'version' in response.json()
+
+
+def test_metrics(base_url: str, capsys):
+    """Тест эндпоинта метрик"""
+    with capsys.disabled():
+        print('\n=== Metrics ===')
+
+    response = requests.get(f'{base_url}/metrics')
+
+    with capsys.disabled():
+        pprint(response.json())
+
+    assert response.status_code == 200
+    assert {'counters', 'gauges', 'histograms'} <= response.json().keys()
@@ -0,0 +1,94 @@
+# Source path: backend/tests/test_json_extract.py
+
+import json
+import random
+import re
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from backend.ai.json_extract import (
+    JsonExtractError,
+    extract_json,
+    remove_trailing_commas,
+)
+
+CORPUS_DIR = Path(__file__).parent / 'data' / 'model_responses'
+VALID = sorted(CORPUS_DIR.glob('*.json'))
+INVALID = sorted(CORPUS_DIR.glob('invalid_*.txt'))
+
+
+@pytest.mark.parametrize('expected_path', VALID, ids=lambda path: path.stem)
+def test_corpus(expected_path: Path):
+    """Тест разбора сохраненных ответов модели"""
+    text = expected_path.with_suffix('.txt').read_text(encoding='utf-8')
+    expected = json.loads(expected_path.read_text(encoding='utf-8'))
+
+    assert extract_json(text) == expected
+
+
+@pytest.mark.parametrize('path', INVALID, ids=lambda path: path.stem)
+def test_corpus_invalid(path: Path):
+    """Тест ошибок на битых ответах"""
+    with pytest.raises(JsonExtractError):
+        extract_json(path.read_text(encoding='utf-8'))
+
+
+def add_trailing_commas(json_str: str, rng: random.Random) -> str:
+    """Висячие запятые перед частью закрывающих скобок вне строк."""
+    parts: List[str] = []
+    for token in re.split(r'("(?:[^"\\]|\\.)*")', json_str):
+        if token.startswith('"'):
+            parts.append(token)
+            continue
+        parts.append(
+            re.sub(
+                r'(?<=[}\]"\d])(\s*)([}\]])',
+                lambda m: (',' if rng.random() < 0.5 else '') + m[1] + m[2],
+                token,
+            )
+        )
+    return ''.join(parts)
+
+
+def mutate(expected: Dict, rng: random.Random) -> str:
+    """Ответ модели в одной из встречающихся форм."""
+    text = json.dumps(
+        expected, ensure_ascii=rng.random() < 0.3, indent=rng.choice([None, 2, 4])
+    )
+    if rng.random() < 0.5:
+        text = add_trailing_commas(text, rng)
+    wrapper = rng.choice(
+        [
+            '{}',
+            '```json\n{}\n```',
+            '```\n{}\n```',
+            'Sure!\n```json\n{}\n```\nDone.',
+        ]
+    )
+    text = wrapper.replace('{}', text)
+    if rng.random() < 0.2:
+        text = text.replace('\n', '\r\n')
+    return text
+
+
+@pytest.mark.parametrize('expected_path', VALID, ids=lambda path: path.stem)
+def test_fuzzed_corpus(expected_path: Path):
+    """Тест случайных вариантов оформления тех же ответов"""
+    expected = json.loads(expected_path.read_text(encoding='utf-8'))
+    rng = random.Random(expected_path.stem)
+    for _ in range(50):
+        text = mutate(expected, rng)
+        assert extract_json(text) == expected, text
+
+
+def test_trailing_commas_inside_strings_are_kept():
+    """Тест: запятые перед скобками внутри строк не удаляются"""
+    json_str = '{"a": "x, ]", "b": [1, 2, ], "c": "\\", }",}'
+
+    assert (
+        remove_trailing_commas(json_str)
+        == '{"a": "x, ]", "b": [1, 2 ], "c": "\\", }"}'
+    )
+    assert extract_json(json_str) == {'a': 'x, ]', 'b': [1, 2], 'c': '", }'}
@@ -0,0 +1,96 @@
+# Source path: backend/tests/test_json_stream.py
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+from backend.ai.json_stream import JsonArrayStream
+
+PROMPT_PATH = Path(__file__).parents[1] / 'ai' / 'prompts' / 'chat_dialog.yml'
+
+
+def example_response() -> str:
+    """Пример ответа модели из промпта chat_dialog, как его пишет модель."""
+    prompt = PROMPT_PATH.read_text(encoding='utf-8')
+    example = prompt.split('```json')[1].split('```')[0]
+    return '```json' + example.replace('{{', '{').replace('}}', '}') + '```'
+
+
+class FakeStreamHandler(BaseHTTPRequestHandler):
+    """Отдает пример ответа кусками по 16 символов с паузами, как модель."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        text = example_response()
+        for start in range(0, len(text), 16):
+            data = text[start : start + 16].encode('utf-8')
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+            time.sleep(0.002)
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_stream_url():
+    """Локальный сервер с потоковым ответом вместо модели"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeStreamHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+def test_messages_are_parsed_while_streaming(fake_stream_url: str, capsys):
+    """Тест выдачи сообщений до окончания ответа"""
+    with capsys.disabled():
+        print('\n=== Потоковый разбор сообщений диалога ===')
+
+    stream = JsonArrayStream('messages')
+    messages = []
+    received_before_end = []
+    with requests.get(fake_stream_url, stream=True) as response:
+        for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+            for message in stream.feed(chunk):
+                messages.append(message)
+                received_before_end.append(len(stream.text))
+
+    full = json.loads(stream.text.split('```json')[1].split('```')[0])
+
+    with capsys.disabled():
+        print(f'Messages: {len(messages)}, received at: {received_before_end}')
+
+    assert messages == full['messages']
+    # Первое сообщение готово задолго до конца ответа
+    assert received_before_end[0] < len(stream.text) / 2
+
+
+def test_strings_and_trailing_commas():
+    """Тест скобок в строках, вложенных массивов и висячих запятых"""
+    text = (
+        '{"context": "messages: [{]", "messages": ['
+        '{"text": "a } \\" {", "gaps": [{"id": 1}]},'
+        '{"text": "b",},'
+        '], "tail": [{"text": "c"}]}'
+    )
+    stream = JsonArrayStream('messages')
+    messages = []
+    for char in text:
+        messages += stream.feed(char)
+
+    assert messages == [
+        {'text': 'a } " {', 'gaps': [{'id': 1}]},
+        {'text': 'b'},
+    ]
@@ -0,0 +1,70 @@
+# Source path: backend/tests/test_review.py
+
+from pprint import pprint
+from typing import Dict
+
+import requests
+
+
+def test_get_due_items(base_url: str, auth_headers: Dict[str, str], capsys):
+    """Тест получения очереди повторения"""
+    with capsys.disabled():
+        print('\n=== Очередь повторения ===')
+
+    response = requests.get(
+        f'{base_url}/api/v1/review/due',
+        params={'limit': 5},
+        headers=auth_headers,
+    )
+
+    with capsys.disabled():
+        pprint(response.json())
+
+    assert response.status_code == 200
+    page = response.json()
+    assert 'items' in page
+    assert 'next_cursor' in page
+    assert len(page['items']) <= 5
+
+
+def test_due_items_keyset_pagination(
+    base_url: str, auth_headers: Dict[str, str], capsys
+):
+    """Тест постраничного обхода очереди повторения по курсору"""
+    with capsys.disabled():
+        print('\n=== Пагинация очереди повторения ===')
+
+    seen = []
+    cursor = None
+    for _ in range(5):
+        params = {'limit': 2}
+        if cursor:
+            params['cursor'] = cursor
+
+        response = requests.get(
+            f'{base_url}/api/v1/review/due', params=params, headers=auth_headers
+        )
+        assert response.status_code == 200
+
+        page = response.json()
+        seen.extend((item['item_type'], item['item_id']) for item in page['items'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    with capsys.disabled():
+        print(f'Получено элементов: {len(seen)}')
+
+    # Страницы не пересекаются
+    assert len(seen) == len(set(seen))
+
+
+def test_due_items_invalid_cursor(base_url: str, auth_headers: Dict[str, str]):
+    """Тест обработки некорректного курсора"""
+    response = requests.get(
+        f'{base_url}/api/v1/review/due',
+        params={'cursor': 'not-a-cursor'},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 400
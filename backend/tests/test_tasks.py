@@ -1,6 +1,7 @@
 # Source path: backend/tests/test_tasks.py
 
 
+import json
 from pprint import pprint
 from typing import Dict
 
@@ -117,3 +118,96 @@ def test_generate_word_translation(
     assert response.status_code == 200
     assert 'task_id' in response.json()
     assert 'result' in response.json()
+
+
+def test_generate_chat_dialog_async(
+    base_url: str, auth_headers: Dict[str, str], capsys
+):
+    """Тест фоновой генерации chat dialog и получения статуса"""
+    with capsys.disabled():
+        print('\n=== Фоновая генерация chat dialog ===')
+
+    task_data = {
+        'task_type': 'chat_dialog',
+        'user_id': 1,
+        'params': {'messages_count': 3, 'difficulty': 'intermediate'},
+    }
+
+    response = requests.post(
+        f'{base_url}/api/v1/tasks/generate/chat-dialog',
+        headers=auth_headers,
+        params={'async': True},
+        json=task_data,
+    )
+
+    with capsys.disabled():
+        pprint(response.json())
+
+    assert response.status_code == 202
+    assert response.json()['status'] == 'pending'
+    task_id = response.json()['task_id']
+
+    response = requests.get(
+        f'{base_url}/api/v1/tasks/status/{task_id}',
+        headers=auth_headers,
+        params={'wait': 30},
+    )
+
+    with capsys.disabled():
+        pprint(response.json())
+
+    assert response.status_code == 200
+    assert response.json()['task_id'] == task_id
+    assert response.json()['status'] in (
+        'pending',
+        'running',
+        'completed',
+        'error',
+    )
+
+    response = requests.get(
+        f'{base_url}/api/v1/tasks/status/unknown_task', headers=auth_headers
+    )
+    assert response.status_code == 404
+
+
+def test_generate_chat_dialog_stream(
+    base_url: str, auth_headers: Dict[str, str], capsys
+):
+    """Тест потоковой генерации chat dialog (Server-Sent Events)"""
+    with capsys.disabled():
+        print('\n=== Потоковая генерация chat dialog ===')
+
+    task_data = {
+        'task_type': 'chat_dialog',
+        'user_id': 1,
+        'params': {'messages_count': 3, 'difficulty': 'intermediate'},
+    }
+
+    events = []
+    with requests.post(
+        f'{base_url}/api/v1/tasks/generate/chat-dialog/stream',
+        headers=auth_headers,
+        json=task_data,
+        stream=True,
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/event-stream')
+
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith('event: '):
+                event = line[len('event: ') :]
+            elif line.startswith('data: '):
+                events.append((event, json.loads(line[len('data: ') :])))
+
+    with capsys.disabled():
+        pprint([event for event, _ in events])
+
+    assert events
+    assert events[-1][0] in ('task', 'error')
+    if events[-1][0] == 'task':
+        task = events[-1][1]
+        assert task['type'] == 'chat_dialog'
+        messages = [data for event, data in events if event == 'message']
+        assert messages == task['content']['messages']
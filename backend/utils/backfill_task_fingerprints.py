@@ -0,0 +1,168 @@
+"""
+Заполнение fingerprint в chat_dialog_generated и email_structure_generated.
+
+Запуск:
+    python -m backend.utils.backfill_task_fingerprints
+    python -m backend.utils.backfill_task_fingerprints --dry-run
+
+Добавляет колонку fingerprint, удаляет старые индексы по JSON колонкам
+words/terms, заполняет fingerprint существующих заданий и создает
+уникальный индекс. Из заданий с одинаковыми параметрами fingerprint
+получает последнее добавленное (его выбирал прежний поиск), у остальных
+он остается пустым, и поиск их больше не находит. Повторный запуск
+безопасен.
+
+Запускать до выкладки кода, который ищет задания по fingerprint.
+"""
+
+import argparse
+import asyncio
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import select, text, update
+
+from backend.db.database import async_engine, async_session
+from backend.db.models import ChatDialogGenerated, EmailStructureGenerated
+from backend.services.task_pool import task_fingerprint
+
+# Модель, старый индекс, новый индекс, дополнительные параметры fingerprint
+TABLES = (
+    (
+        ChatDialogGenerated,
+        'idx_chat_dialog_words_terms',
+        'uq_chat_dialog_fingerprint',
+        (),
+    ),
+    (
+        EmailStructureGenerated,
+        'idx_email_structure_words_terms',
+        'uq_email_structure_fingerprint',
+        ('style', 'topic'),
+    ),
+)
+
+
+async def migrate_schema(model, old_index: str) -> None:
+    """Колонка fingerprint вместо индекса по JSON колонкам."""
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            text(
+                f'ALTER TABLE {model.__tablename__} '
+                'ADD COLUMN IF NOT EXISTS fingerprint VARCHAR(64)'
+            )
+        )
+        await conn.execute(text(f'DROP INDEX IF EXISTS {old_index}'))
+
+
+async def backfill(
+    model, extra: Tuple[str, ...], batch: int, dry_run: bool
+) -> Tuple[int, int]:
+    """
+    Заполняет fingerprint пачками от новых заданий к старым.
+
+    Returns:
+        Tuple[int, int]: Заполнено заданий, пропущено дубликатов
+    """
+    async with async_session() as session:
+        # Уже заполненные при прошлом запуске или новым кодом
+        seen: Set[str] = set(
+            await session.scalars(
+                select(model.fingerprint).where(model.fingerprint.is_not(None))
+            )
+        )
+
+    filled = duplicates = 0
+    last_id: Optional[int] = None
+    while True:
+        async with async_session() as session:
+            # Курсор по id: дубликаты остаются пустыми и не читаются повторно
+            query = (
+                select(
+                    model.id,
+                    model.words,
+                    model.terms,
+                    model.difficulty,
+                    *(getattr(model, column) for column in extra),
+                )
+                .where(model.fingerprint.is_(None))
+                .order_by(model.id.desc())
+                .limit(batch)
+            )
+            if last_id is not None:
+                query = query.where(model.id < last_id)
+            rows = (await session.execute(query)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            updates: Dict[int, str] = {}
+            for row in rows:
+                fingerprint = task_fingerprint(
+                    row.words, row.terms, row.difficulty, *row[4:]
+                )
+                if fingerprint in seen:
+                    duplicates += 1
+                    continue
+                seen.add(fingerprint)
+                updates[row.id] = fingerprint
+
+            if updates and not dry_run:
+                # Пакетный UPDATE по первичному ключу
+                await session.execute(
+                    update(model),
+                    [
+                        {'id': task_id, 'fingerprint': fingerprint}
+                        for task_id, fingerprint in updates.items()
+                    ],
+                )
+                await session.commit()
+            filled += len(updates)
+            print(
+                f'{model.__tablename__}: {filled} filled, {duplicates} duplicates'
+            )
+
+    return filled, duplicates
+
+
+async def create_index(model, index: str) -> None:
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            text(
+                f'CREATE UNIQUE INDEX IF NOT EXISTS {index} '
+                f'ON {model.__tablename__} (fingerprint)'
+            )
+        )
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Логирование SQL мешает читать вывод
+    async_engine.echo = False
+
+    try:
+        for model, old_index, index, extra in TABLES:
+            if not args.dry_run:
+                await migrate_schema(model, old_index)
+            filled, duplicates = await backfill(
+                model, extra, args.batch, args.dry_run
+            )
+            if not args.dry_run:
+                await create_index(model, index)
+            print(
+                f'{model.__tablename__}: done, {filled} filled, '
+                f'{duplicates} duplicates left without fingerprint'
+            )
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--batch', type=int, default=1000, help='Заданий за одну транзакцию'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Посчитать без изменений (колонка fingerprint уже должна быть)',
+    )
+    asyncio.run(main(parser.parse_args()))
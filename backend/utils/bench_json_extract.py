@@ -0,0 +1,107 @@
+"""
+Бенчмарк разбора ответов модели: прежний split + regex против extract_json.
+
+Запуск:
+    python -m backend.utils.bench_json_extract
+    python -m backend.utils.bench_json_extract --repeat 2000 --scale 1 10
+
+Для каждого ответа из backend/tests/data/model_responses (ответ с
+--scale раз увеличенными массивами) сравнивается время прежнего разбора
+(split по ```, две замены regex по всей строке, json.loads) и
+extract_json (поиск блока по индексу, исправление запятых только при
+ошибке, orjson если установлен). Без логирования: оно не зависит от
+способа разбора.
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from backend.ai import json_extract
+from backend.ai.json_extract import extract_json
+
+CORPUS_DIR = Path(__file__).parents[1] / 'tests' / 'data' / 'model_responses'
+
+
+def legacy_extract(response_text: str) -> Dict:
+    """Прежний GeminiService._extract_json_from_response без логирования."""
+    cleaned_response = response_text.strip()
+    if '```json' in cleaned_response:
+        json_str = cleaned_response.split('```json')[1].split('```')[0].strip()
+    elif '```' in cleaned_response:
+        parts = cleaned_response.split('```')
+        if len(parts) < 3:
+            raise ValueError('Malformed code block in response')
+        json_str = parts[1].strip()
+    else:
+        json_str = cleaned_response
+    json_str = re.sub(r',(\s*})', r'\1', json_str)
+    json_str = re.sub(r',(\s*])', r'\1', json_str)
+    parsed = json.loads(json_str)
+    if not isinstance(parsed, dict):
+        raise ValueError('Response is not a JSON object')
+    return parsed
+
+
+def scaled(text: str, scale: int) -> str:
+    """Ответ, в котором массивы верхнего уровня повторены scale раз."""
+    if scale == 1:
+        return text
+    data = extract_json(text)
+    for key, value in data.items():
+        if isinstance(value, list):
+            data[key] = value * scale
+    return '```json\n' + json.dumps(data, ensure_ascii=False, indent=2) + '\n```'
+
+
+def timed(call: Callable, text: str, repeat: int) -> float:
+    """Среднее время вызова в микросекундах."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call(text)
+    return (time.perf_counter() - started) / repeat * 1_000_000
+
+
+def main(args: argparse.Namespace) -> None:
+    backend = 'orjson' if json_extract.orjson is not None else 'json'
+    print(f'extract_json backend: {backend}, среднее из {args.repeat}')
+    print(
+        f'{"response":<34} | {"scale":>5} | {"KB":>6} | '
+        f'{"legacy us":>10} | {"new us":>10} | {"x":>5}'
+    )
+
+    paths: List[Path] = sorted(CORPUS_DIR.glob('*.json'))
+    for path in paths:
+        text = path.with_suffix('.txt').read_text(encoding='utf-8')
+        for scale in args.scale:
+            sample = scaled(text, scale)
+            new_time = timed(extract_json, sample, args.repeat)
+            try:
+                legacy_time = timed(legacy_extract, sample, args.repeat)
+                legacy = f'{legacy_time:>10.1f} | {new_time:>10.1f} | '
+                legacy += f'{legacy_time / new_time:>5.1f}'
+            except ValueError:
+                # Прежний разбор портит запятые перед скобками внутри строк
+                legacy = f'{"error":>10} | {new_time:>10.1f} | {"-":>5}'
+            print(
+                f'{path.stem:<34} | {scale:>5} | {len(sample) / 1024:>6.1f} | '
+                + legacy
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--repeat', type=int, default=1000, help='Повторов на каждый ответ'
+    )
+    parser.add_argument(
+        '--scale',
+        type=int,
+        nargs='+',
+        default=[1, 10],
+        help='Во сколько раз увеличить массивы ответа',
+    )
+    main(parser.parse_args())
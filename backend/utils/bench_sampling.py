@@ -0,0 +1,113 @@
+"""
+Бенчмарк случайной выборки: ORDER BY random() против sample_ids и random seek.
+
+Запуск:
+    python -m backend.utils.bench_sampling --rows 10000 100000 --k 4
+    python -m backend.utils.bench_sampling --rows 10000 100000 --db
+
+Без --db сравниваются варианты в памяти: полная перетасовка (как
+sorted(..., key=random) и ORDER BY random()) и sample_ids по массиву ID
+каталога, в том числе при исключении половины элементов. С --db те же
+размеры проверяются во временной таблице Postgres: ORDER BY random() LIMIT k
+против random_seek_query. Время sample_ids и random seek не должно
+заметно расти с размером таблицы.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from array import array
+from typing import Callable, List
+
+from sqlalchemy import Column, Integer, MetaData, Table, func, select, text
+
+from backend.db.database import async_engine
+from backend.services.sampling import random_seek_query, sample_ids
+
+
+def timed(call: Callable, repeat: int) -> float:
+    """Среднее время вызова в микросекундах."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - started) / repeat * 1_000_000
+
+
+def run_memory(rows_counts: List[int], k: int, repeat: int) -> None:
+    print(f'\n=== В памяти, k={k}, среднее из {repeat} ===')
+    print(
+        f'{"rows":>9} | {"shuffle":>12} | {"sample_ids":>12} | {"50% reject":>12}'
+    )
+    for rows in rows_counts:
+        ids = array('q', range(1, rows + 1))
+        tracked = set(range(1, rows + 1, 2))
+
+        shuffle = timed(
+            lambda: sorted(ids, key=lambda _: random.random())[:k],
+            max(1, repeat // 100),
+        )
+        sampled = timed(lambda: sample_ids(ids, k), repeat)
+        rejected = timed(
+            lambda: sample_ids(ids, k, reject=tracked.__contains__), repeat
+        )
+        print(
+            f'{rows:>9} | {shuffle:>10.1f}us | {sampled:>10.1f}us | '
+            f'{rejected:>10.1f}us'
+        )
+
+
+async def run_db(rows_counts: List[int], k: int, repeat: int) -> None:
+    # Логирование SQL мешает читать результаты
+    async_engine.echo = False
+
+    table = Table('bench_sampling_items', MetaData(), Column('id', Integer))
+
+    print(f'\n=== Postgres, k={k}, среднее из {repeat} ===')
+    print(f'{"rows":>9} | {"ORDER BY random()":>18} | {"random seek":>12}')
+    async with async_engine.connect() as conn:
+        for rows in rows_counts:
+            await conn.execute(text('DROP TABLE IF EXISTS bench_sampling_items'))
+            await conn.execute(
+                text('CREATE TEMP TABLE bench_sampling_items (id int PRIMARY KEY)')
+            )
+            await conn.execute(
+                text(
+                    'INSERT INTO bench_sampling_items (id) '
+                    'SELECT generate_series(1, :rows)'
+                ),
+                {'rows': rows},
+            )
+            await conn.execute(text('ANALYZE bench_sampling_items'))
+
+            order_by = select(table.c.id).order_by(func.random()).limit(k)
+            started = time.perf_counter()
+            for _ in range(repeat):
+                (await conn.execute(order_by)).all()
+            order_by_time = (time.perf_counter() - started) / repeat * 1000
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                points = [random.randint(1, rows) for _ in range(k * 2)]
+                (await conn.execute(random_seek_query(table.c, points))).all()
+            seek_time = (time.perf_counter() - started) / repeat * 1000
+
+            print(f'{rows:>9} | {order_by_time:>16.2f}ms | {seek_time:>10.2f}ms')
+
+        await conn.rollback()
+
+    await async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--db', action='store_true', help='Сравнить в Postgres')
+    args = parser.parse_args()
+
+    if args.db:
+        asyncio.run(run_db(args.rows, args.k, args.repeat))
+    else:
+        run_memory(args.rows, args.k, args.repeat)
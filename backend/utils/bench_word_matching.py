@@ -0,0 +1,159 @@
+"""
+Бенчмарк проверки задания word_matching: число обращений к БД до и после.
+
+Запуск:
+    python -m backend.utils.bench_word_matching --pairs 5 10 20
+
+Для первого пользователя и первых N слов выполняется проверка ответа двумя
+способами: построчно (как было: SELECT статуса и отдельная попытка на каждую
+пару) и пакетно (WordMatchingTaskHandler.validate). Все изменения
+откатываются, данные в базе не меняются.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.api.v1.endpoints.tasks.handlers.word_matching import (
+    WordMatchingTaskHandler,
+)
+from backend.db.database import async_engine
+from backend.db.models import (
+    ItemType,
+    LearningAttempt,
+    TaskType,
+    UserORM,
+    UserWordStatus,
+    WordORM,
+)
+
+
+class RoundTripCounter:
+    """Считает SQL выражения, отправленные в БД через engine."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+async def validate_per_pair(
+    session: AsyncSession, user_id: int, user_pairs: Dict[str, str]
+) -> None:
+    """Прежний вариант: SELECT статуса и flush попытки на каждую пару."""
+    for word_id in user_pairs:
+        session.add(
+            LearningAttempt(
+                user_id=user_id,
+                item_id=int(word_id),
+                item_type=ItemType.WORD,
+                task_type=TaskType.WORD_MATCHING,
+                is_successful=True,
+                score=1.0,
+            )
+        )
+        status = await session.execute(
+            select(UserWordStatus).where(
+                UserWordStatus.user_id == user_id,
+                UserWordStatus.item_id == int(word_id),
+                UserWordStatus.item_type == ItemType.WORD,
+            )
+        )
+        word_status = status.scalar_one_or_none()
+        if word_status:
+            word_status.mastery_level = min(100, word_status.mastery_level + 5)
+        else:
+            session.add(
+                UserWordStatus(
+                    user_id=user_id,
+                    item_id=int(word_id),
+                    item_type=ItemType.WORD,
+                    mastery_level=5.0,
+                )
+            )
+    await session.flush()
+
+
+async def validate_batched(
+    session: AsyncSession, user_id: int, user_pairs: Dict[str, str]
+) -> None:
+    """Новый вариант: пакетная проверка обработчика."""
+    # commit внутри validate подменяем на flush, чтобы откатить изменения
+    session.commit = session.flush
+    await WordMatchingTaskHandler().validate(
+        {
+            'session': session,
+            'user_id': user_id,
+            'user_pairs': user_pairs,
+            'correct_pairs': dict(user_pairs),
+            'wrong_attempts': [],
+            'time_spent': 0,
+        }
+    )
+
+
+async def measure(func, user_id: int, user_pairs: Dict[str, str]) -> tuple:
+    """Выполняет вариант проверки в откатываемой транзакции."""
+    counter = RoundTripCounter()
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', counter)
+    try:
+        async with async_engine.connect() as conn:
+            transaction = await conn.begin()
+            session = AsyncSession(bind=conn, expire_on_commit=False)
+            started = time.perf_counter()
+            await func(session, user_id, user_pairs)
+            elapsed = time.perf_counter() - started
+            await transaction.rollback()
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', counter)
+
+    return counter.count, elapsed
+
+
+async def run(pairs_counts: List[int]) -> None:
+    # Логирование SQL мешает читать результаты
+    async_engine.echo = False
+
+    async with AsyncSession(async_engine) as session:
+        user_id = await session.scalar(select(UserORM.id).limit(1))
+        words = (
+            await session.execute(
+                select(WordORM.id, WordORM.translation)
+                .order_by(WordORM.id)
+                .limit(max(pairs_counts))
+            )
+        ).all()
+
+    if user_id is None or not words:
+        print('❌ Нужен хотя бы один пользователь и слова в базе')
+        return
+
+    print(f'\n=== word_matching validate, user_id={user_id} ===')
+    print(f'{"pairs":>6} | {"per-pair":>16} | {"batched":>16}')
+    for pairs_count in pairs_counts:
+        user_pairs = {
+            str(word_id): translation.lower()
+            for word_id, translation in words[:pairs_count]
+        }
+        before, before_time = await measure(validate_per_pair, user_id, user_pairs)
+        after, after_time = await measure(validate_batched, user_id, user_pairs)
+        print(
+            f'{len(user_pairs):>6} | '
+            f'{before:>4} rt {before_time * 1000:>7.1f}ms | '
+            f'{after:>4} rt {after_time * 1000:>7.1f}ms'
+        )
+
+    await async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--pairs', type=int, nargs='+', default=[5, 10, 20])
+    args = parser.parse_args()
+
+    asyncio.run(run(args.pairs))
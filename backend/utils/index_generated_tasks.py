@@ -0,0 +1,89 @@
+"""
+Построение обратного индекса слов и терминов сгенерированных заданий.
+
+Запуск:
+    python -m backend.utils.index_generated_tasks
+    python -m backend.utils.index_generated_tasks --batch 500
+
+Новые задания попадают в generated_task_items при сохранении, скрипт
+добавляет в индекс задания, сохраненные до его появления. Задания, уже
+попавшие в индекс, пропускаются, повторный запуск безопасен.
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import and_, exists, select
+
+from backend.db.database import async_engine, async_session
+from backend.db.models import (
+    ChatDialogGenerated,
+    EmailStructureGenerated,
+    GeneratedTaskItem,
+)
+from backend.services.task_pool import index_task_items
+
+TABLES = (
+    ('chat_dialog', ChatDialogGenerated),
+    ('email_structure', EmailStructureGenerated),
+)
+
+
+async def index_table(task_type: str, model, batch: int) -> int:
+    """Индексирует задания без записей в индексе, возвращает их число."""
+    indexed = 0
+    last_id = 0
+    while True:
+        async with async_session() as session:
+            missing = ~exists().where(
+                and_(
+                    GeneratedTaskItem.task_type == task_type,
+                    GeneratedTaskItem.task_id == model.id,
+                )
+            )
+            # Курсор по id: задания без слов и терминов не читаются повторно
+            rows = (
+                await session.execute(
+                    select(model.id, model.words, model.terms)
+                    .where(model.id > last_id, missing)
+                    .order_by(model.id)
+                    .limit(batch)
+                )
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            for row in rows:
+                await index_task_items(
+                    session, task_type, row.id, row.words, row.terms
+                )
+            await session.commit()
+            indexed += len(rows)
+            print(f'{task_type}: {indexed} tasks indexed')
+    return indexed
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Логирование SQL мешает читать вывод
+    async_engine.echo = False
+
+    try:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(
+                GeneratedTaskItem.__table__.create, checkfirst=True
+            )
+
+        for task_type, model in TABLES:
+            indexed = await index_table(task_type, model, args.batch)
+            print(f'{task_type}: done, {indexed} tasks indexed')
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--batch', type=int, default=500, help='Заданий за одну транзакцию'
+    )
+    asyncio.run(main(parser.parse_args()))
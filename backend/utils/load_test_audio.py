@@ -0,0 +1,145 @@
+"""
+Нагрузочный тест синтеза аудио: отзывчивость API во время пачки синтезов.
+
+Запуск:
+    python -m backend.utils.load_test_audio
+    python -m backend.utils.load_test_audio --burst 16 --max-latency 0.2
+
+Скрипт работает с запущенным сервером. Сначала замеряется время ответа
+/health без нагрузки, затем одновременно отправляется --burst запросов
+/audio/regenerate (каждый запускает Piper), и /health опрашивается, пока
+они выполняются. Если синтез блокирует event loop, /health во время
+пачки отвечает так же долго, как синтез. Код выхода 1, если p95 /health
+во время пачки больше --max-latency.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summary(values: List[float]) -> str:
+    if not values:
+        return 'нет данных'
+    return (
+        f'n={len(values)}, p50={statistics.median(values) * 1000:.1f}ms, '
+        f'p95={percentile(values, 0.95) * 1000:.1f}ms, '
+        f'max={max(values) * 1000:.1f}ms'
+    )
+
+
+async def timed_get(client: httpx.AsyncClient, url: str) -> float:
+    started = time.perf_counter()
+    response = await client.get(url)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def probe(
+    client: httpx.AsyncClient, interval: float, stop: asyncio.Event
+) -> List[float]:
+    """Время ответа /health, пока не установлен stop."""
+    latencies = []
+    while not stop.is_set():
+        latencies.append(await timed_get(client, '/health'))
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def regenerate(client: httpx.AsyncClient, word_id: int) -> float:
+    started = time.perf_counter()
+    response = await client.post(f'/api/v1/audio/regenerate/word/{word_id}')
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+def print_tts_metrics(snapshot: Dict) -> None:
+    for kind in ('gauges', 'histograms', 'counters'):
+        for key, value in snapshot[kind].items():
+            if key.startswith('tts_'):
+                if isinstance(value, dict):
+                    value = (
+                        f'count={value["count"]}, sum={value["sum"]:.2f}, '
+                        f'max={value["max"]}'
+                    )
+                print(f'  {key}: {value}')
+
+
+async def main(args: argparse.Namespace) -> int:
+    async with httpx.AsyncClient(
+        base_url=args.url, timeout=args.timeout
+    ) as client:
+        response = await client.get('/api/v1/words/all')
+        response.raise_for_status()
+        word_ids = [word['id'] for word in response.json()][: args.burst]
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, args.interval, stop))
+        await asyncio.sleep(args.baseline)
+        stop.set()
+        baseline = await probe_task
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, args.interval, stop))
+        started = time.perf_counter()
+        synthesis = await asyncio.gather(
+            *(regenerate(client, word_id) for word_id in word_ids)
+        )
+        total = time.perf_counter() - started
+        stop.set()
+        during = await probe_task
+
+        metrics_response = await client.get('/metrics')
+
+    print(f'\n/health без нагрузки:  {summary(baseline)}')
+    print(f'/health во время синтеза: {summary(during)}')
+    print(
+        f'Синтез ({len(synthesis)} запросов за {total:.2f}s): {summary(synthesis)}'
+    )
+    print('\nМетрики TTS (воркер, ответивший на /metrics):')
+    print_tts_metrics(metrics_response.json())
+
+    if during and percentile(during, 0.95) > args.max_latency:
+        print(f'\nFAIL: p95 /health больше {args.max_latency * 1000:.0f}ms')
+        return 1
+    print('\nOK')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--url', default='http://localhost:7000', help='Адрес сервера'
+    )
+    parser.add_argument(
+        '--burst', type=int, default=8, help='Одновременных запросов синтеза'
+    )
+    parser.add_argument(
+        '--interval', type=float, default=0.05, help='Интервал опроса /health'
+    )
+    parser.add_argument(
+        '--baseline',
+        type=float,
+        default=2.0,
+        help='Секунд замера /health без нагрузки',
+    )
+    parser.add_argument(
+        '--max-latency',
+        type=float,
+        default=0.25,
+        help='Допустимый p95 /health во время синтеза в секундах',
+    )
+    parser.add_argument(
+        '--timeout', type=float, default=120.0, help='Тайм-аут запросов'
+    )
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,223 @@
+"""
+Предварительная озвучка всего каталога слов и терминов.
+
+Запуск:
+    python -m backend.utils.prerender_audio
+    python -m backend.utils.prerender_audio --workers 8 --force
+    python -m backend.utils.prerender_audio --dry-run
+
+Озвучиваются те же файлы, что отдает /audio: слово и пример (word_{id},
+word_{id}_context), термин и определение (term_{id}, term_{id}_def).
+Уже существующие файлы пропускаются, --force озвучивает все заново.
+Синтез идет параллельно в --workers процессах Piper, каждый со своей
+загруженной моделью голоса.
+
+Готовые файлы дописываются в манифест (JSON lines, хэш голоса и текста).
+Прерванный запуск с теми же параметрами продолжается с места остановки,
+в том числе с --force. После запуска без ошибок манифест удаляется.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+import wave
+from pathlib import Path
+from typing import Dict, List, TextIO, Tuple
+
+from sqlalchemy import select
+
+from backend.ai.piper_pool import PiperPool
+from backend.ai.piper_tts import PiperTTS, TTSError
+from backend.core.config import settings
+from backend.db.database import async_engine, async_session
+from backend.db.models import TermORM, WordORM
+from backend.services.audio import term_audio, word_audio
+
+PROGRESS_EVERY = 50  # Файлов между строками прогресса
+
+Job = Tuple[str, str]  # (имя файла, текст)
+
+
+async def load_jobs() -> List[Job]:
+    """Файлы и тексты для всех слов и терминов каталога."""
+    jobs = []
+    async with async_session() as session:
+        words = await session.execute(
+            select(WordORM.id, WordORM.word, WordORM.context).order_by(WordORM.id)
+        )
+        for word in words:
+            jobs.append(word_audio(word))
+            if word.context:
+                jobs.append(word_audio(word, 'context'))
+
+        terms = await session.execute(
+            select(TermORM.id, TermORM.term, TermORM.definition_en).order_by(
+                TermORM.id
+            )
+        )
+        for term in terms:
+            jobs.append(term_audio(term))
+            jobs.append(term_audio(term, 'def'))
+    return jobs
+
+
+def text_hash(voice: str, text: str) -> str:
+    return hashlib.sha1(f'{voice}\n{text}'.encode('utf-8')).hexdigest()
+
+
+def read_manifest(path: Path) -> Dict[str, str]:
+    """Готовые файлы прерванного запуска: имя файла -> хэш."""
+    done = {}
+    if not path.exists():
+        return done
+    with path.open(encoding='utf-8') as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Строка, недописанная при прерывании
+                continue
+            done[entry['file']] = entry['hash']
+    return done
+
+
+def audio_seconds(path: Path) -> float:
+    """Длительность WAV по заголовку."""
+    try:
+        with wave.open(str(path), 'rb') as audio:
+            return audio.getnframes() / audio.getframerate()
+    except (OSError, EOFError, wave.Error):
+        return 0.0
+
+
+class Progress:
+    """Счетчики и пропускная способность."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.rendered = 0
+        self.failed = 0
+        self.audio = 0.0
+        self.started = time.monotonic()
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (
+            f'{self.rendered + self.failed}/{self.total}, '
+            f'ошибок {self.failed}, '
+            f'{self.rendered / elapsed:.2f} файлов/с, '
+            f'{self.audio / elapsed:.2f} с аудио/с'
+        )
+
+
+async def render(
+    tts: PiperTTS,
+    jobs: List[Job],
+    workers: int,
+    voice: str,
+    manifest: TextIO,
+) -> Progress:
+    """Озвучивает jobs, workers заданий одновременно."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    progress = Progress(len(jobs))
+
+    async def worker() -> None:
+        while not queue.empty():
+            filename, text = queue.get_nowait()
+            try:
+                path = await tts.generate_audio(
+                    text=text,
+                    filename=filename,
+                    voice=voice,
+                    force_regenerate=True,
+                )
+            except TTSError as e:
+                progress.failed += 1
+                print(f'{filename}: {e}')
+            else:
+                progress.rendered += 1
+                progress.audio += audio_seconds(path)
+                entry = {'file': filename, 'hash': text_hash(voice, text)}
+                manifest.write(json.dumps(entry) + '\n')
+                manifest.flush()
+
+            if (progress.rendered + progress.failed) % PROGRESS_EVERY == 0:
+                print(progress.line())
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return progress
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Логирование SQL мешает читать вывод
+    async_engine.echo = False
+    pool = PiperPool(size=args.workers)
+
+    try:
+        tts = PiperTTS(
+            piper_path=settings.PIPER_PATH,
+            output_base_path=settings.PIPER_AUDIO_PATH,
+            pool=pool,
+        )
+        manifest_path = Path(
+            args.manifest or tts.output_base_path / 'prerender_manifest.jsonl'
+        )
+        done = read_manifest(manifest_path)
+
+        jobs = await load_jobs()
+        pending = [
+            (filename, text)
+            for filename, text in jobs
+            if done.get(filename) != text_hash(args.voice, text)
+            and (args.force or not tts.audio_exists(filename))
+        ]
+        print(
+            f'Файлов в каталоге: {len(jobs)}, к озвучке: {len(pending)}, '
+            f'из манифеста: {len(done)}'
+        )
+        if args.dry_run:
+            return
+
+        failed = 0
+        if pending:
+            with manifest_path.open('a', encoding='utf-8') as manifest:
+                progress = await render(
+                    tts, pending, args.workers, args.voice, manifest
+                )
+            print(f'Готово: {progress.line()}')
+            failed = progress.failed
+
+        # Запуск завершен: следующий --force озвучит все заново
+        if not failed:
+            manifest_path.unlink(missing_ok=True)
+    finally:
+        await pool.stop()
+        await async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Процессов Piper',
+    )
+    parser.add_argument(
+        '--voice', default=settings.PIPER_DEFAULT_VOICE, help='Голос'
+    )
+    parser.add_argument(
+        '--force', action='store_true', help='Озвучить существующие файлы заново'
+    )
+    parser.add_argument(
+        '--manifest', help='Файл манифеста, по умолчанию в PIPER_AUDIO_PATH'
+    )
+    parser.add_argument(
+        '--dry-run', action='store_true', help='Только посчитать файлы'
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""
+Перекодирование готовых WAV в сжатые варианты (Opus, MP3).
+
+Запуск:
+    python -m backend.utils.transcode_audio
+    python -m backend.utils.transcode_audio --formats opus --workers 8
+    python -m backend.utils.transcode_audio --dry-run
+
+Для каждого .wav в PIPER_AUDIO_PATH создаются варианты --formats (по
+умолчанию AUDIO_ENCODE_FORMATS) рядом с исходным файлом. Вариант
+пропускается, если он уже есть и не старше WAV, --force перекодирует
+все. ffmpeg запускается в --workers процессах одновременно. В конце
+выводится размер WAV и вариантов.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from backend.ai.audio_encoder import (
+    AUDIO_FORMATS,
+    AudioEncodeError,
+    encode,
+    variant_path,
+)
+from backend.core.config import settings
+
+PROGRESS_EVERY = 100  # Файлов между строками прогресса
+
+Job = Tuple[Path, str]  # (WAV, формат)
+
+
+def is_stale(wav_path: Path, name: str) -> bool:
+    """Варианта нет или он старше WAV (WAV перегенерирован)."""
+    path = variant_path(wav_path, name)
+    return not path.exists() or path.stat().st_mtime < wav_path.stat().st_mtime
+
+
+async def transcode(jobs: List[Job], workers: int) -> int:
+    """Перекодирует jobs, возвращает число ошибок."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    done = failed = 0
+    started = time.monotonic()
+
+    async def worker() -> None:
+        nonlocal done, failed
+        while not queue.empty():
+            wav_path, name = queue.get_nowait()
+            try:
+                await encode(wav_path, name)
+            except AudioEncodeError as e:
+                failed += 1
+                print(f'{wav_path.name} -> {name}: {e}')
+            done += 1
+            if done % PROGRESS_EVERY == 0:
+                elapsed = time.monotonic() - started
+                print(f'{done}/{len(jobs)}, {done / elapsed:.1f} файлов/с')
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    elapsed = max(time.monotonic() - started, 1e-9)
+    print(
+        f'Готово: {done} за {elapsed:.1f}с ({done / elapsed:.1f} файлов/с), '
+        f'ошибок {failed}'
+    )
+    return failed
+
+
+def print_sizes(wav_paths: List[Path], formats: List[str]) -> None:
+    wav_size = sum(path.stat().st_size for path in wav_paths)
+    sizes: Dict[str, int] = {}
+    for name in formats:
+        variants = [variant_path(path, name) for path in wav_paths]
+        sizes[name] = sum(
+            path.stat().st_size for path in variants if path.exists()
+        )
+
+    print(f'\nWAV: {wav_size / 2**20:.1f} MB')
+    for name, size in sizes.items():
+        ratio = size / wav_size if wav_size else 0
+        print(f'{name}: {size / 2**20:.1f} MB ({ratio:.0%} от WAV)')
+
+
+async def main(args: argparse.Namespace) -> None:
+    audio_dir = Path(settings.PIPER_AUDIO_PATH)
+    wav_paths = sorted(audio_dir.glob('*.wav'))
+    jobs = [
+        (wav_path, name)
+        for wav_path in wav_paths
+        for name in args.formats
+        if args.force or is_stale(wav_path, name)
+    ]
+    print(f'WAV файлов: {len(wav_paths)}, к перекодированию: {len(jobs)}')
+
+    if jobs and not args.dry_run:
+        await transcode(jobs, args.workers)
+    print_sizes(wav_paths, args.formats)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--formats',
+        nargs='+',
+        choices=[name for name in AUDIO_FORMATS if name != 'wav'],
+        default=settings.AUDIO_ENCODE_FORMATS,
+        help='Форматы вариантов',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Процессов ffmpeg одновременно',
+    )
+    parser.add_argument(
+        '--force', action='store_true', help='Перекодировать все заново'
+    )
+    parser.add_argument(
+        '--dry-run', action='store_true', help='Только посчитать файлы'
+    )
+    asyncio.run(main(parser.parse_args()))
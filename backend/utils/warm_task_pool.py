@@ -0,0 +1,304 @@
+"""
+Прогрев пула готовых заданий chat_dialog и email_structure.
+
+Запуск:
+    python -m backend.utils.warm_task_pool --target 5
+    python -m backend.utils.warm_task_pool --target 5 --hours 1-7 --loop 600
+    python -m backend.utils.warm_task_pool --dry-run
+
+Для каждой группы (сложность, для email еще стиль и тема) пул в таблицах
+chat_dialog_generated и email_structure_generated дополняется до --target
+заданий. Слова и термины берутся из каталога с весами: чем больше
+пользователей должны повторить элемент в ближайшие --horizon часов, тем
+чаще он попадает в задание. Тогда при генерации задание из пула с большей
+вероятностью пересекается с элементами пользователя.
+
+Запросы к модели идут через общий лимитер с низким приоритетом и не
+чаще --share от REQUESTS_PER_MINUTE, --hours ограничивает работу часами
+низкой нагрузки (по местному времени сервера). Задания генерируются
+группами по PROMPT_BATCH_SIZE, группа уходит к модели одним промптом.
+"""
+
+import argparse
+import asyncio
+import heapq
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from logger import setup_logger
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.ai.rate_limiter import PRIORITY_LOW, RateLimitTimeout
+from backend.api.v1.endpoints.tasks.handlers.chat_dialog import ChatDialogHandler
+from backend.api.v1.endpoints.tasks.handlers.email_structure import (
+    EmailStructureHandler,
+)
+from backend.core.config import settings
+from backend.db.database import async_engine, async_session
+from backend.db.models import (
+    ChatDialogGenerated,
+    DifficultyLevel,
+    EmailStructureGenerated,
+    ItemType,
+    UserWordStatus,
+)
+from backend.services.catalog import CatalogSnapshot, catalog
+from backend.services.task_pool import pool_sizes
+
+logger = setup_logger(__name__)
+
+# Уровни элементов каталога для сложности задания
+DIFFICULTY_LEVELS: Dict[str, Tuple[DifficultyLevel, ...]] = {
+    'basic': (DifficultyLevel.BEGINNER, DifficultyLevel.BASIC),
+    'intermediate': (DifficultyLevel.INTERMEDIATE,),
+    'advanced': (DifficultyLevel.ADVANCED,),
+}
+
+# Состав заданий как в обработчиках
+CHAT_ITEMS = (3, 3)  # слова, термины
+EMAIL_ITEMS = (3, 2)
+
+Demand = Dict[Tuple[int, ItemType], int]
+
+
+def in_hours(spec: Optional[str], now: datetime) -> bool:
+    """Попадает ли час в окно вида '1-7' (окно '22-6' через полночь)."""
+    if not spec:
+        return True
+    start, end = (int(part) for part in spec.split('-'))
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+async def load_demand(session: AsyncSession, horizon_hours: float) -> Demand:
+    """Сколько пользователей должны повторить элемент в ближайшие часы."""
+    until = datetime.utcnow() + timedelta(hours=horizon_hours)
+    result = await session.execute(
+        select(UserWordStatus.item_id, UserWordStatus.item_type, func.count())
+        .where(
+            UserWordStatus.next_review_date <= until,
+            UserWordStatus.is_known.is_not(True),
+        )
+        .group_by(UserWordStatus.item_id, UserWordStatus.item_type)
+    )
+    return {(item_id, item_type): count for item_id, item_type, count in result}
+
+
+def weighted_sample(
+    item_ids: Sequence[int], item_type: ItemType, demand: Demand, k: int
+) -> List[int]:
+    """
+    k элементов без повторов с вероятностью, растущей со спросом.
+
+    Ключ random() ** (1 / вес) и выбор k наибольших (Efraimidis-Spirakis).
+    Элементы без спроса имеют вес 1 и тоже попадают в пул.
+    """
+    return heapq.nlargest(
+        k,
+        item_ids,
+        key=lambda item_id: (
+            random.random() ** (1 / (1 + demand.get((item_id, item_type), 0)))
+        ),
+    )
+
+
+def pick_items(
+    snapshot: CatalogSnapshot,
+    demand: Demand,
+    difficulty: str,
+    words_count: int,
+    terms_count: int,
+) -> Tuple[List[str], List[str]]:
+    """Тексты слов и терминов для нового задания пула."""
+    picked = {}
+    for item_type, count in (
+        (ItemType.WORD, words_count),
+        (ItemType.TERM, terms_count),
+    ):
+        item_ids = [
+            item_id
+            for level in DIFFICULTY_LEVELS[difficulty]
+            for item_id in snapshot.ids(item_type, difficulty=level)
+        ]
+        picked[item_type] = [
+            snapshot.get(item_type, item_id)
+            for item_id in weighted_sample(item_ids, item_type, demand, count)
+        ]
+    return (
+        [word.word for word in picked[ItemType.WORD]],
+        [term.term for term in picked[ItemType.TERM]],
+    )
+
+
+def plan(sizes: Dict[tuple, int], groups: List[tuple], target: int) -> List[tuple]:
+    """Группы, которым не хватает заданий, по одной записи на задание."""
+    missing = []
+    for group in groups:
+        missing += [group] * max(0, target - sizes.get(group, 0))
+    return missing
+
+
+async def warm_once(args: argparse.Namespace) -> int:
+    """Один проход прогрева, возвращает число обработанных заданий."""
+    snapshot = catalog.snapshot
+    chat_handler = ChatDialogHandler()
+    email_handler = EmailStructureHandler()
+
+    async with async_session() as session:
+        demand = await load_demand(session, args.horizon)
+        chat_sizes = await pool_sizes(session, ChatDialogGenerated)
+        email_sizes = await pool_sizes(
+            session,
+            EmailStructureGenerated,
+            EmailStructureGenerated.style,
+            EmailStructureGenerated.topic,
+        )
+
+    chat_groups = [(difficulty,) for difficulty in DIFFICULTY_LEVELS]
+    email_groups = [
+        (difficulty, style, topic)
+        for difficulty in DIFFICULTY_LEVELS
+        for style in EmailStructureHandler.STYLES
+        for topic in EmailStructureHandler.TOPICS
+    ]
+    jobs = [
+        ('chat_dialog', group)
+        for group in plan(chat_sizes, chat_groups, args.target)
+    ]
+    jobs += [
+        ('email_structure', group)
+        for group in plan(email_sizes, email_groups, args.target)
+    ]
+    # Чередуем группы, чтобы при остановке пул был заполнен равномерно
+    random.shuffle(jobs)
+    print(f'Demand items: {len(demand)}, missing tasks: {len(jobs)}')
+
+    # Доля общего лимита запросов, которую может занять прогрев. Задания
+    # группы генерируются одновременно и уходят к модели одной пачкой
+    pause = 60 / (settings.REQUESTS_PER_MINUTE * args.share)
+    group_size = max(1, settings.PROMPT_BATCH_SIZE)
+    jobs = jobs[: args.max_requests]
+    # В пачку попадают только запросы одного шаблона
+    batches = []
+    for batch_type in ('chat_dialog', 'email_structure'):
+        typed = [job for job in jobs if job[0] == batch_type]
+        batches += [
+            typed[start : start + group_size]
+            for start in range(0, len(typed), group_size)
+        ]
+    random.shuffle(batches)
+
+    generated = 0
+    for batch in batches:
+        if not in_hours(args.hours, datetime.now()):
+            print('Outside of --hours window, stopping')
+            break
+
+        group_jobs = []
+        for task_type, group in batch:
+            difficulty = group[0]
+            if task_type == 'chat_dialog':
+                words, terms = pick_items(
+                    snapshot, demand, difficulty, *CHAT_ITEMS
+                )
+            else:
+                words, terms = pick_items(
+                    snapshot, demand, difficulty, *EMAIL_ITEMS
+                )
+            print(f'{task_type} {group}: words={words}, terms={terms}')
+            group_jobs.append((task_type, group, words, terms))
+        if args.dry_run:
+            continue
+
+        results = await asyncio.gather(
+            *(warm_job(chat_handler, email_handler, *job) for job in group_jobs),
+            return_exceptions=True,
+        )
+        busy = False
+        for (task_type, group, _, _), result in zip(group_jobs, results):
+            if isinstance(result, RateLimitTimeout):
+                busy = True
+            elif isinstance(result, Exception):
+                logger.error(
+                    f'Failed to warm {task_type} {group}: {result}',
+                    exc_info=result,
+                )
+            else:
+                generated += 1
+        if busy:
+            # Лимит занят пользователями, попробуем в следующий проход
+            print('Rate limit is busy, stopping')
+            break
+
+        await asyncio.sleep(pause)
+
+    return generated
+
+
+async def warm_job(
+    chat_handler: ChatDialogHandler,
+    email_handler: EmailStructureHandler,
+    task_type: str,
+    group: tuple,
+    words: List[str],
+    terms: List[str],
+) -> None:
+    """Генерация одного задания пула в своей сессии."""
+    difficulty = group[0]
+    async with async_session() as session:
+        if task_type == 'chat_dialog':
+            await chat_handler.find_or_create_task(
+                session, words, terms, difficulty, 3, priority=PRIORITY_LOW
+            )
+        else:
+            _, style, topic = group
+            await email_handler.find_or_create_task(
+                session,
+                words,
+                terms,
+                style,
+                topic,
+                difficulty,
+                priority=PRIORITY_LOW,
+            )
+        await session.commit()
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Логирование SQL мешает читать вывод
+    async_engine.echo = False
+    await catalog.reload()
+
+    try:
+        while True:
+            if in_hours(args.hours, datetime.now()):
+                generated = await warm_once(args)
+                print(f'Generated {generated} tasks')
+            if not args.loop:
+                break
+            await asyncio.sleep(args.loop)
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--target', type=int, default=5, help='Заданий на группу')
+    parser.add_argument(
+        '--horizon', type=float, default=24, help='Часы вперед для спроса'
+    )
+    parser.add_argument(
+        '--share', type=float, default=0.5, help='Доля лимита запросов (0-1]'
+    )
+    parser.add_argument(
+        '--max-requests', type=int, default=100, help='Заданий за проход'
+    )
+    parser.add_argument('--hours', help='Часы работы, например 1-7')
+    parser.add_argument('--loop', type=int, help='Повторять каждые N секунд')
+    parser.add_argument(
+        '--dry-run', action='store_true', help='Показать план без генерации'
+    )
+    asyncio.run(main(parser.parse_args()))
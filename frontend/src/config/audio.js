@@ -0,0 +1,17 @@
+// src/config/audio.js
+
+// Сжатые форматы, которые браузер умеет воспроизводить, в порядке
+// предпочтения. Сервер без явного формата в Accept отдает WAV
+const COMPRESSED_FORMATS = [
+  ['audio/ogg', 'audio/ogg; codecs=opus'],
+  ['audio/mpeg', 'audio/mpeg'],
+]
+
+const probe = typeof Audio === 'undefined' ? null : new Audio()
+
+export const AUDIO_ACCEPT = [
+  ...COMPRESSED_FORMATS.filter(([, codec]) => probe?.canPlayType(codec)).map(
+    ([mediaType]) => mediaType,
+  ),
+  'audio/wav;q=0.5',
+].join(', ')
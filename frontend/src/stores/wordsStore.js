@@ -2,6 +2,7 @@
 import { defineStore } from 'pinia'
 import { ref } from 'vue'
 import axios from 'axios'
+import { AUDIO_ACCEPT } from '@/config/audio'
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:7000/api/v1'
 
@@ -98,6 +99,7 @@ export const useWordsStore = defineStore('words', () => {
     try {
       const response = await axios.get(`${API_URL}/audio/words/${wordId}`, {
         responseType: 'blob',
+        headers: { Accept: AUDIO_ACCEPT },
       })
 
       // Создаем URL для воспроизведения аудио